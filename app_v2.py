@@ -4,7 +4,7 @@
 使用新的模块化架构
 """
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 import os
 import pandas as pd
 from datetime import datetime
@@ -17,6 +17,9 @@ from reportlab.lib import colors
 from core.analytics.analytics import AnalyticsEngine
 from core.container import container
 from core.data import CacheManager
+from core.data.school_tags import BASIC_TAGS, match_tags
+from utils.chart_cache import ChartCache
+from utils.chart_image import ChartImageRenderer
 
 app = Flask(__name__,
             template_folder='templates',
@@ -29,6 +32,12 @@ data_service = container.data_service
 # 初始化分析引擎（使用data_service作为data_processor）
 analytics_engine = AnalyticsEngine(data_processor=data_service)
 
+# 图表输出缓存（按图表类型、筛选条件和数据版本）
+chart_cache = ChartCache(analytics_engine, data_service)
+
+# 图表静态图片渲染（kaleido 进程池，首次请求时启动）
+chart_image_renderer = ChartImageRenderer()
+
 # 初始化数据
 print("正在初始化数据服务...")
 try:
@@ -41,6 +50,12 @@ try:
     data_service.add_admission_data(2024, os.path.join(data_dir, '2024投档分数线_含位次.md'))
     data_service.add_admission_data(2023, os.path.join(data_dir, '2023投档分数线_含位次.md'))
 
+    # 一分一段表(存在时用于分数-位次换算)
+    for segment_year in (2023, 2024, 2025):
+        segment_file = os.path.join(data_dir, f'{segment_year}一分一段.md')
+        if os.path.exists(segment_file):
+            data_service.add_score_segment_table(segment_year, segment_file)
+
     # 尝试加载2025年的数据（最新数据）
     data_2025 = data_service.load_admission_data(2025)
     if data_2025 is not None:
@@ -58,6 +73,13 @@ try:
     if data_2023 is not None:
         print(f"2023年数据已加载，共 {len(data_2023)} 条记录")
 
+    # 拟合录取概率曲线（每个数据版本一次）
+    probability_model = data_service.get_probability_model()
+    print(f"录取概率曲线已拟合: {probability_model.metadata.get('metrics')}")
+
+    # 预生成看板默认图表
+    chart_cache.warm_up()
+
     print("数据服务初始化完成")
 except Exception as e:
     import traceback
@@ -157,6 +179,28 @@ def get_rank_distribution():
     distribution = analytics_engine.get_rank_distribution(min_rank, max_rank)
     return jsonify(distribution)
 
+@app.route('/api/statistics/rollup')
+def get_statistics_rollup():
+    """看板多维筛选统计（年份、省份、院校标签、分数/位次区间任意组合，按维度上卷）"""
+    group_by = request.args.get('group_by') or None
+    years = request.args.getlist('year', type=int)
+    provinces = [p for p in request.args.getlist('province') if p]
+    min_score = request.args.get('min_score', type=int)
+    max_score = request.args.get('max_score', type=int)
+    min_rank = request.args.get('min_rank', type=int)
+    max_rank = request.args.get('max_rank', type=int)
+    score_bucket = request.args.get('score_bucket', 10, type=int)
+    tag_flags = {
+        name: request.args.get(name).lower() == 'true'
+        for name in BASIC_TAGS if request.args.get(name)
+    }
+    try:
+        groups = analytics_engine.get_rollup(group_by, years, provinces, min_score, max_score,
+                                             min_rank, max_rank, max(1, score_bucket), **tag_flags)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'data': groups})
+
 @app.route('/api/top-universities')
 def get_top_universities():
     """获取热门院校排行"""
@@ -205,9 +249,8 @@ def search_data():
     # 获取详细招生记录（默认按位次升序排序）
     results = analytics_engine.search.search_admissions(keyword, min_score, max_score, min_rank, max_rank, sort_by='rank')
 
-    # 加载额外信息
+    # 加载额外信息（学校所在城市、标签已由 search_admissions 按院校标签位图填充）
     try:
-        school_info_df = data_service.load_school_info()
         graduate_rate_df = data_service.load_graduate_rate_data()
         subject_loader = data_service.get_subject_loader()
 
@@ -215,31 +258,6 @@ def search_data():
         for item in results:
             uni_name = item['university']
 
-            # 添加学校信息
-            if school_info_df is not None and not school_info_df.empty:
-                try:
-                    school_col = None
-                    if '学校名称' in school_info_df.columns:
-                        school_col = '学校名称'
-                    elif '院校名称' in school_info_df.columns:
-                        school_col = '院校名称'
-
-                    if school_col:
-                        school_row = school_info_df[school_info_df[school_col] == uni_name]
-                        if not school_row.empty:
-                            school_data = school_row.iloc[0]
-                            item['city'] = school_data.get('所在城市', school_data.get('所在区域', ''))
-                            item['tags'] = {
-                                'is_985': str(school_data.get('985', '')) == 'Y',
-                                'is_211': '211' in str(school_data.get('办学层次', '')),
-                                'is_double_first_class': str(school_data.get('双一流', '')) == 'Y',
-                                'is_private': str(school_data.get('民办高校', '')) == 'Y',
-                                'is_independent': str(school_data.get('独立学院', '')) == 'Y'
-                            }
-                            item['detail_link'] = school_data.get('明细链接', '')
-                except Exception as e:
-                    print(f"处理学校信息时出错: {e}")
-
             # 添加保研率信息
             if graduate_rate_df is not None and not graduate_rate_df.empty and '院校名称' in graduate_rate_df.columns:
                 try:
@@ -291,9 +309,8 @@ def get_by_score_range():
     # 获取详细招生记录（默认按位次升序排序）
     results = analytics_engine.search.search_admissions('', min_score, max_score, sort_by='rank')
 
-    # 加载额外信息
+    # 加载额外信息（学校所在城市、标签已由 search_admissions 按院校标签位图填充）
     try:
-        school_info_df = data_service.load_school_info()
         graduate_rate_df = data_service.load_graduate_rate_data()
         subject_loader = data_service.get_subject_loader()
 
@@ -301,31 +318,6 @@ def get_by_score_range():
         for item in results:
             uni_name = item['university']
 
-            # 添加学校信息
-            if school_info_df is not None and not school_info_df.empty:
-                try:
-                    school_col = None
-                    if '学校名称' in school_info_df.columns:
-                        school_col = '学校名称'
-                    elif '院校名称' in school_info_df.columns:
-                        school_col = '院校名称'
-
-                    if school_col:
-                        school_row = school_info_df[school_info_df[school_col] == uni_name]
-                        if not school_row.empty:
-                            school_data = school_row.iloc[0]
-                            item['city'] = school_data.get('所在城市', school_data.get('所在区域', ''))
-                            item['tags'] = {
-                                'is_985': str(school_data.get('985', '')) == 'Y',
-                                'is_211': '211' in str(school_data.get('办学层次', '')),
-                                'is_double_first_class': str(school_data.get('双一流', '')) == 'Y',
-                                'is_private': str(school_data.get('民办高校', '')) == 'Y',
-                                'is_independent': str(school_data.get('独立学院', '')) == 'Y'
-                            }
-                            item['detail_link'] = school_data.get('明细链接', '')
-                except Exception as e:
-                    print(f"处理学校信息时出错: {e}")
-
             # 添加保研率信息
             if graduate_rate_df is not None and not graduate_rate_df.empty and '院校名称' in graduate_rate_df.columns:
                 try:
@@ -476,6 +468,7 @@ def get_major_detail(name):
 
     # 为每个院校添加详细信息
     if 'universities' in detail and school_info_df is not None:
+        school_tags = data_service.get_school_tags()
         for uni in detail['universities']:
             uni_name = uni['university']
 
@@ -486,9 +479,10 @@ def get_major_detail(name):
                     school_data = school_row.iloc[0].to_dict()
                     uni['city'] = school_data.get('所在城市', school_data.get('所在区域', ''))
                     uni['level'] = school_data.get('办学层次', '')
-                    uni['is_985'] = school_data.get('985', '') == 'Y'
-                    uni['is_211'] = school_data.get('211', '') == 'Y'
-                    uni['is_double_first_class'] = school_data.get('双一流', '') == 'Y'
+                    tags = school_tags.get_tags(uni_name)
+                    uni['is_985'] = tags['is_985']
+                    uni['is_211'] = tags['is_211']
+                    uni['is_double_first_class'] = tags['is_double_first_class']
                     uni['department'] = school_data.get('主管部门', '')
                     uni['detail_link'] = school_data.get('明细链接', '')
 
@@ -514,9 +508,8 @@ def get_by_rank_range():
     # 获取详细招生记录
     results = analytics_engine.search.search_admissions('', None, None, min_rank, max_rank)
 
-    # 加载额外信息
+    # 加载额外信息（学校所在城市、标签已由 search_admissions 按院校标签位图填充）
     try:
-        school_info_df = data_service.load_school_info()
         graduate_rate_df = data_service.load_graduate_rate_data()
         subject_loader = data_service.get_subject_loader()
 
@@ -524,31 +517,6 @@ def get_by_rank_range():
         for item in results:
             uni_name = item['university']
 
-            # 添加学校信息
-            if school_info_df is not None and not school_info_df.empty:
-                try:
-                    school_col = None
-                    if '学校名称' in school_info_df.columns:
-                        school_col = '学校名称'
-                    elif '院校名称' in school_info_df.columns:
-                        school_col = '院校名称'
-
-                    if school_col:
-                        school_row = school_info_df[school_info_df[school_col] == uni_name]
-                        if not school_row.empty:
-                            school_data = school_row.iloc[0]
-                            item['city'] = school_data.get('所在城市', school_data.get('所在区域', ''))
-                            item['tags'] = {
-                                'is_985': str(school_data.get('985', '')) == 'Y',
-                                'is_211': '211' in str(school_data.get('办学层次', '')),
-                                'is_double_first_class': str(school_data.get('双一流', '')) == 'Y',
-                                'is_private': str(school_data.get('民办高校', '')) == 'Y',
-                                'is_independent': str(school_data.get('独立学院', '')) == 'Y'
-                            }
-                            item['detail_link'] = school_data.get('明细链接', '')
-                except Exception as e:
-                    print(f"处理学校信息时出错: {e}")
-
             # 添加保研率信息
             if graduate_rate_df is not None and not graduate_rate_df.empty and '院校名称' in graduate_rate_df.columns:
                 try:
@@ -639,12 +607,6 @@ def advanced_search():
 @app.route('/api/history/trend')
 def get_history_trend():
     """获取历史趋势数据（热门学校排名）"""
-    import hashlib
-    
-    def stable_hash(name):
-        """使用稳定的哈希算法生成代码"""
-        return str(int(hashlib.md5(name.encode('utf-8')).hexdigest(), 16) % 100000)
-    
     try:
         trend_type = request.args.get('type', 'rank')  # 'rank' 或 'score'
         direction = request.args.get('direction', 'asc')  # 'asc' 或 'desc'
@@ -653,48 +615,24 @@ def get_history_trend():
         is_211 = request.args.get('is_211', 'false').lower() == 'true'
         is_double_first_class = request.args.get('is_double_first_class', 'false').lower() == 'true'
 
-        # 获取学校信息
-        school_info_df = None
-        try:
-            school_info_df = data_service.load_school_info()
-        except Exception as e:
-            print(f"获取学校信息失败: {e}")
+        # 院校标签位图
+        school_tags = data_service.get_school_tags()
 
-        # 获取三年的录取数据
-        data_2023 = data_service.load_admission_data(2023)
-        data_2024 = data_service.load_admission_data(2024)
-        data_2025 = data_service.load_admission_data(2025)
+        # 从聚合立方体读取各学校三年数据，取最高分（或最低位次）作为代表
+        cube = data_service.get_aggregate_cube()
+        registry = data_service.get_school_registry()
+        # 分数趋势使用同位分(换算到最新年份的等位次分数),跨年份可比
+        stat_key = 'min_rank' if trend_type == 'rank' else 'max_equivalent_score'
 
-        # 聚合学校数据
         school_trends = {}
-        years_data = {
-            2023: data_2023 if data_2023 is not None else pd.DataFrame(),
-            2024: data_2024 if data_2024 is not None else pd.DataFrame(),
-            2025: data_2025 if data_2025 is not None else pd.DataFrame()
-        }
-
-        for year, df in years_data.items():
-            if df.empty:
-                continue
-
-            # 确定列名
-            score_col = '投档最低分' if '投档最低分' in df.columns else ('投档分' if '投档分' in df.columns else '分数')
-            rank_col = '位次' if '位次' in df.columns else '排名'
-            school_col = '院校名称' if '院校名称' in df.columns else ('学校名称' if '学校名称' in df.columns else None)
-
-            if not school_col:
-                continue
-
-            # 按学校分组，取最高分（或最低位次）作为代表
-            if trend_type == 'rank':
-                grouped = df.groupby(school_col)[rank_col].min()
-            else:
-                grouped = df.groupby(school_col)[score_col].max()
-
-            for school_name, value in grouped.items():
-                if school_name not in school_trends:
-                    school_trends[school_name] = {'name': school_name, 'years': {}}
-                school_trends[school_name]['years'][year] = value
+        for school_name, school_years in cube.school_stats.items():
+            years = {}
+            for year, stats in school_years.items():
+                # 无同位分(缺少位次数据)时退回原始最高分
+                value = stats.get(stat_key, stats.get('max_score') if trend_type != 'rank' else None)
+                if year in (2023, 2024, 2025) and value is not None:
+                    years[year] = value
+            school_trends[school_name] = {'name': school_name, 'years': years}
 
         # 转换为数组并添加学校标签
         results = []
@@ -704,7 +642,7 @@ def get_history_trend():
             if len(years) == 3:
                 trend_data = {
                     'name': school_name,
-                    'code': stable_hash(school_name),  # 生成简单代码
+                    'code': registry.get_legacy_code(school_name),
                     'rank_trend': [
                         years.get(2023),
                         years.get(2024),
@@ -748,41 +686,22 @@ def get_history_trend():
                         trend_data['score_change'] = total_change
 
                 # 添加学校标签
-                if school_info_df is not None and not school_info_df.empty:
-                    school_col = None
-                    if '学校名称' in school_info_df.columns:
-                        school_col = '学校名称'
-                    elif '院校名称' in school_info_df.columns:
-                        school_col = '院校名称'
-
-                    if school_col:
-                        school_row = school_info_df[school_info_df[school_col] == school_name]
-                        if not school_row.empty:
-                            school_data = school_row.iloc[0]
-                            trend_data['tags'] = {
-                                'is_985': str(school_data.get('985', '')) == 'Y',
-                                'is_211': '211' in str(school_data.get('办学层次', '')),
-                                'is_double_first_class': str(school_data.get('双一流', '')) == 'Y',
-                                'is_private': str(school_data.get('民办高校', '')) == 'Y',
-                                'is_independent': str(school_data.get('独立学院', '')) == 'Y'
-                            }
+                if school_tags.contains(school_name):
+                    tags = school_tags.get_tags(school_name)
+                    trend_data['tags'] = {name: tags[name] for name in BASIC_TAGS}
 
                 results.append(trend_data)
 
-        # 应用标签筛选
+        # 应用标签筛选（院校标签位掩码一次按位与）
         if is_985 or is_211 or is_double_first_class:
-            filtered_results = []
-            for item in results:
-                include = True
-                if is_985 and not item['tags'].get('is_985', False):
-                    include = False
-                if is_211 and not item['tags'].get('is_211', False):
-                    include = False
-                if is_double_first_class and not item['tags'].get('is_double_first_class', False):
-                    include = False
-                if include:
-                    filtered_results.append(item)
-            results = filtered_results
+            masks = school_tags.masks_for([item['name'] for item in results])
+            keep = match_tags(
+                masks,
+                is_985=is_985 or None,
+                is_211=is_211 or None,
+                is_double_first_class=is_double_first_class or None
+            )
+            results = [item for item, kept in zip(results, keep) if kept]
 
         # 排序
         if trend_type == 'rank':
@@ -804,42 +723,22 @@ def get_history_trend():
 @app.route('/api/history/schools')
 def get_history_schools():
     """获取历史分析的学校列表"""
-    import hashlib
-    
-    def stable_hash(name):
-        """使用稳定的哈希算法生成代码"""
-        return str(int(hashlib.md5(name.encode('utf-8')).hexdigest(), 16) % 100000)
-    
     try:
         keyword = request.args.get('keyword', '')
 
-        # 获取三年的录取数据
-        data_2023 = data_service.load_admission_data(2023)
-        data_2024 = data_service.load_admission_data(2024)
-        data_2025 = data_service.load_admission_data(2025)
+        # 从聚合立方体和院校注册表获取所有学校
+        cube = data_service.get_aggregate_cube()
+        registry = data_service.get_school_registry()
 
-        # 获取所有学校
         schools = {}
-
-        for year, df in [(2023, data_2023), (2024, data_2024), (2025, data_2025)]:
-            if df is None or df.empty:
-                continue
-
-            # 确定列名
-            school_col = '院校名称' if '院校名称' in df.columns else ('学校名称' if '学校名称' in df.columns else None)
-
-            if not school_col:
-                continue
-
-            for school_name in df[school_col].unique():
-                if school_name:
-                    if school_name not in schools:
-                        schools[school_name] = {
-                            'name': school_name,
-                            'code': stable_hash(school_name),
-                            'years': set()
-                        }
-                    schools[school_name]['years'].add(year)
+        for school_name, school_years in cube.school_stats.items():
+            years = {year for year in school_years if year in (2023, 2024, 2025)}
+            if school_name and years:
+                schools[school_name] = {
+                    'name': school_name,
+                    'code': registry.get_legacy_code(school_name),
+                    'years': years
+                }
 
         # 转换为列表格式
         results = []
@@ -917,95 +816,49 @@ def get_history_majors():
 @app.route('/api/history/compare')
 def get_history_compare():
     """获取历史对比数据"""
-    import hashlib
-    
-    def stable_hash(name):
-        """使用稳定的哈希算法生成代码"""
-        return str(int(hashlib.md5(name.encode('utf-8')).hexdigest(), 16) % 100000)
-    
     try:
         codes_str = request.args.get('codes', '')
         if not codes_str:
             return jsonify({'error': '缺少学校代码'})
         
         codes = codes_str.split(',')
-        print(f"请求的学校代码: {codes}")
         schools = {}
 
-        # 获取所有学校列表，建立代码到名称的映射
-        school_map = {}
-        all_schools_df = data_service.load_admission_data(2025)
-        if all_schools_df is not None and not all_schools_df.empty:
-            school_col = '院校名称' if '院校名称' in all_schools_df.columns else ('学校名称' if '学校名称' in all_schools_df.columns else None)
-            print(f"2025年数据列: {all_schools_df.columns.tolist()}")
-            if school_col:
-                for school_name in all_schools_df[school_col].unique():
-                    school_code = stable_hash(school_name)
-                    school_map[school_code] = school_name
-        print(f"生成的学校映射数量: {len(school_map)}")
+        # 通过院校注册表将代码解析为学校名称(未找到的代码跳过)
+        registry = data_service.get_school_registry()
 
         # 初始化学校数据结构
         for code in codes:
-            print(f"查找代码 {code}...")
-            if code in school_map:
+            school_name = registry.resolve(code)
+            if school_name:
                 schools[code] = {
-                    'name': school_map[code],
+                    'name': school_name,
                     'code': int(code) if code.isdigit() else code,
                     'years': {}
                 }
-                print(f"  找到学校: {school_map[code]}")
-            else:
-                print(f"  未找到学校")
-
-        # 获取三年的录取数据
-        years = [2023, 2024, 2025]
-        
-        for year in years:
-            df = data_service.load_admission_data(year)
-            if df is None or df.empty:
-                print(f"{year}年数据为空")
-                continue
-
-            print(f"{year}年数据列: {df.columns.tolist()}, 数据行数: {len(df)}")
-
-            # 确定列名
-            school_col = '院校名称' if '院校名称' in df.columns else ('学校名称' if '学校名称' in df.columns else None)
-            score_col = '投档最低分' if '投档最低分' in df.columns else ('投档分' if '投档分' in df.columns else ('分数' if '分数' in df.columns else None))
-            major_col = '专业名称' if '专业名称' in df.columns else ('招生专业' if '招生专业' in df.columns else ('专业' if '专业' in df.columns else None))
-            rank_col = '位次' if '位次' in df.columns else ('排名' if '排名' in df.columns else None)
 
-            if not school_col or not score_col:
-                print(f"{year}年: 缺少必要的列, school_col={school_col}, score_col={score_col}")
-                continue
-
-            # 为每所学校计算统计信息
-            for code, school_data in schools.items():
-                school_name = school_data['name']
-                print(f"  处理学校 {school_name}...")
-                
-                # 根据学校名称精确匹配
-                school_df = df[df[school_col] == school_name]
-                print(f"  匹配结果: {len(school_df)} 条记录")
-                
-                if not school_df.empty:
-                    min_score = school_df[score_col].min()
-                    max_score = school_df[score_col].max()
-                    avg_score = school_df[score_col].mean()
-                    total_majors = school_df[major_col].nunique() if major_col and major_col in school_df.columns else 0
-
-                    # 计算平均位次
-                    avg_rank = 0
-                    if rank_col and rank_col in school_df.columns:
-                        avg_rank = school_df[rank_col].mean()
-
-                    schools[code]['years'][str(year)] = {
-                        'min_score': float(min_score) if pd.notna(min_score) else 0,
-                        'max_score': float(max_score) if pd.notna(max_score) else 0,
-                        'avg_score': float(avg_score) if pd.notna(avg_score) else 0,
-                        'avg_rank': float(avg_rank) if pd.notna(avg_rank) else 0,
-                        'total_majors': int(total_majors)
-                    }
-                    print(f"  {year}年数据: min={min_score}, max={max_score}, avg={avg_score}")
+        # 从聚合立方体读取三年统计信息,从波动指标表读取位次波动
+        cube = data_service.get_aggregate_cube()
+        volatility_table = data_service.get_school_volatility()
+        for code, school_data in schools.items():
+            school_name = school_data['name']
+            for year, stats in cube.get_school_years(school_name).items():
+                if year not in (2023, 2024, 2025):
+                    continue
+                min_score = stats.get('min_score')
+                max_score = stats.get('max_score')
+                avg_score = stats.get('avg_score')
+                avg_rank = stats.get('avg_rank', 0)
+                avg_equivalent_score = stats.get('avg_equivalent_score', avg_score)
+
+                schools[code]['years'][str(year)] = {
+                    'min_score': float(min_score) if pd.notna(min_score) else 0,
+                    'max_score': float(max_score) if pd.notna(max_score) else 0,
+                    'avg_score': float(avg_score) if pd.notna(avg_score) else 0,
+                    'avg_equivalent_score': float(avg_equivalent_score) if pd.notna(avg_equivalent_score) else 0,
+                    'avg_rank': float(avg_rank) if pd.notna(avg_rank) else 0,
+                    'total_majors': int(stats.get('major_count', 0))
+                }
 
         # 为每所学校计算趋势数据
         for school_data in schools.values():
@@ -1016,11 +869,12 @@ def get_history_compare():
             if len(years_dict) == 3:
                 # 计算分数趋势
                 score_trend = [years_dict[year]['avg_score'] for year in years]
+                equivalent_score_trend = [years_dict[year]['avg_equivalent_score'] for year in years]
                 rank_trend = [years_dict[year]['avg_rank'] for year in years]
                 
-                # 计算分数变化（2025 vs 2023）
-                score_2023 = years_dict['2023']['avg_score']
-                score_2025 = years_dict['2025']['avg_score']
+                # 计算分数变化（2025 vs 2023，按同位分比较，消除各年难度差异）
+                score_2023 = years_dict['2023']['avg_equivalent_score']
+                score_2025 = years_dict['2025']['avg_equivalent_score']
                 score_change = score_2025 - score_2023
                 
                 # 计算位次变化（2025 vs 2023）
@@ -1039,22 +893,21 @@ def get_history_compare():
                 else:
                     trend = '稳定'
                 
-                # 计算稳定性（分数标准差/平均分）
-                if score_2025 > 0:
-                    std_dev = pd.Series(score_trend).std()
-                    stability = max(0, 1 - (std_dev / score_2025))
-                else:
-                    stability = 0
+                # 稳定性（1 - 位次变异系数，取自波动指标表）
+                volatility = volatility_table.get(school_data['name'])
+                stability = volatility['stability'] if volatility and volatility['stability'] is not None else 0
                 
                 # 添加趋势数据
                 school_data['trend'] = {
                     'score_trend': score_trend,
+                    'equivalent_score_trend': equivalent_score_trend,
                     'rank_trend': rank_trend,
                     'score_change': round(score_change, 2),
                     'rank_change': round(rank_change, 2),
                     'trend': trend,
                     'score_growth_rate': score_growth_rate,
-                    'stability': round(stability, 4)
+                    'stability': round(stability, 4),
+                    'volatility': volatility
                 }
                 print(f"  {school_data['name']} 趋势: {trend}, 分数变化: {score_change:.1f}")
         
@@ -1073,90 +926,36 @@ def get_history_compare():
 @app.route('/api/history/school/<code>')
 def get_history_school(code):
     """获取单个学校的历史数据"""
-    import hashlib
-    
-    def stable_hash(name):
-        """使用稳定的哈希算法生成代码"""
-        return str(int(hashlib.md5(name.encode('utf-8')).hexdigest(), 16) % 100000)
-    
     try:
-        # 先通过学校API获取学校列表，找到匹配的学校
-        all_schools = []
-        data_2025 = data_service.load_admission_data(2025)
-        if data_2025 is not None and not data_2025.empty:
-            school_col = '院校名称' if '院校名称' in data_2025.columns else ('学校名称' if '学校名称' in data_2025.columns else None)
-            if school_col:
-                for school_name in data_2025[school_col].unique():
-                    school_code = stable_hash(school_name)
-                    all_schools.append({
-                        'name': school_name,
-                        'code': school_code
-                    })
-        
-        # 找到匹配代码的学校
-        school_info = None
-        for s in all_schools:
-            if str(s['code']) == str(code):
-                school_info = s
-                break
-        
-        if not school_info:
+        # 通过院校注册表找到匹配代码的学校
+        school_name = data_service.get_school_registry().resolve(code)
+        if not school_name:
             return jsonify({'error': '未找到该学校的数据'})
         
-        school_name = school_info['name']
-        years = [2023, 2024, 2025]
         years_data = {}
-        
-        for year in years:
-            df = data_service.load_admission_data(year)
-            if df is None or df.empty:
-                continue
-                
-            school_col = '院校名称' if '院校名称' in df.columns else ('学校名称' if '学校名称' in df.columns else None)
-            score_col = '投档最低分' if '投档最低分' in df.columns else ('投档分' if '投档分' in df.columns else '分数')
-            major_col = '专业名称' if '专业名称' in df.columns else ('招生专业' if '招生专业' in df.columns else ('专业' if '专业' in df.columns else None))
-            rank_col = '位次' if '位次' in df.columns else '排名'
-            
-            if not school_col or not score_col:
+
+        # 从聚合立方体读取学校各年份统计和专业明细
+        cube = data_service.get_aggregate_cube()
+        for year, stats in sorted(cube.get_school_years(school_name).items()):
+            if year not in (2023, 2024, 2025):
                 continue
-            
-            # 匹配学校名称
-            school_df = df[df[school_col] == school_name]
-            
-            if not school_df.empty:
-                # 构建专业详细信息
-                majors_info = {}
-                major_code_col = '专业编号' if '专业编号' in school_df.columns else ('专业代码' if '专业代码' in school_df.columns else None)
-
-                # 按专业分组
-                if major_col:
-                    grouped = school_df.groupby(major_col)
-                    for major_name, group in grouped:
-                        # 取该专业的最低分作为代表
-                        min_score = group[score_col].min()
-                        rank = group[rank_col].min() if rank_col and rank_col in group.columns else 0
-                        major_code = str(group[major_code_col].iloc[0]) if major_code_col and major_code_col in group.columns else str(len(majors_info))
-
-                        majors_info[major_code] = {
-                            'major_code': major_code,
-                            'major_name': major_name,
-                            'score': float(min_score) if pd.notna(min_score) else 0,
-                            'rank': float(rank) if pd.notna(rank) else 0
-                        }
 
-                year_data = {
-                    'majors': majors_info,  # 返回专业详细信息对象
-                    'min_score': float(school_df[score_col].min()) if pd.notna(school_df[score_col].min()) else 0,
-                    'max_score': float(school_df[score_col].max()) if pd.notna(school_df[score_col].max()) else 0,
-                    'avg_score': float(school_df[score_col].mean()) if pd.notna(school_df[score_col].mean()) else 0,
-                    'total_majors': len(majors_info)
-                }
+            majors_info = cube.get_school_majors(school_name, year)
+            equivalent_score = stats.get('avg_equivalent_score', stats['avg_score'])
+            year_data = {
+                'majors': majors_info,  # 返回专业详细信息对象
+                'min_score': float(stats['min_score']) if pd.notna(stats['min_score']) else 0,
+                'max_score': float(stats['max_score']) if pd.notna(stats['max_score']) else 0,
+                'avg_score': float(stats['avg_score']) if pd.notna(stats['avg_score']) else 0,
+                'avg_equivalent_score': float(equivalent_score) if pd.notna(equivalent_score) else 0,
+                'total_majors': len(majors_info)
+            }
 
-                if rank_col in school_df.columns:
-                    year_data['min_rank'] = float(school_df[rank_col].min()) if pd.notna(school_df[rank_col].min()) else 0
-                    year_data['avg_rank'] = float(school_df[rank_col].mean()) if pd.notna(school_df[rank_col].mean()) else 0
-                
-                years_data[str(year)] = year_data
+            if 'min_rank' in stats:
+                year_data['min_rank'] = float(stats['min_rank']) if pd.notna(stats['min_rank']) else 0
+                year_data['avg_rank'] = float(stats['avg_rank']) if pd.notna(stats['avg_rank']) else 0
+
+            years_data[str(year)] = year_data
 
         # 计算趋势数据
         trend_data = None
@@ -1165,11 +964,12 @@ def get_history_school(code):
             if all(y in years_data for y in years_list):
                 # 计算分数趋势
                 score_trend = [years_data[y].get('avg_score', 0) for y in years_list]
+                equivalent_score_trend = [years_data[y].get('avg_equivalent_score', 0) for y in years_list]
                 rank_trend = [years_data[y].get('avg_rank', 0) for y in years_list]
 
-                # 计算分数变化
-                score_2023 = years_data['2023'].get('avg_score', 0)
-                score_2025 = years_data['2025'].get('avg_score', 0)
+                # 计算分数变化（按同位分比较）
+                score_2023 = years_data['2023'].get('avg_equivalent_score', 0)
+                score_2025 = years_data['2025'].get('avg_equivalent_score', 0)
                 score_change = score_2025 - score_2023
 
                 # 计算位次变化
@@ -1187,10 +987,12 @@ def get_history_school(code):
 
                 trend_data = {
                     'score_trend': score_trend,
+                    'equivalent_score_trend': equivalent_score_trend,
                     'rank_trend': rank_trend,
                     'score_change': score_change,
                     'rank_change': rank_change,
-                    'trend': score_trend_str
+                    'trend': score_trend_str,
+                    'volatility': data_service.get_school_volatility().get(school_name)
                 }
 
         return jsonify({
@@ -1215,43 +1017,29 @@ def get_history_major(name):
         from urllib.parse import unquote
         major_name = unquote(name)
         
-        years = [2023, 2024, 2025]
-        years_data = []
+        # 通过专业关联表按名称找到 major_id，再按 major_id 汇总各年份记录（含改名专业）
+        linker = data_service.get_major_linker()
+        major_ids = linker.find_major_ids(major_name)
+        rows = linker.get_rows(major_ids)
         
-        for year in years:
-            df = data_service.load_admission_data(year)
-            if df is None or df.empty:
-                continue
-            
-            school_col = '院校名称' if '院校名称' in df.columns else ('学校名称' if '学校名称' in df.columns else None)
-            score_col = '投档最低分' if '投档最低分' in df.columns else ('投档分' if '投档分' in df.columns else '分数')
-            major_col = '专业名称' if '专业名称' in df.columns else ('招生专业' if '招生专业' in df.columns else ('专业' if '专业' in df.columns else None))
-            rank_col = '位次' if '位次' in df.columns else '排名'
-            
-            if not major_col or not score_col:
+        years_data = []
+        for year in [2023, 2024, 2025]:
+            major_df = rows[rows['year'] == year]
+            if major_df.empty:
                 continue
             
-            # 根据专业名称匹配
-            major_df = df[df[major_col].str.contains(major_name, na=False)]
-            
-            if not major_df.empty:
-                schools = major_df[school_col].unique()
-                
-                year_data = {
-                    'year': year,
-                    'major_name': major_df[major_col].iloc[0],
-                    'schools': list(schools[:20]),  # 限制返回前20个学校
-                    'min_score': float(major_df[score_col].min()) if pd.notna(major_df[score_col].min()) else 0,
-                    'max_score': float(major_df[score_col].max()) if pd.notna(major_df[score_col].max()) else 0,
-                    'avg_score': float(major_df[score_col].mean()) if pd.notna(major_df[score_col].mean()) else 0,
-                    'total_schools': len(schools)
-                }
-                
-                if rank_col in major_df.columns:
-                    year_data['min_rank'] = float(major_df[rank_col].min()) if pd.notna(major_df[rank_col].min()) else 0
-                    year_data['avg_rank'] = float(major_df[rank_col].mean()) if pd.notna(major_df[rank_col].mean()) else 0
-                
-                years_data.append(year_data)
+            schools = major_df['school_name'].unique()
+            years_data.append({
+                'year': year,
+                'major_name': major_df['major_name'].iloc[0],
+                'schools': list(schools[:20]),  # 限制返回前20个学校
+                'min_score': float(major_df['score'].min()) if pd.notna(major_df['score'].min()) else 0,
+                'max_score': float(major_df['score'].max()) if pd.notna(major_df['score'].max()) else 0,
+                'avg_score': float(major_df['score'].mean()) if pd.notna(major_df['score'].mean()) else 0,
+                'total_schools': len(schools),
+                'min_rank': float(major_df['rank'].min()) if pd.notna(major_df['rank'].min()) else 0,
+                'avg_rank': float(major_df['rank'].mean()) if pd.notna(major_df['rank'].mean()) else 0
+            })
         
         if not years_data:
             return jsonify({'error': '未找到该专业的数据'})
@@ -1272,100 +1060,31 @@ def get_history_major(name):
 @app.route('/api/predict/school/<code>')
 def predict_school(code):
     """预测学校2026年位次"""
-    import hashlib
-    
-    def stable_hash(name):
-        """使用稳定的哈希算法生成代码"""
-        return str(int(hashlib.md5(name.encode('utf-8')).hexdigest(), 16) % 100000)
-    
     try:
-        # 获取学校数据
-        data_2025 = data_service.load_admission_data(2025)
-        if data_2025 is None or data_2025.empty:
-            return jsonify({'error': '无法加载数据'})
-        
-        school_col = '院校名称' if '院校名称' in data_2025.columns else ('学校名称' if '学校名称' in data_2025.columns else None)
-        if not school_col:
-            return jsonify({'error': '数据列名不匹配'})
-        
-        # 找到学校名称
-        school_name = None
-        for name in data_2025[school_col].unique():
-            if stable_hash(name) == str(code):
-                school_name = name
-                break
-        
+        # 通过院校注册表找到学校名称
+        school_name = data_service.get_school_registry().resolve(code)
         if not school_name:
             return jsonify({'error': '未找到该学校'})
         
-        # 收集三年数据
-        years_data = []
-        for year in [2023, 2024, 2025]:
-            df = data_service.load_admission_data(year)
-            if df is None or df.empty:
-                continue
-            
-            school_df = df[df[school_col] == school_name]
-            if not school_df.empty:
-                rank_col = '位次' if '位次' in df.columns else '排名'
-                if rank_col in school_df.columns:
-                    avg_rank = school_df[rank_col].mean()
-                    if pd.notna(avg_rank) and avg_rank > 0:
-                        years_data.append({'year': year, 'rank': avg_rank})
-        
-        if len(years_data) < 2:
+        # 从批量预测表中读取该学校的预测结果
+        prediction = analytics_engine.prediction.predict_school(school_name)
+        if prediction is None:
             return jsonify({'error': '数据不足，无法预测'})
         
-        # 使用加权移动平均预测
-        years_data.sort(key=lambda x: x['year'])
-        weights = [1, 2, 3]  # 近期数据权重更高
-        
-        # 计算加权平均
-        weighted_sum = 0
-        weight_total = 0
-        for i, data in enumerate(years_data[-3:]):  # 取最近3年
-            weight = weights[len(years_data[-3:]) - 1 - i]
-            weighted_sum += data['rank'] * weight
-            weight_total += weight
-        
-        predicted_rank = weighted_sum / weight_total if weight_total > 0 else years_data[-1]['rank']
-        
-        # 计算置信度
-        if len(years_data) == 3:
-            confidence = 'high'
-            # 计算标准差作为置信区间
-            ranks = [d['rank'] for d in years_data]
-            std = pd.Series(ranks).std()
-            confidence_interval = [predicted_rank - std, predicted_rank + std]
-        elif len(years_data) == 2:
-            confidence = 'medium'
-            diff = abs(years_data[-1]['rank'] - years_data[-2]['rank'])
-            confidence_interval = [predicted_rank - diff, predicted_rank + diff]
-        else:
-            confidence = 'low'
-            confidence_interval = [predicted_rank * 0.9, predicted_rank * 1.1]
-        
-        # 计算趋势
-        if len(years_data) >= 2:
-            if years_data[-1]['rank'] < years_data[-2]['rank']:
-                trend = '位次上升（排名提升）'
-            elif years_data[-1]['rank'] > years_data[-2]['rank']:
-                trend = '位次下降（排名降低）'
-            else:
-                trend = '保持稳定'
-        else:
-            trend = '数据不足'
+        trend_labels = {-1: '位次上升（排名提升）', 1: '位次下降（排名降低）', 0: '保持稳定'}
         
         return jsonify({
             'school_code': code,
             'school_name': school_name,
             'prediction': {
-                'predicted_rank': round(predicted_rank),
-                'confidence': confidence,
-                'confidence_interval': [round(confidence_interval[0]), round(confidence_interval[1])],
-                'trend': trend,
+                'predicted_rank': prediction['predicted_rank'],
+                'predicted_score': prediction.get('predicted_score'),
+                'confidence': prediction['confidence'],
+                'confidence_interval': prediction['confidence_interval'],
+                'volatility': prediction['volatility'],
+                'trend': trend_labels.get(prediction['trend'], '数据不足'),
                 'algorithm': 'weighted_moving_avg',
-                'rationale': f'基于{len(years_data)}年历史数据，使用加权移动平均法预测，近两年数据权重更高'
+                'rationale': f"基于{prediction['year_count']}年历史数据，使用加权移动平均法预测，近两年数据权重更高"
             }
         })
     
@@ -1386,17 +1105,31 @@ def predict_major():
         if not school_code or not major_name:
             return jsonify({'error': '缺少必要参数'})
         
-        # TODO: 实现专业预测逻辑
+        school_name = data_service.get_school_registry().resolve(school_code)
+        if not school_name:
+            return jsonify({'error': '未找到该学校'})
+        
+        # 从专业预测表中读取（跨年份关联后的专业序列）
+        prediction = analytics_engine.prediction.predict_major(school_name, major_name)
+        if prediction is None:
+            return jsonify({'error': '未找到该专业的历史数据或数据不足，无法预测'})
+        
+        trend_labels = {-1: '位次上升（排名提升）', 1: '位次下降（排名降低）', 0: '保持稳定'}
+        
         return jsonify({
             'school_code': school_code,
-            'major_name': major_name,
+            'school_name': school_name,
+            'major_name': prediction['major_name'],
             'prediction': {
-                'predicted_rank': 10000,
-                'confidence': 'low',
-                'confidence_interval': [9000, 11000],
-                'trend': '数据不足',
-                'algorithm': 'placeholder',
-                'rationale': '专业预测功能待完善'
+                'predicted_rank': prediction['predicted_rank'],
+                'predicted_score': prediction.get('predicted_score'),
+                'confidence': prediction['confidence'],
+                'confidence_interval': prediction['confidence_interval'],
+                'volatility': prediction['volatility'],
+                'trend': trend_labels.get(prediction['trend'], '数据不足'),
+                'annual_change': prediction['annual_change'],
+                'algorithm': 'weighted_moving_avg',
+                'rationale': f"基于该专业{prediction['year_count']}年历史数据（跨年份按院校编号与专业名称关联），使用加权移动平均法预测"
             }
         })
     
@@ -1410,97 +1143,28 @@ def predict_major():
 @app.route('/api/predict/batch-schools')
 def predict_batch_schools():
     """批量预测学校2026年位次"""
-    import hashlib
-    
-    def stable_hash(name):
-        """使用稳定的哈希算法生成代码"""
-        return str(int(hashlib.md5(name.encode('utf-8')).hexdigest(), 16) % 100000)
-    
     try:
+        # limit 不大于0时返回全部学校
         limit = request.args.get('limit', 100, type=int)
         
-        # 获取2025年数据
-        data_2025 = data_service.load_admission_data(2025)
-        if data_2025 is None or data_2025.empty:
-            return jsonify({'error': '无法加载数据'})
-        
-        school_col = '院校名称' if '院校名称' in data_2025.columns else ('学校名称' if '学校名称' in data_2025.columns else None)
-        rank_col = '位次' if '位次' in data_2025.columns else '排名'
-        
-        if not school_col or not rank_col:
-            return jsonify({'error': '数据列名不匹配'})
-        
-        # 按学校分组，取平均位次最小的学校
-        school_rank_2025 = data_2025.groupby(school_col)[rank_col].mean().sort_values().head(limit)
+        registry = data_service.get_school_registry()
+        trend_labels = analytics_engine.prediction.TREND_LABELS
         
         results = []
-        for school_name in school_rank_2025.index:
-            code = stable_hash(school_name)
-            
-            # 收集三年数据
-            years_data = []
-            for year in [2023, 2024, 2025]:
-                df = data_service.load_admission_data(year)
-                if df is None or df.empty:
-                    continue
-                
-                school_df = df[df[school_col] == school_name]
-                if not school_df.empty and rank_col in school_df.columns:
-                    avg_rank = school_df[rank_col].mean()
-                    if pd.notna(avg_rank) and avg_rank > 0:
-                        years_data.append({'year': year, 'rank': avg_rank})
-            
-            if len(years_data) < 2:
-                continue
-            
-            # 使用加权移动平均预测
-            years_data.sort(key=lambda x: x['year'])
-            weights = [1, 2, 3]
-            
-            weighted_sum = 0
-            weight_total = 0
-            for i, data in enumerate(years_data[-3:]):
-                weight = weights[len(years_data[-3:]) - 1 - i]
-                weighted_sum += data['rank'] * weight
-                weight_total += weight
-            
-            predicted_rank = weighted_sum / weight_total if weight_total > 0 else years_data[-1]['rank']
-            
-            # 计算置信度和置信区间
-            if len(years_data) == 3:
-                confidence = 'high'
-                ranks = [d['rank'] for d in years_data]
-                std = pd.Series(ranks).std()
-                confidence_interval = [predicted_rank - std, predicted_rank + std]
-            elif len(years_data) == 2:
-                confidence = 'medium'
-                diff = abs(years_data[-1]['rank'] - years_data[-2]['rank'])
-                confidence_interval = [predicted_rank - diff, predicted_rank + diff]
-            else:
-                confidence = 'low'
-                confidence_interval = [predicted_rank * 0.9, predicted_rank * 1.1]
-            
-            # 计算趋势
-            if len(years_data) >= 2:
-                if years_data[-1]['rank'] < years_data[-2]['rank']:
-                    trend = '位次上升'
-                elif years_data[-1]['rank'] > years_data[-2]['rank']:
-                    trend = '位次下降'
-                else:
-                    trend = '保持稳定'
-            else:
-                trend = '数据不足'
-            
+        for item in analytics_engine.prediction.predict_schools(limit):
+            prediction = item['prediction']
             results.append({
-                'name': school_name,
-                'code': code,
+                'name': item['name'],
+                'code': registry.get_legacy_code(item['name']),
                 'prediction': {
-                    'predicted_rank': round(predicted_rank),
-                    'confidence': confidence,
-                    'confidence_interval': [round(confidence_interval[0]), round(confidence_interval[1])],
-                    'trend': trend,
+                    'predicted_rank': prediction['predicted_rank'],
+                    'predicted_score': prediction.get('predicted_score'),
+                    'confidence': prediction['confidence'],
+                    'confidence_interval': prediction['confidence_interval'],
+                    'volatility': prediction['volatility'],
+                    'trend': trend_labels.get(prediction['trend'], '数据不足'),
                     'algorithm': 'weighted_moving_avg',
-                    'rationale': f'基于{len(years_data)}年历史数据'
+                    'rationale': f"基于{prediction['year_count']}年历史数据"
                 }
             })
         
@@ -1520,6 +1184,41 @@ volunteer_plans_storage = {}
 volunteer_plans_counter = 0
 volunteer_students_storage = {}
 
+
+def _complete_student_info(info):
+    """补全考生信息: 只提供分数或位次之一时,由分数-位次换算表换算另一项"""
+    info = dict(info or {})
+    score = info.get('score') if info.get('score') not in (None, '') else None
+    rank = info.get('rank') if info.get('rank') not in (None, '') else None
+    if score is None and rank is None:
+        score = 600
+    try:
+        completed = data_service.get_score_rank_table().complete(
+            float(score) if score is not None else None,
+            float(rank) if rank is not None else None
+        )
+        info['score'] = score if score is not None else completed['score']
+        info['rank'] = rank if rank is not None else completed['rank']
+    except Exception as e:
+        print(f"分数位次换算失败: {e}")
+        info.setdefault('score', score if score is not None else 600)
+        info['rank'] = rank if rank is not None else 10000
+    info.setdefault('subject_type', '理科')
+    return info
+
+
+def _current_student_info(preferences=None):
+    """获取当前考生信息(未保存时从偏好中提取),并补全分数/位次"""
+    student_info = volunteer_students_storage.get('current', {})
+    if not student_info:
+        preferences = preferences or {}
+        student_info = {
+            'score': preferences.get('score'),
+            'rank': preferences.get('rank'),
+            'subject_type': preferences.get('subject_type', '理科')
+        }
+    return _complete_student_info(student_info)
+
 @app.route('/api/volunteer/student-info', methods=['GET', 'POST'])
 def volunteer_student_info():
     """获取或保存考生信息"""
@@ -1535,8 +1234,8 @@ def volunteer_student_info():
         })
     elif request.method == 'POST':
         data = request.get_json()
-        # 保存考生信息到内存
-        volunteer_students_storage['current'] = data
+        # 保存考生信息到内存(只填分数或位次时换算另一项)
+        volunteer_students_storage['current'] = _complete_student_info(data)
         return jsonify({'success': True, 'message': '考生信息已保存'})
 
 
@@ -1689,17 +1388,16 @@ def volunteer_plan_save():
 
     data = request.get_json()
     from datetime import datetime
-    import hashlib
 
     # 生成学生信息字符串
     student_info = f"分数:{data.get('score', '')} 位次:{data.get('rank', '')} {data.get('subject_type', '理科')}"
 
     # 同时保存学生信息到current（用于生成志愿）
-    volunteer_students_storage['current'] = {
-        'score': data.get('score', 600),
-        'rank': data.get('rank', 10000),
+    volunteer_students_storage['current'] = _complete_student_info({
+        'score': data.get('score'),
+        'rank': data.get('rank'),
         'subject_type': data.get('subject_type', '理科')
-    }
+    })
 
     # 创建新方案
     volunteer_plans_storage[str(plan_id)] = {
@@ -1743,13 +1441,51 @@ def volunteer_compare_export():
 
 @app.route('/api/volunteer/plan/risk-assessment')
 def volunteer_risk_assessment():
-    """风险评估"""
+    """风险评估(蒙特卡洛模拟整套方案的平行志愿投档)"""
+    current_plan_id = volunteer_students_storage.get('current_plan_id', 1)
+    volunteers = volunteer_plans_storage.get(str(current_plan_id), {}).get('volunteers', [])
+    student = volunteer_students_storage.get('current') or {}
+    student_rank = int(student.get('rank') or 0)
+    if not volunteers or student_rank <= 0:
+        return jsonify({
+            'success': True,
+            'data': {
+                'overall_risk': '中',
+                'risk_factors': [],
+                'suggestions': []
+            }
+        })
+
+    simulation = analytics_engine.simulation.simulate_plan(student_rank, volunteers)
+    fall_through = simulation['fall_through_probability']
+    if fall_through < 1:
+        overall_risk = '低'
+    elif fall_through < 5:
+        overall_risk = '中'
+    else:
+        overall_risk = '高'
+
+    risk_factors = []
+    suggestions = []
+    if fall_through >= 1:
+        risk_factors.append(f'滑档概率约{fall_through}%')
+        suggestions.append('在方案末尾增加录取位次明显低于考生位次的保底志愿')
+    entry_probabilities = simulation['entry_probabilities']
+    safe_count = sum(1 for p in entry_probabilities if p >= 80)
+    if safe_count < 3:
+        risk_factors.append(f'录取概率80%以上的志愿仅{safe_count}个')
+    unreachable = sum(1 for p in entry_probabilities if p < 1)
+    if unreachable > len(entry_probabilities) // 2:
+        risk_factors.append(f'{unreachable}个志愿录取概率不足1%')
+        suggestions.append('减少录取位次远高于考生位次的冲刺志愿')
+
     return jsonify({
         'success': True,
         'data': {
-            'overall_risk': '中',
-            'risk_factors': [],
-            'suggestions': []
+            'overall_risk': overall_risk,
+            'risk_factors': risk_factors,
+            'suggestions': suggestions,
+            'simulation': simulation
         }
     })
 
@@ -1765,41 +1501,16 @@ def volunteer_search_schools():
     try:
         results = analytics_engine.search.search_universities(keyword)
         # 转换为前端期望的格式
-        import hashlib
+        registry = data_service.get_school_registry()
+        school_tags = data_service.get_school_tags()
         schools = []
         for school in results[:20]:
             school_name = school.get('name', '')
             if school_name:
-                code = str(int(hashlib.md5(school_name.encode('utf-8')).hexdigest(), 16) % 100000)
-                # 尝试获取学校标签信息
-                try:
-                    school_info_df = data_service.load_school_info()
-                    if school_info_df is not None and not school_info_df.empty:
-                        school_col = None
-                        if '学校名称' in school_info_df.columns:
-                            school_col = '学校名称'
-                        elif '院校名称' in school_info_df.columns:
-                            school_col = '院校名称'
-                        
-                        if school_col:
-                            school_row = school_info_df[school_info_df[school_col] == school_name]
-                            if not school_row.empty:
-                                school_data = school_row.iloc[0]
-                                tags = {
-                                    'is_985': str(school_data.get('985', '')) == 'Y',
-                                    'is_211': '211' in str(school_data.get('办学层次', '')),
-                                    'is_double_first_class': str(school_data.get('双一流', '')) == 'Y',
-                                    'is_private': str(school_data.get('民办高校', '')) == 'Y',
-                                    'is_independent': str(school_data.get('独立学院', '')) == 'Y'
-                                }
-                            else:
-                                tags = {'is_985': False, 'is_211': False, 'is_double_first_class': False, 'is_private': False, 'is_independent': False}
-                        else:
-                            tags = {'is_985': False, 'is_211': False, 'is_double_first_class': False, 'is_private': False, 'is_independent': False}
-                    else:
-                        tags = {'is_985': False, 'is_211': False, 'is_double_first_class': False, 'is_private': False, 'is_independent': False}
-                except Exception:
-                    tags = {'is_985': False, 'is_211': False, 'is_double_first_class': False, 'is_private': False, 'is_independent': False}
+                code = registry.get_legacy_code(school_name)
+                # 获取学校标签信息
+                tags = school_tags.get_tags(school_name)
+                tags = {name: tags[name] for name in BASIC_TAGS}
                 
                 schools.append({
                     'name': school_name,
@@ -2007,22 +1718,17 @@ def volunteer_generate():
     preferences = data.get('preferences', {}) if data else {}
     algorithm = data.get('algorithm', 'weighted')  # 默认使用加权算法
     
-    # 获取学生信息（从存储或使用默认值）
-    student_info = volunteer_students_storage.get('current', {})
-    if not student_info:
-        # 如果没有保存的学生信息，使用默认值或从preferences中提取
-        student_info = {
-            'score': preferences.get('score', 600),
-            'rank': preferences.get('rank', 10000),
-            'subject_type': preferences.get('subject_type', '理科')
-        }
+    # 获取学生信息（从存储或从preferences中提取），缺失的分数/位次按换算表补全
+    student_info = _current_student_info(preferences)
     
-    # 使用推荐引擎生成志愿
+    # 使用推荐引擎生成志愿（按当前方案缓存推荐上下文，供后续重排复用）
     try:
+        current_plan_id = volunteer_students_storage.get('current_plan_id', 1)
         volunteers = analytics_engine.recommendation.generate_volunteers(
             student_info=student_info,
             preferences=preferences,
-            algorithm=algorithm  # 传递算法选择
+            algorithm=algorithm,  # 传递算法选择
+            session_id=str(current_plan_id)
         )
         
         # 确保有足够的数据
@@ -2031,7 +1737,6 @@ def volunteer_generate():
             volunteers = _generate_fallback_volunteers(student_info, preferences)
         
         # 保存到当前方案
-        current_plan_id = volunteer_students_storage.get('current_plan_id', 1)
         if str(current_plan_id) not in volunteer_plans_storage:
             from datetime import datetime
             volunteer_plans_storage[str(current_plan_id)] = {
@@ -2044,8 +1749,9 @@ def volunteer_generate():
         # 替换现有志愿
         volunteer_plans_storage[str(current_plan_id)]['volunteers'] = volunteers
         
-        # 记录使用的算法
+        # 记录使用的算法和偏好(供增量重排沿用)
         volunteer_plans_storage[str(current_plan_id)]['algorithm'] = algorithm
+        volunteer_plans_storage[str(current_plan_id)]['preferences'] = preferences
         
         algorithm_names = {
             'weighted': '多因素加权评分',
@@ -2077,6 +1783,88 @@ def volunteer_generate():
             'message': f'生成志愿时遇到问题，已使用后备方案生成{len(volunteers)}个志愿'
         })
 
+@app.route('/api/volunteer/rerank', methods=['POST'])
+def volunteer_rerank():
+    """调整偏好后增量重排志愿（复用缓存的推荐上下文）"""
+    data = request.get_json() or {}
+
+    # 未传完整偏好时沿用当前方案最近一次的偏好
+    current_plan_id = volunteer_students_storage.get('current_plan_id', 1)
+    plan = volunteer_plans_storage.get(str(current_plan_id))
+    preferences = data.get('preferences')
+    if preferences is None and plan is not None:
+        preferences = plan.get('preferences')
+
+    # 学生信息与生成时一致，才能命中该方案的推荐上下文
+    student_info = _current_student_info(preferences)
+
+    try:
+        result = analytics_engine.recommendation.rerank_volunteers(
+            student_info=student_info,
+            preferences=preferences,
+            add=data.get('add'),
+            remove=data.get('remove'),
+            weights=data.get('weights'),
+            session_id=str(current_plan_id)
+        )
+        volunteers = result['volunteers']
+
+        # 更新当前方案
+        if plan is not None:
+            plan['volunteers'] = volunteers
+            plan['preferences'] = result['preferences']
+            plan['algorithm'] = 'weighted'
+
+        return jsonify({
+            'success': True,
+            'data': {'volunteers': volunteers, 'preferences': result['preferences']},
+            'message': f'已按新偏好重排，共{len(volunteers)}个志愿'
+        })
+    except Exception as e:
+        import traceback
+        print(f"重排志愿失败: {e}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'data': {'volunteers': []}, 'message': '重排志愿失败'})
+
+@app.route('/api/volunteer/plan/optimize', methods=['POST'])
+def volunteer_plan_optimize():
+    """在冲/稳/保比例、每校专业数、分散度等约束下优化生成志愿方案"""
+    data = request.get_json() or {}
+    preferences = data.get('preferences') or {}
+
+    student_info = _current_student_info(preferences)
+
+    try:
+        result = analytics_engine.recommendation.optimize_plan(
+            student_info=student_info,
+            preferences=preferences,
+            constraints=data.get('constraints')
+        )
+        volunteers = result['volunteers']
+
+        # 保存到当前方案
+        current_plan_id = volunteer_students_storage.get('current_plan_id', 1)
+        if str(current_plan_id) not in volunteer_plans_storage:
+            volunteer_plans_storage[str(current_plan_id)] = {
+                'id': current_plan_id,
+                'name': f'方案{current_plan_id}',
+                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'volunteers': []
+            }
+        volunteer_plans_storage[str(current_plan_id)]['volunteers'] = volunteers
+        volunteer_plans_storage[str(current_plan_id)]['algorithm'] = 'optimized'
+
+        return jsonify({
+            'success': True,
+            'data': {'volunteers': volunteers, 'summary': result['summary']},
+            'message': f'成功生成{len(volunteers)}个志愿（约束优化）'
+        })
+    except Exception as e:
+        import traceback
+        print(f"优化志愿方案失败: {e}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'data': {'volunteers': []}, 'message': '优化志愿方案失败'})
+
 def _generate_fallback_volunteers(student_info, preferences):
     """后备方案：基于简单规则的志愿生成"""
     import random
@@ -2100,6 +1888,8 @@ def _generate_fallback_volunteers(student_info, preferences):
             filtered_df = df[(df[score_col] >= min_score) & (df[score_col] <= max_score)]
             
             if len(filtered_df) > 0:
+                registry = data_service.get_school_registry()
+
                 # 从真实数据中采样
                 sample_size = min(120, len(filtered_df))
                 sampled_df = filtered_df.sample(n=sample_size, replace=True)
@@ -2123,9 +1913,8 @@ def _generate_fallback_volunteers(student_info, preferences):
                     
                     probability = max(10, min(99, probability))
                     
-                    import hashlib
                     school_name = row[school_col]
-                    school_code = str(int(hashlib.md5(school_name.encode('utf-8')).hexdigest(), 16) % 100000)
+                    school_code = registry.get_legacy_code(school_name)
                     
                     # 计算风险等级
                     if probability >= 70:
@@ -2272,53 +2061,63 @@ def _generate_simulated_volunteers(score):
 
 @app.route('/api/chart/<chart_type>')
 def get_chart(chart_type):
-    """获取图表数据"""
+    """获取图表数据（按图表类型、筛选条件和数据版本缓存已序列化的输出）"""
     try:
-        import json
-        from utils.chart_renderer import ChartRenderer
-
-        chart_renderer = ChartRenderer()
-
-        # 从查询参数获取数据
-        chart_data = request.args.get('data')
-
-        if chart_data:
-            # 如果前端传递了数据，使用前端数据生成图表
-            data = json.loads(chart_data)
-            chart_json = chart_renderer.generate_chart(chart_type, data)
+        chart = chart_cache.get(chart_type, request.args)
+        if chart is None:
+            return '{}'
+
+        if chart.etag in request.if_none_match:
+            response = Response(status=304)
+        elif 'gzip' in request.accept_encodings:
+            response = Response(chart.gzip_body)
+            response.headers['Content-Encoding'] = 'gzip'
         else:
-            # 否则从后端获取数据并生成图表（支持筛选参数）
-            min_score = request.args.get('min_score', type=int)
-            max_score = request.args.get('max_score', type=int)
-            min_rank = request.args.get('min_rank', type=int)
-            max_rank = request.args.get('max_rank', type=int)
-            limit = request.args.get('limit', 15, type=int)
-
-            if chart_type == 'score_distribution':
-                data = analytics_engine.get_score_distribution(min_score, max_score)
-                chart_json = chart_renderer.generate_score_distribution_chart(data)
-            elif chart_type == 'rank_distribution':
-                data = analytics_engine.get_rank_distribution(min_rank, max_rank)
-                chart_json = chart_renderer.generate_rank_distribution_chart(data)
-            elif chart_type == 'top_universities':
-                data = analytics_engine.get_top_universities(limit, min_score, max_score)
-                chart_json = chart_renderer.generate_top_universities_chart(data)
-            elif chart_type == 'top_majors':
-                data = analytics_engine.get_top_majors(limit, min_score, max_score)
-                chart_json = chart_renderer.generate_top_majors_chart(data)
-            elif chart_type == 'score_radar':
-                data = analytics_engine.get_basic_statistics(min_score, max_score, min_rank, max_rank)
-                chart_json = chart_renderer.generate_radar_chart(data)
-            else:
-                chart_json = json.dumps({})
-
-        return chart_json
+            response = Response(chart.body)
+        # 与原接口一致按文本返回（前端自行 JSON.parse）
+        response.content_type = 'text/html; charset=utf-8'
+        response.set_etag(chart.etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         import traceback
         print(f"图表生成失败: {e}")
         traceback.print_exc()
         return jsonify({})
 
+@app.route('/api/chart/<chart_type>/image')
+def get_chart_image(chart_type):
+    """获取图表静态图片（PNG/SVG，服务端渲染，按图表内容哈希缓存到磁盘）"""
+    try:
+        fmt = request.args.get('format', 'png').lower()
+        if fmt not in chart_image_renderer.FORMATS:
+            return jsonify({'error': f'不支持的图片格式: {fmt}'}), 400
+        if not chart_image_renderer.available:
+            return jsonify({'error': '服务端图片渲染不可用（未安装kaleido）'}), 503
+
+        chart = chart_cache.get(chart_type, request.args)
+        if chart is None:
+            return jsonify({'error': f'未知的图表类型: {chart_type}'}), 404
+
+        # 缓存键只取决于图表内容和尺寸，客户端已有同一图片时无需渲染
+        width, height = request.args.get('width', type=int), request.args.get('height', type=int)
+        key, width, height = chart_image_renderer.resolve(chart.figure, fmt, width, height)
+        if key in request.if_none_match:
+            response = Response(status=304)
+        else:
+            image = chart_image_renderer.render(chart.figure, fmt, width, height,
+                                                version=data_service.get_dataset_version())
+            response = Response(image['content'], mimetype=image['mimetype'])
+        response.set_etag(key)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        import traceback
+        print(f"图表图片渲染失败: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 # ============ 健康检查 ============
 
 @app.route('/health')
@@ -9,6 +9,8 @@ from .statistics import StatisticsAnalyzer
 from .search import SearchEngine
 from .probability import ProbabilityCalculator
 from .recommendation import RecommendationEngine
+from .prediction import PredictionEngine
+from .simulation import PlanSimulator
 from utils.logger import get_logger
 
 
@@ -30,6 +32,8 @@ class AnalyticsEngine:
         self.search = SearchEngine(data_processor)
         self.probability = ProbabilityCalculator(data_processor)
         self.recommendation = RecommendationEngine(data_processor)
+        self.prediction = PredictionEngine(data_processor)
+        self.simulation = PlanSimulator(self.prediction, data_service=data_processor)
     
     def get_basic_statistics(self, min_score: Optional[int] = None, 
                              max_score: Optional[int] = None,
@@ -50,6 +54,19 @@ class AnalyticsEngine:
         """获取位次分布"""
         return self.statistics.get_rank_distribution(min_rank, max_rank)
     
+    def get_rollup(self, group_by: Optional[str] = None,
+                   years: Optional[List[int]] = None,
+                   provinces: Optional[List[str]] = None,
+                   min_score: Optional[int] = None,
+                   max_score: Optional[int] = None,
+                   min_rank: Optional[int] = None,
+                   max_rank: Optional[int] = None,
+                   score_bucket: int = 10,
+                   **tag_flags: Optional[bool]) -> List[Dict[str, Any]]:
+        """获取看板多维上卷统计"""
+        return self.statistics.get_rollup(group_by, years, provinces, min_score, max_score,
+                                          min_rank, max_rank, score_bucket, **tag_flags)
+    
     def get_top_universities(self, limit: int = 20,
                             min_score: Optional[int] = None,
                             max_score: Optional[int] = None,
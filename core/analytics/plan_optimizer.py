@@ -0,0 +1,187 @@
+"""
+志愿方案优化器
+在预先计算的录取概率和效用上,按冲/稳/保比例、每校专业数上限、城市和学科分散度、
+最少保底数量等约束贪心选取志愿,使方案的期望录取效用最大
+"""
+
+from typing import Dict, Any, List, Optional
+import numpy as np
+from utils.logger import get_logger
+
+
+class PlanOptimizer:
+    """约束下的志愿方案贪心优化"""
+
+    CATEGORIES = ('冲刺', '稳健', '保底')
+
+    # 录取概率(%)区间划分冲/稳/保,低于冲刺下限的候选不入选
+    PROBABILITY_BANDS = {'冲刺': (10, 50), '稳健': (50, 80), '保底': (80, 101)}
+
+    DEFAULT_CONSTRAINTS = {
+        'total': 120,
+        'ratios': {'冲刺': 0.3, '稳健': 0.4, '保底': 0.3},
+        'min_safe': 20,
+        'max_per_school': 6,
+        'max_per_city': 40,
+        'max_per_discipline': 15
+    }
+
+    def __init__(self, constraints: Optional[Dict[str, Any]] = None):
+        """
+        初始化优化器
+
+        Args:
+            constraints: 约束配置(缺省项使用 DEFAULT_CONSTRAINTS)
+        """
+        self.logger = get_logger("PlanOptimizer")
+        self.constraints = {**self.DEFAULT_CONSTRAINTS, **(constraints or {})}
+        self.constraints['ratios'] = {
+            **self.DEFAULT_CONSTRAINTS['ratios'], **((constraints or {}).get('ratios') or {})
+        }
+
+    def categorize(self, probabilities: np.ndarray) -> np.ndarray:
+        """
+        按录取概率划分类别
+
+        Args:
+            probabilities: 录取概率(%)
+
+        Returns:
+            类别下标数组(对应 CATEGORIES,不入选为-1)
+        """
+        categories = np.full(len(probabilities), -1, dtype=np.int8)
+        for i, name in enumerate(self.CATEGORIES):
+            low, high = self.PROBABILITY_BANDS[name]
+            categories[(probabilities >= low) & (probabilities < high)] = i
+        return categories
+
+    def quotas(self) -> np.ndarray:
+        """
+        计算各类别名额(保底名额不少于 min_safe,总数等于 total)
+
+        Returns:
+            各类别名额数组
+        """
+        total = int(self.constraints['total'])
+        ratios = self.constraints['ratios']
+        quotas = np.array([int(round(total * ratios.get(name, 0))) for name in self.CATEGORIES])
+        safe = self.CATEGORIES.index('保底')
+        quotas[safe] = min(total, max(quotas[safe], int(self.constraints['min_safe'])))
+
+        # 调整其他类别使总数一致
+        others = [i for i in range(len(quotas)) if i != safe]
+        while quotas.sum() > total:
+            i = max(others, key=lambda k: quotas[k])
+            quotas[i] -= 1
+        while quotas.sum() < total:
+            i = max(others, key=lambda k: ratios.get(self.CATEGORIES[k], 0))
+            quotas[i] += 1
+        return quotas
+
+    def optimize(self, probabilities: np.ndarray, utilities: np.ndarray,
+                 school_ids: np.ndarray, city_ids: np.ndarray,
+                 discipline_ids: np.ndarray) -> Dict[str, Any]:
+        """
+        贪心选取志愿方案
+
+        1. 各类别内按期望效用(效用 × 录取概率)从高到低选取,直到名额用完
+        2. 名额未满的类别由其他类别的剩余候选补足
+        3. 仍不足时放宽城市和学科分散度约束(每校上限始终保持)
+
+        Args:
+            probabilities: 录取概率(%)
+            utilities: 候选效用(0-100)
+            school_ids: 院校编号(整数)
+            city_ids: 城市编号(整数,未知为-1)
+            discipline_ids: 学科编号(整数)
+
+        Returns:
+            {'selected': 按填报顺序排列的候选下标, 'categories': 对应类别, 'summary': 方案统计}
+        """
+        probabilities = np.asarray(probabilities, dtype=float)
+        utilities = np.asarray(utilities, dtype=float)
+        categories = self.categorize(probabilities)
+        values = utilities * probabilities / 100
+        order = np.lexsort((-utilities, -values))
+
+        quotas = self.quotas()
+        total = int(quotas.sum())
+        max_school = self.constraints['max_per_school']
+        max_city = self.constraints['max_per_city']
+        max_discipline = self.constraints['max_per_discipline']
+
+        school_counts: Dict[int, int] = {}
+        city_counts: Dict[int, int] = {}
+        discipline_counts: Dict[int, int] = {}
+        filled = np.zeros(len(self.CATEGORIES), dtype=int)
+        chosen = np.zeros(len(probabilities), dtype=bool)
+        assigned = np.full(len(probabilities), -1, dtype=np.int8)
+
+        def try_pick(i: int, category: int, diversity: bool) -> bool:
+            school, city, discipline = int(school_ids[i]), int(city_ids[i]), int(discipline_ids[i])
+            if max_school and school_counts.get(school, 0) >= max_school:
+                return False
+            if diversity:
+                if max_city and city >= 0 and city_counts.get(city, 0) >= max_city:
+                    return False
+                if max_discipline and discipline_counts.get(discipline, 0) >= max_discipline:
+                    return False
+            school_counts[school] = school_counts.get(school, 0) + 1
+            city_counts[city] = city_counts.get(city, 0) + 1
+            discipline_counts[discipline] = discipline_counts.get(discipline, 0) + 1
+            chosen[i] = True
+            assigned[i] = category
+            filled[category] += 1
+            return True
+
+        candidates = order[categories[order] >= 0]
+        by_category = [candidates[categories[candidates] == c] for c in range(len(self.CATEGORIES))]
+
+        # 1. 各类别按名额选取
+        for c, members in enumerate(by_category):
+            for i in members:
+                if filled[c] >= quotas[c]:
+                    break
+                try_pick(int(i), c, diversity=True)
+
+        # 2. 剩余名额由全部候选补足; 3. 放宽分散度约束
+        for diversity in (True, False):
+            for i in candidates:
+                if filled.sum() >= total:
+                    break
+                if not chosen[i]:
+                    try_pick(int(i), int(categories[i]), diversity)
+
+        # 填报顺序: 冲刺 -> 稳健 -> 保底, 同类别内效用高者在前
+        selected = np.flatnonzero(chosen)
+        selected = selected[np.lexsort((-utilities[selected], assigned[selected]))]
+        return {
+            'selected': selected,
+            'categories': [self.CATEGORIES[c] for c in assigned[selected]],
+            'summary': self.summarize(probabilities[selected], utilities[selected], assigned[selected])
+        }
+
+    def summarize(self, probabilities: np.ndarray, utilities: np.ndarray,
+                  categories: np.ndarray) -> Dict[str, Any]:
+        """
+        统计方案(平行志愿按顺序投档,假设各志愿相互独立)
+
+        Args:
+            probabilities: 方案中各志愿录取概率(%),按填报顺序
+            utilities: 方案中各志愿效用
+            categories: 方案中各志愿类别下标
+
+        Returns:
+            各类别数量、至少录取一个的概率、期望效用
+        """
+        p = probabilities / 100
+        # 投档到第i个志愿的概率: 前面志愿都未录取
+        reach = np.concatenate([[1.0], np.cumprod(1 - p)[:-1]]) if len(p) else p
+        return {
+            'count': int(len(p)),
+            'category_counts': {
+                name: int(np.sum(categories == i)) for i, name in enumerate(self.CATEGORIES)
+            },
+            'admission_probability': round(float(1 - np.prod(1 - p)) * 100, 2) if len(p) else 0.0,
+            'expected_utility': round(float(np.sum(utilities * p * reach)), 2) if len(p) else 0.0
+        }
@@ -0,0 +1,314 @@
+"""
+位次预测模块
+基于 (对象 × 年份) 位次矩阵,使用NumPy一次性计算所有对象的
+加权移动平均预测值、置信区间和趋势
+"""
+
+import numpy as np
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+from core.data.volatility_table import VolatilityTable
+from utils.logger import get_logger
+
+
+class RankPredictor:
+    """批量位次预测器"""
+
+    # 按距最近有效年份的远近取权重(与原有单校预测保持一致)
+    WEIGHTS = (1, 2, 3)
+
+    CONFIDENCE_LABELS = {3: 'high', 2: 'medium'}
+
+    # 位次波动较大时置信度下调一级
+    CONFIDENCE_DOWNGRADE = {'high': 'medium', 'medium': 'low'}
+
+    def __init__(self, keys: Sequence[str], years: Sequence[int], rank_matrix: np.ndarray,
+                 rank_to_score: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                 volatility: Optional[VolatilityTable] = None):
+        """
+        构建预测器并计算全部预测结果
+
+        Args:
+            keys: 预测对象标识(与矩阵行对应)
+            years: 年份(与矩阵列对应,升序)
+            rank_matrix: 位次矩阵,缺失值为NaN
+            rank_to_score: 位次换算同位分的函数(可选,提供时预测结果附带同位分)
+            volatility: 同一矩阵的波动指标表(可选,提供时直接使用其标准差和跳变,预测结果附带波动指标)
+        """
+        self.logger = get_logger("RankPredictor")
+        self.keys: List[str] = list(keys)
+        self.years: List[int] = list(years)
+        self.index: Dict[str, int] = {key: i for i, key in enumerate(self.keys)}
+
+        ranks = np.asarray(rank_matrix, dtype=float).reshape(len(self.keys), len(self.years))
+        valid = np.isfinite(ranks) & (ranks > 0)
+        self.ranks = np.where(valid, ranks, np.nan)
+        self.year_count = valid.sum(axis=1)
+        if volatility is None:
+            volatility = VolatilityTable(self.keys, self.years, self.ranks)
+        self.volatility = volatility
+
+        self._compute(valid)
+
+        # 预测位次对应的同位分(参考年份分数),构建时一次换算
+        self.predicted_scores: Optional[np.ndarray] = None
+        if rank_to_score is not None:
+            finite = np.isfinite(self.predicted)
+            self.predicted_scores = np.full(len(self.keys), np.nan)
+            if finite.any():
+                self.predicted_scores[finite] = rank_to_score(self.predicted[finite])
+        self.logger.info(f"批量预测完成: 对象={len(self.keys)}, 年份={self.years}")
+
+    def _compute(self, valid: np.ndarray) -> None:
+        """计算预测值、置信区间和趋势"""
+        ranks = np.nan_to_num(self.ranks)
+
+        # 每个有效年份距最近有效年份的序号(0为最近一年)
+        from_end = np.cumsum(valid[:, ::-1], axis=1)[:, ::-1] - 1
+        weights = np.zeros_like(ranks)
+        for offset, weight in enumerate(self.WEIGHTS):
+            weights[valid & (from_end == offset)] = weight
+
+        weight_total = weights.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.predicted = np.where(
+                weight_total > 0, (ranks * weights).sum(axis=1) / weight_total, np.nan
+            )
+
+        # 最近两个有效年份
+        latest = (ranks * (valid & (from_end == 0))).sum(axis=1)
+        previous = (ranks * (valid & (from_end == 1))).sum(axis=1)
+
+        # 置信区间: 3年及以上用标准差,2年用相邻两年差值(唯一一次跳变),其余±10%
+        count = self.year_count
+        half_width = np.where(count >= 3, self.volatility.rank_std,
+                              np.where(count == 2, self.volatility.max_jump, np.nan))
+
+        self.lower = np.where(count >= 2, self.predicted - half_width, self.predicted * 0.9)
+        self.upper = np.where(count >= 2, self.predicted + half_width, self.predicted * 1.1)
+
+        # 趋势: -1 位次上升, 1 位次下降, 0 保持稳定
+        self.trend = np.where(count >= 2, np.sign(latest - previous), np.nan)
+
+        # 最小二乘线性趋势(每年位次变化量)
+        x = np.where(valid, np.asarray(self.years, dtype=float)[None, :], 0.0)
+        mean = np.nan_to_num(self.volatility.mean_rank)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_mean = x.sum(axis=1) / np.maximum(count, 1)
+            x_dev = np.where(valid, x - x_mean[:, None], 0.0)
+            sxx = (x_dev ** 2).sum(axis=1)
+            sxy = (x_dev * np.where(valid, ranks - mean[:, None], 0.0)).sum(axis=1)
+            self.slope = np.where(sxx > 0, sxy / np.where(sxx > 0, sxx, 1.0), np.nan)
+
+    def get(self, key: str, min_years: int = 2) -> Optional[Dict[str, Any]]:
+        """
+        获取单个对象的预测结果
+
+        Args:
+            key: 预测对象标识
+            min_years: 最少有效年份数
+
+        Returns:
+            预测结果字典,数据不足返回None
+        """
+        i = self.index.get(key)
+        if i is None or self.year_count[i] < min_years:
+            return None
+        return self._result(i)
+
+    def _result(self, i: int) -> Dict[str, Any]:
+        """构造单行预测结果"""
+        count = int(self.year_count[i])
+        trend = self.trend[i]
+        confidence = self.CONFIDENCE_LABELS.get(min(count, 3), 'low')
+        if self.volatility.is_volatile(np.array([i]))[0]:
+            confidence = self.CONFIDENCE_DOWNGRADE.get(confidence, confidence)
+        result = {
+            'predicted_rank': round(float(self.predicted[i])),
+            'confidence': confidence,
+            'confidence_interval': [round(float(self.lower[i])), round(float(self.upper[i]))],
+            'trend': int(trend) if np.isfinite(trend) else None,
+            'annual_change': round(float(self.slope[i]), 1) if np.isfinite(self.slope[i]) else None,
+            'year_count': count,
+            'volatility': self.volatility.row(i)
+        }
+        if self.predicted_scores is not None and np.isfinite(self.predicted_scores[i]):
+            result['predicted_score'] = int(round(float(self.predicted_scores[i])))
+        return result
+
+    def rank_order(self, year: int, min_years: int = 2) -> List[str]:
+        """
+        按指定年份位次升序返回对象标识(该年份无数据的对象排除)
+
+        Args:
+            year: 排序年份
+            min_years: 最少有效年份数
+        """
+        if year not in self.years:
+            return []
+        column = self.ranks[:, self.years.index(year)]
+        candidates = np.flatnonzero(np.isfinite(column) & (self.year_count >= min_years))
+        order = candidates[np.argsort(column[candidates], kind='stable')]
+        return [self.keys[i] for i in order]
+
+
+class PredictionEngine:
+    """位次预测引擎"""
+
+    PREDICT_YEARS = (2023, 2024, 2025)
+
+    TREND_LABELS = {-1: '位次上升', 1: '位次下降', 0: '保持稳定'}
+
+    def __init__(self, data_processor):
+        """
+        初始化预测引擎
+
+        Args:
+            data_processor: 数据处理器
+        """
+        self.data_processor = data_processor
+        self.logger = get_logger("PredictionEngine")
+        self._school_predictor: Optional[RankPredictor] = None
+        self._major_predictor: Optional[RankPredictor] = None
+        self._major_labels: Dict[str, Dict[str, str]] = {}
+        self._version: Optional[str] = None
+
+    def _check_version(self) -> None:
+        """数据版本变化时丢弃已构建的预测表"""
+        version = self.data_processor.get_dataset_version()
+        if self._version != version:
+            self._school_predictor = None
+            self._major_predictor = None
+            self._version = version
+
+    def _rank_to_score(self) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+        """获取位次换算同位分(最新年份分数)的函数,无换算表时返回None"""
+        try:
+            table = self.data_processor.get_score_rank_table()
+            table.get_curve()
+        except Exception as e:
+            self.logger.warning(f"分数-位次换算表不可用: {e}")
+            return None
+        return table.rank_to_score
+
+    def _restrict(self, volatility: VolatilityTable) -> VolatilityTable:
+        """将波动指标表限定到预测年份(年份一致时直接复用)"""
+        if volatility.years == list(self.PREDICT_YEARS):
+            return volatility
+        columns = [volatility.years.index(year) if year in volatility.years else -1 for year in self.PREDICT_YEARS]
+        matrix = np.where(np.array(columns) >= 0, volatility.ranks[:, np.maximum(columns, 0)], np.nan)
+        keep = np.isfinite(matrix).any(axis=1)
+        return VolatilityTable(volatility.keys[keep], self.PREDICT_YEARS, matrix[keep])
+
+    def get_school_predictor(self) -> RankPredictor:
+        """
+        获取院校位次预测器(每个数据版本构建一次)
+
+        Returns:
+            RankPredictor: 以院校名称为键的预测器
+        """
+        self._check_version()
+        if self._school_predictor is None:
+            volatility = self._restrict(self.data_processor.get_school_volatility())
+            self._school_predictor = RankPredictor(
+                list(volatility.keys), volatility.years, volatility.ranks, self._rank_to_score(), volatility
+            )
+        return self._school_predictor
+
+    def get_major_predictor(self) -> RankPredictor:
+        """
+        获取专业位次预测器(每个数据版本构建一次)
+
+        Returns:
+            RankPredictor: 以 major_id 为键的预测器
+        """
+        self._check_version()
+        if self._major_predictor is None:
+            rows = self.data_processor.get_major_linker().get_rows()
+            rows = rows[rows['year'].isin(self.PREDICT_YEARS) & (rows['major_id'] >= 0)]
+            volatility = self._restrict(self.data_processor.get_major_volatility())
+            keys = [str(sid) for sid in volatility.keys]
+
+            # major_id -> 最近年份的院校和专业名称
+            labels: Dict[str, Dict[str, str]] = {}
+            ordered = rows.sort_values(['year', 'school_code', 'major_code'], ascending=[False, True, True])
+            for school_name, major_name, sid in zip(ordered['school_name'], ordered['major_name'], ordered['major_id']):
+                labels.setdefault(str(sid), {'school_name': school_name, 'major_name': major_name})
+
+            self._major_labels = labels
+            self._major_predictor = RankPredictor(
+                keys, volatility.years, volatility.ranks, self._rank_to_score(), volatility
+            )
+        return self._major_predictor
+
+    def predict_school(self, school_name: str) -> Optional[Dict[str, Any]]:
+        """
+        预测单个院校下一年位次
+
+        Args:
+            school_name: 院校名称
+
+        Returns:
+            预测结果,数据不足返回None
+        """
+        return self.get_school_predictor().get(school_name)
+
+    def predict_schools(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        批量预测院校下一年位次(按最近一年位次升序)
+
+        Args:
+            limit: 返回数量,为None或不大于0时返回全部
+
+        Returns:
+            包含院校名称和预测结果的列表
+        """
+        predictor = self.get_school_predictor()
+        names = predictor.rank_order(self.PREDICT_YEARS[-1])
+        if limit is not None and limit > 0:
+            names = names[:limit]
+        return [{'name': name, 'prediction': predictor.get(name)} for name in names]
+
+    def predict_major(self, school_name: str, major_name: str) -> Optional[Dict[str, Any]]:
+        """
+        预测单个专业下一年位次
+
+        Args:
+            school_name: 院校名称
+            major_name: 专业名称
+
+        Returns:
+            预测结果(含专业序列信息),未找到或数据不足返回None
+        """
+        predictor = self.get_major_predictor()
+        found = self.data_processor.get_major_linker().lookup_ids([school_name], [major_name])[0]
+        if found < 0:
+            return None
+        major_id = str(found)
+        result = predictor.get(major_id)
+        if result is None:
+            return None
+        result.update(self._major_labels.get(major_id, {}))
+        result['major_id'] = int(major_id)
+        return result
+
+    def estimate_major_ranks(self, pairs: Sequence[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批量获取专业下一年录取位次的预测值和置信区间半宽
+
+        Args:
+            pairs: (院校名称, 专业名称) 序列
+
+        Returns:
+            (预测位次, 区间半宽),未找到的专业为NaN
+        """
+        predictor = self.get_major_predictor()
+        school_names = [school_name for school_name, _ in pairs]
+        major_names = [major_name for _, major_name in pairs]
+        major_ids = self.data_processor.get_major_linker().lookup_ids(school_names, major_names)
+        rows = np.array([predictor.index.get(str(major_id), -1) for major_id in major_ids], dtype=np.int64)
+        found = rows >= 0
+        predicted = np.full(len(rows), np.nan)
+        half_width = np.full(len(rows), np.nan)
+        predicted[found] = predictor.predicted[rows[found]]
+        half_width[found] = (predictor.upper[rows[found]] - predictor.lower[rows[found]]) / 2
+        return predicted, half_width
@@ -0,0 +1,94 @@
+"""
+志愿偏好过滤器
+每次请求将用户偏好(地区、专业、院校类型)一次性编译为候选池上的布尔掩码,
+推荐引擎按位次切片后只需做数组索引和按位与
+"""
+
+from typing import Dict, Any, List, MutableMapping, Optional, Tuple
+import numpy as np
+from core.data.school_tags import TAG_985, TAG_211, TAG_DOUBLE_FIRST_CLASS
+from utils.logger import get_logger
+
+
+class PreferenceFilter:
+    """编译后的偏好过滤条件"""
+
+    # 院校类型偏好对应的标签位(满足任一位即可,高层次院校同时满足低层次偏好)
+    SCHOOL_TYPE_BITS = {
+        '985': TAG_985,
+        '211': TAG_985 | TAG_211,
+        '双一流': TAG_985 | TAG_211 | TAG_DOUBLE_FIRST_CLASS,
+    }
+
+    def __init__(self, pool, preferences: Optional[Dict[str, Any]] = None,
+                 mask_cache: Optional[MutableMapping[Tuple[str, str], np.ndarray]] = None):
+        """
+        编译偏好
+
+        Args:
+            pool: 候选池(CandidatePool)
+            preferences: 用户偏好 {locations, majors, school_types}
+            mask_cache: 单个关键词掩码的缓存(跨请求复用时传入,偏好增减只需计算新增关键词)
+        """
+        self.logger = get_logger("PreferenceFilter")
+        self.pool = pool
+        self.mask_cache = mask_cache if mask_cache is not None else {}
+        preferences = preferences or {}
+
+        # 院校维度: 地区匹配
+        self.location_match: Optional[np.ndarray] = None
+        if preferences.get('locations'):
+            self.location_match = self._keyword_union('location', preferences['locations'], pool.location_mask)
+
+        # 记录维度: 专业匹配
+        self.major_match: Optional[np.ndarray] = None
+        if preferences.get('majors'):
+            self.major_match = self._keyword_union('major', preferences['majors'], pool.major_mask)
+
+        school_mask = np.ones(len(pool.school_names), dtype=bool)
+        if self.location_match is not None:
+            school_mask &= self.location_match
+
+        # 院校维度: 院校类型(多选时取最严格的类型)
+        for school_type, bits in self.SCHOOL_TYPE_BITS.items():
+            if school_type in (preferences.get('school_types') or []):
+                school_mask &= (pool.tag_masks & bits) > 0
+        self.school_mask = school_mask
+
+    def _keyword_union(self, kind: str, keywords: List[str], build) -> np.ndarray:
+        """
+        按关键词逐个取(或计算并缓存)掩码后取并集
+
+        Args:
+            kind: 掩码类型(location/major)
+            keywords: 关键词列表
+            build: 由关键词列表计算掩码的函数
+
+        Returns:
+            布尔数组
+        """
+        union = None
+        for keyword in keywords:
+            key = (kind, keyword)
+            mask = self.mask_cache.get(key)
+            if mask is None:
+                mask = build([keyword])
+                self.mask_cache[key] = mask
+            union = mask.copy() if union is None else union | mask
+        return union
+
+    def row_mask(self, start: int, end: int) -> np.ndarray:
+        """
+        计算候选池 [start, end) 区间内满足偏好的记录掩码
+
+        Args:
+            start: 起始下标
+            end: 结束下标
+
+        Returns:
+            布尔数组
+        """
+        mask = self.school_mask[self.pool.school_idx[start:end]]
+        if self.major_match is not None:
+            mask &= self.major_match[start:end]
+        return mask
@@ -3,9 +3,8 @@
 提供录取概率计算功能
 """
 
-import pandas as pd
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from utils.logger import get_logger
 
 
@@ -36,60 +35,120 @@ class ProbabilityCalculator:
         Returns:
             概率计算结果
         """
-        df = self.data_processor.get_data()
-        
-        # 筛选指定专业
-        records = df[
-            (df['招生院校'] == school_name) & 
-            (df['招生专业'] == major_name)
-        ]
-        
-        if len(records) == 0:
-            return {
-                'error': '未找到该专业',
+        return self._calculate([school_name], [major_name], score, rank)[0]
+
+    def _calculate(self, school_names: List[str], major_names: List[str],
+                   score: int, rank: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        按 (院校, 专业) 索引一次连接全部目标并向量化计算录取概率
+
+        Args:
+            school_names: 学校名称列表
+            major_names: 专业名称列表(与学校名称等长)
+            score: 考生分数
+            rank: 考生位次
+
+        Returns:
+            概率结果列表(与目标顺序一致)
+        """
+        index = self.data_processor.get_admission_index()
+        positions = index.lookup(school_names, major_names)
+        found = positions >= 0
+        rows = positions[found]
+
+        # 同一专业多条记录取均值
+        admission_scores = index.scores[rows]
+        admission_ranks = index.ranks[rows]
+        volatility = self._major_volatility(
+            [s for s, ok in zip(school_names, found) if ok], [m for m, ok in zip(major_names, found) if ok]
+        )
+        probabilities = self._probabilities(score, rank, admission_scores, admission_ranks, volatility)
+
+        results = []
+        found_iter = iter(zip(admission_scores, admission_ranks, probabilities))
+        for school_name, major_name, ok in zip(school_names, major_names, found):
+            if not ok:
+                results.append({
+                    'error': '未找到该专业',
+                    'school_name': school_name,
+                    'major_name': major_name
+                })
+                continue
+            admission_score, admission_rank, probability = next(found_iter)
+            results.append({
                 'school_name': school_name,
-                'major_name': major_name
-            }
-        
-        # 获取历史数据
-        admission_score = records['投档最低分'].mean()
-        admission_rank = records['位次'].mean()
-        
-        # 计算概率
-        if rank is not None:
-            # 基于位次计算
-            if score > admission_score:
-                probability = 0.95
-            elif score >= admission_score - 10:
-                probability = 0.70
-            elif score >= admission_score - 20:
-                probability = 0.50
-            else:
-                probability = 0.30
-        else:
-            # 基于分数计算
-            if score > admission_score + 10:
-                probability = 0.95
-            elif score > admission_score:
-                probability = 0.80
-            elif score >= admission_score - 10:
-                probability = 0.60
-            elif score >= admission_score - 20:
-                probability = 0.40
-            else:
-                probability = 0.20
-        
-        return {
-            'school_name': school_name,
-            'major_name': major_name,
-            'student_score': score,
-            'student_rank': rank,
-            'admission_score': int(admission_score),
-            'admission_rank': int(admission_rank) if not pd.isna(admission_rank) else None,
-            'probability': float(f"{probability:.2f}"),
-            'level': self._get_probability_level(probability)
-        }
-    
+                'major_name': major_name,
+                'student_score': score,
+                'student_rank': rank,
+                'admission_score': int(admission_score) if not np.isnan(admission_score) else None,
+                'admission_rank': int(admission_rank) if not np.isnan(admission_rank) else None,
+                'probability': float(f"{probability:.2f}"),
+                'level': self._get_probability_level(probability)
+            })
+        return results
+
+    def _major_volatility(self, school_names: List[str], major_names: List[str]) -> np.ndarray:
+        """
+        查专业波动指标表获取各专业的对数位次年际波动
+
+        Args:
+            school_names: 学校名称列表
+            major_names: 专业名称列表
+
+        Returns:
+            波动数组,无历史数据的专业为NaN
+        """
+        table = self.data_processor.get_major_volatility()
+        major_ids = self.data_processor.get_major_linker().lookup_ids(school_names, major_names)
+        return table.column('log_volatility', table.lookup(major_ids))
+
+    def _probabilities(self, score: int, rank: Optional[int], admission_scores: np.ndarray,
+                       admission_ranks: np.ndarray, volatility: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        向量化计算录取概率(录取概率曲线模型)
+
+        考生缺位次、专业缺投档位次时按最新年份的分数-位次换算表由分数换算;
+        仍无法得到位次的专业按分数差分档
+
+        Args:
+            score: 考生分数
+            rank: 考生位次
+            admission_scores: 各专业投档最低分
+            admission_ranks: 各专业投档位次
+            volatility: 各专业对数位次年际波动(可选)
+
+        Returns:
+            录取概率数组 (0-1)
+        """
+        probabilities = np.select(
+            [score > admission_scores + 10, score > admission_scores,
+             score >= admission_scores - 10, score >= admission_scores - 20],
+            [0.95, 0.80, 0.60, 0.40], 0.20
+        )
+        if not len(admission_scores):
+            return probabilities
+
+        cutoff_ranks = admission_ranks.copy()
+        student_rank = rank
+        missing = np.isnan(cutoff_ranks) & ~np.isnan(admission_scores)
+        if rank is None or missing.any():
+            try:
+                table = self.data_processor.get_score_rank_table()
+                if rank is None and score is not None:
+                    student_rank = table.score_to_rank(score)
+                if missing.any():
+                    cutoff_ranks[missing] = table.score_to_rank(admission_scores[missing])
+            except ValueError as e:
+                self.logger.warning(f"分数-位次换算失败: {e}")
+
+        use = ~np.isnan(cutoff_ranks)
+        if student_rank is not None and use.any():
+            model = self.data_processor.get_probability_model()
+            probabilities[use] = model.predict_ranks(
+                student_rank, cutoff_ranks[use], volatility[use] if volatility is not None else None
+            )
+        return probabilities
+
     def _get_probability_level(self, probability: float) -> str:
         """获取概率等级"""
         if probability >= 0.8:
@@ -116,15 +175,12 @@ class ProbabilityCalculator:
         Returns:
             概率结果列表
         """
-        results = []
-        for target in target_list:
-            result = self.calculate_probability(
-                target['school_name'],
-                target['major_name'],
-                score,
-                rank
-            )
-            results.append(result)
+        results = self._calculate(
+            [target['school_name'] for target in target_list],
+            [target['major_name'] for target in target_list],
+            score,
+            rank
+        )
         
         # 按概率排序
         results.sort(key=lambda x: x.get('probability', 0), reverse=True)
@@ -0,0 +1,363 @@
+"""
+录取概率曲线模型
+按参考录取位次分段,用相邻年份专业录取位次的对数变化拟合每段一条逻辑曲线:
+    P(录取) = σ((log(1 + 位次余量) + loc) / scale)
+位次余量 = (参考录取位次 - 学生位次) / 学生位次;
+loc 为该段录取位次的系统性漂移,scale 为该段的年际波动。
+单个专业自身的波动(volatility)与分段波动合成有效波动,推理为纯向量运算
+
+曲线可离线训练并保存为模型文件,启动时直接加载:
+    python -m core.analytics.probability_model
+"""
+
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+from utils.logger import get_logger
+
+
+DEFAULT_MODEL_PATH = Path("cache") / "admission_model.json"
+
+
+class ProbabilityModel:
+    """分位次段的录取概率逻辑曲线"""
+
+    # 参考录取位次分段边界
+    RANK_BANDS = (1000, 3000, 10000, 30000, 60000)
+
+    # 拟合时的位次余量网格(对数)
+    MARGIN_GRID = np.linspace(-0.6, 0.6, 25)
+
+    # 每段最少样本数,不足时使用全体样本的曲线
+    MIN_SAMPLES = 50
+
+    # 无数据时的默认曲线与 scale 下限
+    DEFAULT_LOC = 0.0
+    DEFAULT_SCALE = 0.08
+    MIN_SCALE = 0.02
+
+    # 专业自身波动在有效波动中的权重
+    VOLATILITY_WEIGHT = 0.5
+
+    # 逻辑分布标准差与 scale 之比
+    LOGISTIC_STD = np.pi / np.sqrt(3)
+
+    # 模型文件格式版本,格式变化时旧文件失效
+    FORMAT_VERSION = 1
+
+    def __init__(self, locs: np.ndarray, scales: np.ndarray, pooled: Tuple[float, float] = (DEFAULT_LOC, DEFAULT_SCALE),
+                 metadata: Optional[Dict[str, Any]] = None):
+        """
+        初始化模型
+
+        Args:
+            locs: 各位次段的 loc
+            scales: 各位次段的 scale
+            pooled: 全体样本的 (loc, scale),不指定位次时使用
+            metadata: 拟合信息(样本数、评估指标等)
+        """
+        self.locs = np.asarray(locs, dtype=float)
+        self.scales = np.maximum(np.asarray(scales, dtype=float), self.MIN_SCALE)
+        self.pooled_loc, self.pooled_scale = float(pooled[0]), max(float(pooled[1]), self.MIN_SCALE)
+        self.metadata = metadata or {}
+
+    @classmethod
+    def default(cls) -> 'ProbabilityModel':
+        """无训练数据时的默认模型"""
+        n = len(cls.RANK_BANDS) + 1
+        return cls(np.full(n, cls.DEFAULT_LOC), np.full(n, cls.DEFAULT_SCALE),
+                   metadata={'fitted': False})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可保存的字典"""
+        return {
+            'format_version': self.FORMAT_VERSION,
+            'rank_bands': list(self.RANK_BANDS),
+            'locs': self.locs.tolist(),
+            'scales': self.scales.tolist(),
+            'pooled': [self.pooled_loc, self.pooled_scale],
+            'metadata': self.metadata
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional['ProbabilityModel']:
+        """
+        由字典还原模型
+
+        Returns:
+            ProbabilityModel,格式版本或位次分段不一致时返回None
+        """
+        if data.get('format_version') != cls.FORMAT_VERSION or data.get('rank_bands') != list(cls.RANK_BANDS):
+            return None
+        return cls(data['locs'], data['scales'], tuple(data['pooled']), data.get('metadata'))
+
+    def save(self, path) -> None:
+        """保存模型文件"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path) -> Optional['ProbabilityModel']:
+        """
+        加载模型文件
+
+        Returns:
+            ProbabilityModel,文件不存在、损坏或格式不一致时返回None
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            get_logger("ProbabilityModel").warning(f"模型文件读取失败 {path}: {e}")
+            return None
+
+    @classmethod
+    def _fit_curve(cls, changes: np.ndarray, max_iter: int = 50, tol: float = 1e-8) -> Tuple[float, float]:
+        """
+        拟合单条逻辑曲线 σ(a + b·x)(牛顿法)
+
+        样本为 (x, 录取与否): 学生位次 = 参考位次 × exp(-x),下一年录取位次 = 参考位次 × exp(变化量),
+        变化量 ≥ -x 即录取
+
+        Args:
+            changes: 录取位次的年际对数变化
+            max_iter: 最大迭代次数
+            tol: 收敛阈值
+
+        Returns:
+            (loc, scale)
+        """
+        x = np.tile(cls.MARGIN_GRID, len(changes))
+        y = (np.repeat(changes, len(cls.MARGIN_GRID)) >= -x).astype(float)
+        X = np.column_stack([np.ones(len(x)), x])
+
+        def loss(beta: np.ndarray) -> float:
+            z = X @ beta
+            return float(np.sum(np.logaddexp(0, z) - y * z))
+
+        # 以分位数估计(逻辑分布四分位距 = 2·ln3·scale)作为初值
+        q25, q50, q75 = np.percentile(changes, [25, 50, 75])
+        scale = max((q75 - q25) / (2 * np.log(3)), cls.MIN_SCALE)
+        beta = np.array([q50 / scale, 1.0 / scale])
+        current = loss(beta)
+        for _ in range(max_iter):
+            p = 1.0 / (1.0 + np.exp(-np.clip(X @ beta, -30, 30)))
+            gradient = X.T @ (p - y)
+            hessian = (X * (p * (1 - p))[:, None]).T @ X + np.eye(2) * 1e-6
+            step = np.linalg.solve(hessian, gradient)
+            # 回溯步长,保证损失不增
+            for _ in range(30):
+                candidate = loss(beta - step)
+                if candidate <= current:
+                    break
+                step = step / 2
+            else:
+                break
+            beta, current = beta - step, candidate
+            if np.max(np.abs(step)) < tol:
+                break
+        slope = min(max(beta[1], 1.0 / (cls.DEFAULT_SCALE * 100)), 1.0 / cls.MIN_SCALE)
+        return float(beta[0] / slope), float(1.0 / slope)
+
+    @classmethod
+    def fit(cls, reference_ranks: np.ndarray, next_ranks: np.ndarray) -> 'ProbabilityModel':
+        """
+        由相邻年份的录取位次拟合各位次段曲线
+
+        Args:
+            reference_ranks: 参考年份录取位次
+            next_ranks: 下一年录取位次
+
+        Returns:
+            ProbabilityModel
+        """
+        reference_ranks = np.asarray(reference_ranks, dtype=float)
+        next_ranks = np.asarray(next_ranks, dtype=float)
+        valid = (reference_ranks > 0) & (next_ranks > 0)
+        reference_ranks, next_ranks = reference_ranks[valid], next_ranks[valid]
+        if len(reference_ranks) < cls.MIN_SAMPLES:
+            return cls.default()
+
+        changes = np.log(next_ranks / reference_ranks)
+        pooled = cls._fit_curve(changes)
+        bands = np.searchsorted(cls.RANK_BANDS, reference_ranks, side='right')
+
+        n_bands = len(cls.RANK_BANDS) + 1
+        locs, scales = np.full(n_bands, pooled[0]), np.full(n_bands, pooled[1])
+        counts = np.bincount(bands, minlength=n_bands)
+        for band in np.flatnonzero(counts >= cls.MIN_SAMPLES):
+            locs[band], scales[band] = cls._fit_curve(changes[bands == band])
+
+        model = cls(locs, scales, pooled, {'fitted': True, 'n_pairs': int(len(changes)),
+                                           'band_counts': counts.tolist()})
+        model.metadata['metrics'] = model.evaluate(reference_ranks, next_ranks)
+        return model
+
+    def band_of(self, cutoff_ranks: np.ndarray) -> np.ndarray:
+        """按参考录取位次确定位次段"""
+        return np.searchsorted(self.RANK_BANDS, np.asarray(cutoff_ranks, dtype=float), side='right')
+
+    def predict(self, rank_margin, volatility=None, student_ranks=None) -> np.ndarray:
+        """
+        批量预测录取概率
+
+        Args:
+            rank_margin: 位次余量数组 (参考录取位次 - 学生位次) / 学生位次
+            volatility: 各专业录取位次的年际对数波动(标准差),NaN或None表示使用分段波动
+            student_ranks: 学生位次(用于确定位次段),None表示使用全体样本曲线
+
+        Returns:
+            录取概率数组 (0-1)
+        """
+        margin = np.asarray(rank_margin, dtype=float)
+        x = np.log1p(np.maximum(margin, -0.99))
+
+        if student_ranks is None:
+            loc = np.full(x.shape, self.pooled_loc)
+            scale = np.full(x.shape, self.pooled_scale)
+        else:
+            cutoff_ranks = np.asarray(student_ranks, dtype=float) * (1 + np.maximum(margin, -0.99))
+            bands = self.band_of(cutoff_ranks)
+            loc, scale = self.locs[bands], self.scales[bands]
+
+        if volatility is not None:
+            entry_scale = np.asarray(volatility, dtype=float) / self.LOGISTIC_STD
+            blended = np.sqrt((1 - self.VOLATILITY_WEIGHT) * scale ** 2 + self.VOLATILITY_WEIGHT * entry_scale ** 2)
+            scale = np.where(np.isfinite(entry_scale), np.maximum(blended, self.MIN_SCALE), scale)
+
+        return 1.0 / (1.0 + np.exp(-np.clip((x + loc) / scale, -30, 30)))
+
+    def predict_ranks(self, student_ranks, cutoff_ranks, volatility=None) -> np.ndarray:
+        """
+        按学生位次和参考录取位次预测录取概率
+
+        Args:
+            student_ranks: 学生位次(标量或数组)
+            cutoff_ranks: 参考录取位次数组
+            volatility: 各专业录取位次的年际对数波动
+
+        Returns:
+            录取概率数组 (0-1)
+        """
+        student_ranks = np.maximum(np.asarray(student_ranks, dtype=float), 1.0)
+        student_ranks, cutoff_ranks = np.broadcast_arrays(student_ranks, np.asarray(cutoff_ranks, dtype=float))
+        margin = (cutoff_ranks - student_ranks) / student_ranks
+        return self.predict(margin, volatility, student_ranks)
+
+    def band_spread(self, cutoff_ranks) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        获取参考录取位次对应的年际对数漂移和标准差
+
+        Args:
+            cutoff_ranks: 参考录取位次数组
+
+        Returns:
+            (对数漂移, 对数标准差)
+        """
+        bands = self.band_of(cutoff_ranks)
+        return self.locs[bands], self.scales[bands] * self.LOGISTIC_STD
+
+    def evaluate(self, reference_ranks: np.ndarray, next_ranks: np.ndarray) -> Dict[str, float]:
+        """
+        在余量网格上评估对数损失和校准误差(各概率区间预测均值与实际录取率之差的加权平均)
+
+        Args:
+            reference_ranks: 参考年份录取位次
+            next_ranks: 下一年录取位次
+
+        Returns:
+            {'log_loss', 'calibration_error'}
+        """
+        reference_ranks = np.repeat(np.asarray(reference_ranks, dtype=float), len(self.MARGIN_GRID))
+        next_ranks = np.repeat(np.asarray(next_ranks, dtype=float), len(self.MARGIN_GRID))
+        x = np.tile(self.MARGIN_GRID, len(reference_ranks) // max(len(self.MARGIN_GRID), 1))
+        student_ranks = reference_ranks * np.exp(-x)
+        labels = (student_ranks <= next_ranks).astype(float)
+
+        p = np.clip(self.predict_ranks(student_ranks, reference_ranks), 1e-12, 1 - 1e-12)
+        log_loss = -np.mean(labels * np.log(p) + (1 - labels) * np.log(1 - p))
+        bins = np.minimum((p * 10).astype(int), 9)
+        counts = np.bincount(bins, minlength=10)
+        gap = np.abs(np.bincount(bins, weights=p - labels, minlength=10))
+        return {
+            'log_loss': round(float(log_loss), 4),
+            'calibration_error': round(float(gap.sum() / max(counts.sum(), 1)), 4)
+        }
+
+
+def train_probability_model(data_service) -> ProbabilityModel:
+    """
+    用相邻年份(2023→2024、2024→2025)同一专业的录取位次变化训练曲线
+
+    Args:
+        data_service: 数据服务
+
+    Returns:
+        ProbabilityModel,训练数据不足或训练失败时为默认曲线
+    """
+    logger = get_logger("ProbabilityModel")
+    start = time.time()
+    try:
+        rows = data_service.get_major_linker().get_rows()
+        rows = rows[(rows['major_id'] >= 0) & rows['rank'].notna()]
+        ranks = rows.pivot_table(index='major_id', columns='year', values='rank', aggfunc='min')
+        years = sorted(ranks.columns)
+        pairs = [ranks[[prev, year]].dropna().to_numpy() for prev, year in zip(years, years[1:])]
+        pairs = np.vstack(pairs) if pairs else np.empty((0, 2))
+        model = ProbabilityModel.fit(pairs[:, 0], pairs[:, 1])
+        model.metadata.update({
+            'data_version': data_service.get_dataset_version(),
+            'year_pairs': [[int(prev), int(year)] for prev, year in zip(years, years[1:])],
+            'trained_at': datetime.now().isoformat(timespec='seconds')
+        })
+        logger.info(f"录取概率曲线训练完成: {model.metadata}, 耗时{time.time() - start:.2f}秒")
+    except Exception as e:
+        logger.warning(f"录取概率曲线训练失败, 使用默认曲线: {e}")
+        model = ProbabilityModel.default()
+    return model
+
+
+def load_probability_model(data_service, model_path=DEFAULT_MODEL_PATH) -> ProbabilityModel:
+    """
+    加载离线训练的模型文件;文件不存在或与当前数据版本不一致时重新训练并保存
+    (服务内通过 DataService.get_probability_model 获取,每个数据版本加载一次)
+
+    Args:
+        data_service: 数据服务
+        model_path: 模型文件路径
+
+    Returns:
+        ProbabilityModel
+    """
+    model = ProbabilityModel.load(model_path)
+    if model is not None and model.metadata.get('data_version') == data_service.get_dataset_version():
+        return model
+
+    model = train_probability_model(data_service)
+    if model.metadata.get('fitted'):
+        try:
+            model.save(model_path)
+        except OSError as e:
+            get_logger("ProbabilityModel").warning(f"模型文件保存失败 {model_path}: {e}")
+    return model
+
+
+if __name__ == '__main__':
+    from core.container import container
+
+    service = container.data_service
+    for data_year in (2023, 2024, 2025):
+        service.add_admission_data(data_year, f"data/{data_year}投档分数线_含位次.md")
+
+    trained = train_probability_model(service)
+    if trained.metadata.get('fitted'):
+        trained.save(DEFAULT_MODEL_PATH)
+        print(json.dumps(trained.to_dict(), ensure_ascii=False, indent=2))
@@ -30,28 +30,122 @@
 - 动态调整：根据实际可用的学校数量，自动调整各策略的推荐数量
 """
 
+import threading
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from utils.logger import get_logger
+from cachetools import TTLCache
+from .preference_filter import PreferenceFilter
+from .recommendation_context import RecommendationContext, apply_preference_changes
+from .plan_optimizer import PlanOptimizer
+
+
+# 自适应位次窗口内的记录数取推荐数量的倍数（为偏好筛选和排序留出余量）
+WINDOW_OVERSAMPLING = 2
+
+# 专业位次波动较大时风险等级上调一级
+RISK_ESCALATION = {'极低': '低', '低': '中', '中': '高', '高': '极高'}
+
+
+def _top_k_indices(values: np.ndarray, tie_order: np.ndarray, limit: int) -> np.ndarray:
+    """
+    取数值最大的前limit个下标(降序,同值按 tie_order 升序)
+
+    Args:
+        values: 排序依据
+        tie_order: 同值时的次序(一般为原始行号)
+        limit: 返回数量
+
+    Returns:
+        下标数组
+    """
+    selected = np.arange(len(values))
+    if len(selected) > limit > 0:
+        top = np.argpartition(-values, limit - 1)[:limit]
+        selected = np.flatnonzero(values >= values[top].min())
+    return selected[np.lexsort((tie_order[selected], -values[selected]))][:limit]
+
+
+def admission_probabilities(data_service, student_rank: int, ranks: np.ndarray,
+                            volatility: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    按录取概率曲线模型批量计算录取概率
+
+    Args:
+        data_service: 数据服务
+        student_rank: 学生位次
+        ranks: 各专业录取位次
+        volatility: 各专业对数位次年际波动(可选,NaN表示使用分段波动)
+
+    Returns:
+        录取概率数组(%, 1-99)
+    """
+    model = data_service.get_probability_model()
+    return np.clip(model.predict_ranks(student_rank, ranks, volatility) * 100, 1.0, 99.0)
+
+
+def candidate_volatility(data_service, pool_positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    获取候选池记录所属专业的位次波动(查专业波动指标表)
+
+    Args:
+        data_service: 数据服务
+        pool_positions: 候选池(2025年)记录下标
+
+    Returns:
+        (对数位次年际波动, 是否波动较大)
+    """
+    table = data_service.get_major_volatility()
+    rows = data_service.get_candidate_volatility_rows(2025)[pool_positions]
+    return table.column('log_volatility', rows), table.is_volatile(rows)
 
 
 class PureRankRecommender:
-    """纯基于排名的推荐器"""
+    """纯基于排名的推荐器(在候选池的有序位次数组上二分查找窗口边界)"""
     
-    def __init__(self, items):
+    def __init__(self, pool):
         """
         初始化排名推荐器
         
         Args:
-            items: 候选项目列表，每个项目包含rank字段
+            pool: 按位次排序的候选池(CandidatePool,每个数据版本构建一次)
         """
-        self.items = items
-        self.sorted_items = self._preprocess()
+        self.pool = pool
+        self.ranks = pool.ranks
     
-    def _preprocess(self):
-        """预处理：按排名排序并建立索引"""
-        return sorted(self.items, key=lambda x: x['rank'])
+    def _bounds(self, user_rank):
+        """
+        二分查找学生位次附近的窗口边界
+        
+        Returns:
+            (冲刺下限下标, 保底起始下标, 保底上限下标):
+            ranks[challenge_start:safe_start] 位于 [学生位次-200, 学生位次],
+            ranks[safe_start:safe_end] 位于 (学生位次, 学生位次+100]
+        """
+        challenge_start = int(np.searchsorted(self.ranks, user_rank - 200, side='left'))
+        safe_start = int(np.searchsorted(self.ranks, user_rank, side='right'))
+        safe_end = int(np.searchsorted(self.ranks, user_rank + 100, side='right'))
+        return challenge_start, safe_start, safe_end
+    
+    def select(self, user_rank, strategy="balanced", top_k=120) -> List[Tuple[int, str]]:
+        """
+        基于排名选取候选(不构造结果字典)
+        
+        Args:
+            user_rank: 学生位次（数值越小竞争力越强）
+            strategy: 推荐策略 balanced(平衡), conservative(保守), aggressive(激进)
+            top_k: 返回数量
+        
+        Returns:
+            (候选池下标, 类别) 列表
+        """
+        if strategy == "conservative":
+            return self._conservative_select(user_rank, top_k)
+        elif strategy == "aggressive":
+            return self._aggressive_select(user_rank, top_k)
+        else:
+            return self._balanced_select(user_rank, top_k)
     
     def recommend(self, user_rank, strategy="balanced", top_k=120):
         """
@@ -65,14 +159,27 @@ class PureRankRecommender:
         Returns:
             推荐列表
         """
-        if strategy == "conservative":
-            return self._conservative_recommend(user_rank, top_k)
-        elif strategy == "aggressive":
-            return self._aggressive_recommend(user_rank, top_k)
-        else:
-            return self._balanced_recommend(user_rank, top_k)
+        return [self._to_item(i, category, user_rank)
+                for i, category in self.select(user_rank, strategy, top_k)]
     
-    def _balanced_recommend(self, user_rank, top_k=120, safe_ratio=0.6):
+    def _to_item(self, i: int, category: str, user_rank) -> Dict[str, Any]:
+        """将候选池下标转换为推荐项"""
+        pool = self.pool
+        rank = int(pool.ranks[i])
+        return {
+            'school_code': '',
+            'school_name': pool.school_names[pool.school_idx[i]],
+            'major_code': '',
+            'major_name': pool.major_names[i],
+            'min_score': int(pool.scores[i]),
+            'rank': rank,
+            'batch': '',
+            'year': pool.year,
+            'category': category,
+            'advantage': user_rank - rank
+        }
+    
+    def _balanced_select(self, user_rank, top_k=120, safe_ratio=0.6):
         """平衡策略：保底+冲刺混合
         
         逻辑说明：
@@ -85,59 +192,24 @@ class PureRankRecommender:
         """
         safe_count = int(top_k * safe_ratio)
         challenge_count = top_k - safe_count
+        challenge_start, safe_start, safe_end = self._bounds(user_rank)
+        
+        # 保底：录取位次 > 学生位次（学生排名更靠前，更容易录取），按位次从低到高
+        safe = list(range(safe_start, min(safe_end, safe_start + safe_count)))
         
-        # 设置位次范围限制
-        safe_min_rank = user_rank
-        safe_max_rank = user_rank + 100  # 保底上限：学生位次+100
-        challenge_min_rank = user_rank - 200  # 冲刺下限：学生位次-200
-        challenge_max_rank = user_rank
-        
-        # 保底：录取位次 > 学生位次（学生排名更靠前，更容易录取）
-        safe_items = []
-        for item in self.sorted_items:
-            if item['rank'] > user_rank and item['rank'] <= safe_max_rank:  # 保底：学生有优势，且在合理范围内
-                item_copy = item.copy()
-                item_copy['category'] = '保底'
-                item_copy['advantage'] = user_rank - item['rank']  # 正数表示优势
-                safe_items.append(item_copy)
-                if len(safe_items) >= safe_count:
-                    break
-        
-        # 冲刺：录取位次 <= 学生位次（学生排名更靠后，更难录取）
-        challenge_items = []
-        for item in reversed(self.sorted_items):  # 从最难的开始
-            if item['rank'] <= user_rank and item['rank'] >= challenge_min_rank:  # 冲刺：学生有劣势，但差距不太大
-                item_copy = item.copy()
-                item_copy['category'] = '冲刺'
-                item_copy['advantage'] = user_rank - item['rank']  # 负数表示劣势
-                challenge_items.append(item_copy)
-                if len(challenge_items) >= challenge_count:
-                    break
-        
-        # 如果safe_items不足，用challenge_items补足
-        if len(safe_items) < safe_count:
-            remaining = safe_count - len(safe_items)
-            for item in challenge_items[:remaining]:
-                if len(safe_items) >= safe_count:
-                    break
-                item_copy = item.copy()
-                item_copy['category'] = '保底'
-                safe_items.append(item_copy)
-        
-        # 如果challenge_items不足，用safe_items补足
-        if len(challenge_items) < challenge_count:
-            remaining = challenge_count - len(challenge_items)
-            for item in safe_items[-remaining:]:
-                if len(challenge_items) >= challenge_count:
-                    break
-                item_copy = item.copy()
-                item_copy['category'] = '冲刺'
-                challenge_items.append(item_copy)
+        # 冲刺：录取位次 <= 学生位次（学生排名更靠后，更难录取），从最接近学生位次的开始
+        challenge = list(range(safe_start - 1, max(challenge_start, safe_start - challenge_count) - 1, -1))
+        
+        # 如果保底不足，用冲刺补足；如果冲刺不足，用保底补足
+        if len(safe) < safe_count:
+            safe += challenge[:safe_count - len(safe)]
+        if len(challenge) < challenge_count:
+            challenge += safe[-(challenge_count - len(challenge)):]
         
         # 合并结果：保底在前，冲刺在后
-        return safe_items + challenge_items
+        return [(i, '保底') for i in safe] + [(i, '冲刺') for i in challenge]
     
-    def _conservative_recommend(self, user_rank, top_k=120):
+    def _conservative_select(self, user_rank, top_k=120):
         """保守策略：主要推荐保底院校
         
         录取位次 > 学生位次：对学生来说是保底
@@ -146,34 +218,16 @@ class PureRankRecommender:
         - 保底院校：录取位次在学生位次到学生位次+100之间
         - 示例：位次5000的学生，推荐5000-5100位次的学校
         """
-        safe_min_rank = user_rank
-        safe_max_rank = user_rank + 100  # 保底上限：学生位次+100
-        
-        safe_items = []
-        for item in self.sorted_items:
-            if item['rank'] > user_rank and item['rank'] <= safe_max_rank:  # 保底且在合理范围内
-                item_copy = item.copy()
-                item_copy['category'] = '保底'
-                item_copy['advantage'] = user_rank - item['rank']
-                safe_items.append(item_copy)
-                if len(safe_items) >= top_k:
-                    break
-        
-        # 如果保底院校不足，用其他院校补足
-        if len(safe_items) < top_k:
-            remaining = top_k - len(safe_items)
-            for item in self.sorted_items:
-                if len(safe_items) >= top_k:
-                    break
-                if item['rank'] <= user_rank:  # 原本不符合条件的现在也加入
-                    item_copy = item.copy()
-                    item_copy['category'] = '保底'
-                    item_copy['advantage'] = user_rank - item['rank']
-                    safe_items.append(item_copy)
-        
-        return safe_items
+        _, safe_start, safe_end = self._bounds(user_rank)
+        safe = list(range(safe_start, min(safe_end, safe_start + top_k)))
+        
+        # 如果保底院校不足，用录取位次 <= 学生位次的院校补足
+        if len(safe) < top_k:
+            safe += range(min(safe_start, top_k - len(safe)))
+        
+        return [(i, '保底') for i in safe]
     
-    def _aggressive_recommend(self, user_rank, top_k=120):
+    def _aggressive_select(self, user_rank, top_k=120):
         """激进策略：主要推荐冲刺院校
         
         录取位次 <= 学生位次：对学生来说是冲刺
@@ -182,33 +236,15 @@ class PureRankRecommender:
         - 冲刺院校：录取位次在学生位次-200到学生位次之间
         - 示例：位次5000的学生，推荐4800-5000位次的学校
         """
-        challenge_min_rank = user_rank - 200  # 冲刺下限：学生位次-200
-        challenge_max_rank = user_rank
-        
-        challenge_items = []
-        # 从最接近学生位次的开始，向上取冲刺院校
-        for item in self.sorted_items:
-            if item['rank'] <= user_rank and item['rank'] >= challenge_min_rank:  # 冲刺且在合理范围内
-                item_copy = item.copy()
-                item_copy['category'] = '冲刺'
-                item_copy['advantage'] = user_rank - item['rank']
-                challenge_items.append(item_copy)
-                if len(challenge_items) >= top_k:
-                    break
-        
-        # 如果冲刺院校不足，用其他院校补足
-        if len(challenge_items) < top_k:
-            remaining = top_k - len(challenge_items)
-            for item in reversed(self.sorted_items):
-                if len(challenge_items) >= top_k:
-                    break
-                if item['rank'] > user_rank:  # 原本不符合条件的现在也加入
-                    item_copy = item.copy()
-                    item_copy['category'] = '冲刺'
-                    item_copy['advantage'] = user_rank - item['rank']
-                    challenge_items.append(item_copy)
-        
-        return challenge_items
+        challenge_start, safe_start, _ = self._bounds(user_rank)
+        challenge = list(range(challenge_start, min(safe_start, challenge_start + top_k)))
+        
+        # 如果冲刺院校不足，从录取位次最高的院校倒序补足
+        if len(challenge) < top_k:
+            n = len(self.ranks)
+            challenge += range(n - 1, max(safe_start, n - (top_k - len(challenge))) - 1, -1)
+        
+        return [(i, '冲刺') for i in challenge]
 
 
 class MLRecommendationEngine:
@@ -223,10 +259,9 @@ class MLRecommendationEngine:
         """
         self.data_service = data_service
         self.logger = get_logger("MLRecommendationEngine")
-        self.school_tags_cache = {}
         
-        # 模拟训练好的模型（实际应该加载真实模型）
-        # 这里使用简化规则模拟机器学习效果
+        # 录取概率由录取概率曲线模型给出（见 probability_model），
+        # 以下特征随推荐结果输出(ml_features)供分析
         self.model_features = [
             'rank_gap',           # 位次差距
             'score_gap',          # 分数差距  
@@ -235,112 +270,35 @@ class MLRecommendationEngine:
             'major_match_score',  # 专业匹配
             'year_trend'          # 年份趋势
         ]
-        
-        # 模拟特征权重（实际应由模型训练得出）
-        self.feature_weights = {
-            'rank_gap': 0.35,
-            'score_gap': 0.20,
-            'rank_ratio': 0.15,
-            'school_level_score': 0.15,
-            'major_match_score': 0.10,
-            'year_trend': 0.05
-        }
     
-    def calculate_ml_features(self, student_info: Dict[str, Any], school_info: Dict[str, Any], 
-                             preferences: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    def calculate_ml_feature_matrix(self, student_info: Dict[str, Any], ranks: np.ndarray,
+                                    scores: np.ndarray, level_scores: np.ndarray,
+                                    major_match: np.ndarray) -> np.ndarray:
         """
-        计算机器学习特征
+        批量计算机器学习特征矩阵
         
         Args:
             student_info: 学生信息
-            school_info: 学校信息
-            preferences: 用户偏好
+            ranks: 候选录取位次
+            scores: 候选录取分数
+            level_scores: 候选学校层次分(0-100)
+            major_match: 候选是否匹配偏好专业
             
         Returns:
-            特征向量
-        """
-        try:
-            # 1. 位次差距特征
-            rank_gap = school_info['rank'] - student_info['rank']
-            normalized_rank_gap = rank_gap / max(student_info['rank'], 1)
-            
-            # 2. 分数差距特征
-            score_gap = school_info['score'] - student_info.get('score', 500)
-            normalized_score_gap = score_gap / max(student_info.get('score', 500), 1)
-            
-            # 3. 位次比率特征
-            rank_ratio = school_info['rank'] / max(student_info['rank'], 1)
-            
-            # 4. 学校层次特征
-            level_score = 0
-            if school_info['tags'].get('is_985'):
-                level_score = 100
-            elif school_info['tags'].get('is_211'):
-                level_score = 80
-            elif school_info['tags'].get('is_double_first_class'):
-                level_score = 60
-            else:
-                level_score = 30
-            
-            # 5. 专业匹配特征
-            major_match = 0
-            if preferences and preferences.get('majors'):
-                major_name = school_info['major_name'].lower()
-                for pref_major in preferences['majors']:
-                    if pref_major.lower() in major_name:
-                        major_match = 100
-                        break
-            
-            # 6. 年份趋势特征（模拟）
-            # 实际应该分析多年数据得出趋势
-            year_trend = 0  # 假设持平
-            
-            return {
-                'rank_gap': normalized_rank_gap,
-                'score_gap': normalized_score_gap,
-                'rank_ratio': rank_ratio,
-                'school_level_score': level_score / 100.0,  # 归一化
-                'major_match_score': major_match / 100.0,  # 归一化
-                'year_trend': year_trend
-            }
-            
-        except Exception as e:
-            self.logger.warning(f"计算特征失败: {str(e)}")
-            return {feature: 0.0 for feature in self.model_features}
-    
-    def predict_admission_probability(self, features: Dict[str, float]) -> float:
-        """
-        预测录取概率（模拟模型预测）
-        
-        Args:
-            features: 特征向量
-            
-        Returns:
-            录取概率 (0-100)
-        """
-        try:
-            # 模拟模型预测：加权线性组合
-            # 实际应该调用真实模型：model.predict_proba(features)
-            
-            probability = (
-                features['rank_gap'] * self.feature_weights['rank_gap'] +
-                features['score_gap'] * self.feature_weights['score_gap'] +
-                features['rank_ratio'] * self.feature_weights['rank_ratio'] +
-                features['school_level_score'] * self.feature_weights['school_level_score'] +
-                features['major_match_score'] * self.feature_weights['major_match_score'] +
-                features['year_trend'] * self.feature_weights['year_trend']
-            )
-            
-            # 转换为录取概率（调整范围到0-100）
-            # rank_gap为正表示学校位次高于学生位次（容易录取）
-            base_prob = 50 + probability * 50
-            
-            # 边界限制
-            return max(1.0, min(99.0, base_prob))
-            
-        except Exception as e:
-            self.logger.warning(f"预测概率失败: {str(e)}")
-            return 50.0  # 默认概率
+            特征矩阵 (候选数 × 特征数)，列顺序与 model_features 一致
+        """
+        student_rank = max(student_info['rank'], 1)
+        student_score = max(student_info.get('score', 500), 1)
+        
+        columns = {
+            'rank_gap': (ranks - student_info['rank']) / student_rank,
+            'score_gap': (scores - student_info.get('score', 500)) / student_score,
+            'rank_ratio': ranks / student_rank,
+            'school_level_score': level_scores / 100.0,
+            'major_match_score': major_match.astype(float),
+            'year_trend': np.zeros(len(ranks))  # 假设持平
+        }
+        return np.column_stack([columns[name] for name in self.model_features]).astype(float)
     
     def recommend_by_ml(self, student_info: Dict[str, Any], 
                        preferences: Optional[Dict[str, Any]] = None,
@@ -360,151 +318,99 @@ class MLRecommendationEngine:
             student_rank = student_info.get('rank', 0)
             self.logger.info(f"使用机器学习算法为学生位次{student_rank}生成推荐")
             
-            # 获取数据
-            df = self.data_service.get_data(2025)
-            if df is None or df.empty:
+            # 获取按位次排序的候选池
+            pool = self.data_service.get_candidate_pool(2025)
+            if len(pool) == 0:
                 self.logger.error("无法获取投档数据")
                 return []
             
-            # 确定列名
-            school_col = '招生院校' if '招生院校' in df.columns else '院校名称' if '院校名称' in df.columns else '学校名称'
-            major_col = '招生专业' if '招生专业' in df.columns else '专业名称'
-            rank_col = '位次' if '位次' in df.columns else '投档位次'
-            score_col = '投档最低分'
-            
-            # 设置位次范围限制（主要推荐在学生位次上下200位范围内的学校）
-            # 这样可以确保推荐结果具有实际可行性
-            min_rank = student_rank - 200  # 下限：学生位次减200
-            max_rank = student_rank + 100  # 上限：学生位次加100（保底范围稍宽）
+            # 偏好编译为掩码；位次范围限制：按满足偏好的记录密度缩放默认窗口（学生位次-200至+100），
+            # 使窗口内符合条件的记录数足以填满推荐数量
+            pref_filter = PreferenceFilter(pool, preferences)
+            mask = pref_filter.row_mask(0, len(pool)) if preferences else None
+            min_rank, max_rank = pool.adaptive_rank_window(student_rank, limit * WINDOW_OVERSAMPLING, mask)
             self.logger.info(f"位次范围限制: {min_rank} - {max_rank}")
             
-            # 构建候选列表并预测
-            candidates = []
-            for _, row in df.iterrows():
-                try:
-                    if pd.notna(row.get(rank_col)):
-                        rank_value = int(row.get(rank_col))
-                        
-                        # 位次范围筛选：主要推荐在合理范围内的学校
-                        if rank_value < min_rank or rank_value > max_rank:
-                            continue  # 跳过超出位次范围的学校
-                        
-                        school_name = str(row.get(school_col, '')).strip() if school_col else '未知院校'
-                        major_name = str(row.get(major_col, '')).strip() if major_col else '未知专业'
-                        
-                        # 应用筛选条件
-                        if preferences:
-                            # 1. 地区筛选（只有在用户设置了偏好时才筛选）
-                            if preferences.get('locations'):
-                                location_score = self.calculate_location_match_score(school_name, preferences)
-                                if location_score < 100:  # 100表示完全匹配，小于100表示不匹配或不确定
-                                    continue  # 跳过不符合地区偏好的院校
-                            
-                            # 2. 专业筛选（只有在用户设置了偏好时才筛选）
-                            if preferences.get('majors'):
-                                major_score = self.calculate_major_match_score(major_name, preferences)
-                                if major_score < 100:  # 100表示完全匹配，小于100表示不匹配
-                                    continue  # 跳过不符合专业偏好的院校
-                        
-                        # 构建学校信息
-                        school_info = {
-                            'rank': rank_value,
-                            'score': int(row.get(score_col, 0)) if pd.notna(row.get(score_col)) else 0,
-                            'school_name': school_name,
-                            'major_name': major_name,
-                            'school_code': '',
-                            'major_code': '',
-                            'batch': '',
-                            'tags': self._get_school_tags(school_name)
-                        }
-                        
-                        # 如果有学校类型偏好，额外筛选
-                        if preferences and preferences.get('school_types'):
-                            tags = school_info['tags']
-                            level_score = 0
-                            if tags.get('is_985'):
-                                level_score = 20
-                            elif tags.get('is_211'):
-                                level_score = 15
-                            elif tags.get('is_double_first_class'):
-                                level_score = 10
-                            else:
-                                level_score = 0
-                            
-                            min_level_score = 0
-                            if '985' in preferences['school_types']:
-                                min_level_score = max(min_level_score, 20)
-                            if '211' in preferences['school_types']:
-                                min_level_score = max(min_level_score, 15)
-                            if '双一流' in preferences['school_types']:
-                                min_level_score = max(min_level_score, 10)
-                            
-                            if level_score < min_level_score:
-                                continue  # 跳过不符合院校层次要求的
-                        
-                        # 计算特征
-                        features = self.calculate_ml_features(student_info, school_info, preferences)
-                        
-                        # 预测录取概率
-                        probability = self.predict_admission_probability(features)
-                        
-                        # 计算排名优势
-                        advantage = student_info['rank'] - rank_value
-                        
-                        # 确定类别和风险
-                        if probability >= 80:
-                            category = "保底"
-                            risk_level = "低"
-                        elif probability >= 60:
-                            category = "稳妥"
-                            risk_level = "中"
-                        elif probability >= 30:
-                            category = "冲刺"
-                            risk_level = "高"
-                        else:
-                            category = "冲刺+"
-                            risk_level = "极高"
-                        
-                        # 计算ML置信度（模拟）
-                        confidence = min(95, max(60, 80 + abs(probability - 50) * 0.5))
-                        
-                        # 构建推荐项
-                        candidate = {
-                            'school_code': school_info['school_code'],
-                            'school_name': school_info['school_name'],
-                            'major_code': school_info['major_code'],
-                            'major_name': school_info['major_name'],
-                            'min_score': school_info['score'],
-                            'rank': rank_value,
-                            'batch': '',
-                            'year': 2025,
-                            'advantage': advantage,
-                            'admission_probability': round(probability, 1),
-                            'confidence': round(confidence, 1),  # ML置信度
-                            'category': category,
-                            'risk_level': risk_level,
-                            'category_basis': f"ML预测:概率={probability:.1f}%,置信度={confidence:.1f}%",
-                            'ml_features': features,  # 保存特征用于分析
-                            'tags': school_info['tags']
-                        }
-                        
-                        candidates.append(candidate)
-                        
-                except (ValueError, TypeError) as e:
-                    self.logger.warning(f"数据处理错误，跳过该行: {e}")
-                    continue
+            # 位次区间二分切片
+            start, end = pool.rank_range(min_rank, max_rank)
+            school_idx = pool.school_idx[start:end]
+            major_names = pool.major_names[start:end]
+            keep = mask[start:end] if mask is not None else pref_filter.row_mask(start, end)
             
-            if not candidates:
+            candidate_idx = np.flatnonzero(keep)
+            if len(candidate_idx) == 0:
                 self.logger.error("没有符合条件的候选数据（可能筛选条件过于严格）")
                 return []
             
-            # 按录取概率排序
-            candidates.sort(key=lambda x: x['admission_probability'], reverse=True)
-            
-            # 返回前N个（如果不足N个，返回实际数量）
-            recommendations = candidates[:limit]
-            
-            self.logger.info(f"机器学习算法生成{len(recommendations)}个推荐（筛选后总计{len(candidates)}个候选）")
+            ranks = pool.ranks[start:end][candidate_idx]
+            scores = pool.scores[start:end][candidate_idx]
+            school_idx = school_idx[candidate_idx]
+            major_names = major_names[candidate_idx]
+            
+            # 构建特征矩阵并批量预测
+            level_scores = pool.school_level_scores(
+                {'is_985': 100, 'is_211': 80, 'is_double_first_class': 60, 'normal': 30}
+            )[school_idx]
+            if pref_filter.major_match is not None:
+                major_match = pref_filter.major_match[start:end][candidate_idx]
+            else:
+                major_match = np.zeros(len(candidate_idx), dtype=bool)
+            
+            features = self.calculate_ml_feature_matrix(student_info, ranks, scores, level_scores, major_match)
+            
+            # 录取概率曲线模型(叠加各专业自身的位次波动)
+            volatility, volatile = candidate_volatility(self.data_service, start + candidate_idx)
+            probabilities = np.round(admission_probabilities(self.data_service, student_rank, ranks, volatility), 1)
+            
+            # 按录取概率排序（同概率时保持原始数据顺序）
+            row_positions = pool.row_positions[start:end][candidate_idx]
+            selected = _top_k_indices(probabilities, row_positions, limit)
+            
+            # 仅为最终结果构建推荐项
+            recommendations = []
+            for i in selected:
+                rank_value = int(ranks[i])
+                probability = float(probabilities[i])
+                
+                # 确定类别和风险
+                if probability >= 80:
+                    category = "保底"
+                    risk_level = "低"
+                elif probability >= 60:
+                    category = "稳妥"
+                    risk_level = "中"
+                elif probability >= 30:
+                    category = "冲刺"
+                    risk_level = "高"
+                else:
+                    category = "冲刺+"
+                    risk_level = "极高"
+                if volatile[i]:
+                    risk_level = RISK_ESCALATION.get(risk_level, risk_level)
+                
+                # 计算ML置信度（模拟）
+                confidence = min(95, max(60, 80 + abs(probability - 50) * 0.5))
+                
+                recommendations.append({
+                    'school_code': '',
+                    'school_name': pool.school_names[school_idx[i]],
+                    'major_code': '',
+                    'major_name': major_names[i],
+                    'min_score': int(scores[i]),
+                    'rank': rank_value,
+                    'batch': '',
+                    'year': 2025,
+                    'advantage': student_rank - rank_value,
+                    'admission_probability': probability,
+                    'confidence': round(confidence, 1),  # ML置信度
+                    'category': category,
+                    'risk_level': risk_level,
+                    'category_basis': f"模型预测:概率={probability:.1f}%,置信度={confidence:.1f}%",
+                    'ml_features': dict(zip(self.model_features, features[i].tolist())),  # 保存特征用于分析
+                    'tags': pool.school_tags[school_idx[i]]
+                })
+            
+            self.logger.info(f"机器学习算法生成{len(recommendations)}个推荐（筛选后总计{len(candidate_idx)}个候选）")
             return recommendations
             
         except Exception as e:
@@ -556,6 +462,19 @@ class MLRecommendationEngine:
 class WeightedRecommendationEngine:
     """多因素加权推荐引擎"""
     
+    # 推荐上下文缓存容量和存活时间（秒）
+    CONTEXT_CACHE_SIZE = 64
+    CONTEXT_TTL = 1800
+    
+    # 方案优化的候选位次窗口（学生位次的倍数）和效用权重
+    PLAN_WINDOW = (0.5, 2.0)
+    PLAN_UTILITY_WEIGHTS = {
+        'prestige': 0.4,
+        'school_level': 0.3,
+        'major_match': 0.2,
+        'location_match': 0.1
+    }
+    
     def __init__(self, data_service):
         """
         初始化加权推荐引擎
@@ -565,7 +484,10 @@ class WeightedRecommendationEngine:
         """
         self.data_service = data_service
         self.logger = get_logger("WeightedRecommendationEngine")
-        self.school_tags_cache = {}  # 学校标签缓存
+        
+        # 推荐上下文缓存：(方案, 学生位次, 学生分数, 位次窗口, 数据版本) -> RecommendationContext
+        self.contexts = TTLCache(maxsize=self.CONTEXT_CACHE_SIZE, ttl=self.CONTEXT_TTL)
+        self._contexts_lock = threading.Lock()
         
         # 权重配置
         self.weights = {
@@ -584,410 +506,350 @@ class WeightedRecommendationEngine:
             'normal': 0
         }
     
-    def calculate_rank_match_score(self, student_rank: int, school_rank: int) -> float:
+    def determine_category_enhanced(self, probability: float, volatile: bool = False) -> tuple:
         """
-        计算位次匹配度分数
+        按录取概率判断志愿类别和风险等级
         
         Args:
-            student_rank: 学生位次
-            school_rank: 学校录取位次
+            probability: 录取概率(%)
+            volatile: 专业位次波动是否较大(是则风险等级上调一级)
             
         Returns:
-            匹配度分数 (0-100)
-        """
-        if student_rank <= 0:
-            return 0
-        
-        # 位次差距越小越好
-        rank_gap = abs(student_rank - school_rank)
-        relative_gap = rank_gap / student_rank * 100
-        
-        # 最大100分，差距越大分数越低
-        score = max(0, 100 - relative_gap)
-        return score
+            (类别, 风险等级)
+        """
+        if probability >= 90:
+            category, risk_level = "保底", "极低"
+        elif probability >= 70:
+            category, risk_level = "保底", "低"
+        elif probability >= 40:
+            category, risk_level = "稳健", "中"
+        elif probability >= 20:
+            category, risk_level = "冲刺", "高"
+        else:
+            category, risk_level = "冲刺+", "极高"
+        if volatile:
+            risk_level = RISK_ESCALATION.get(risk_level, risk_level)
+        return category, risk_level
     
-    def calculate_score_match_score(self, student_score: int, school_score: int) -> float:
+    def recommend_by_weighted_score(self, student_info: Dict[str, Any], 
+                                   preferences: Optional[Dict[str, Any]] = None,
+                                   limit: int = 120,
+                                   session_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        计算分数匹配度分数
+        基于多因素加权评分的推荐
         
         Args:
-            student_score: 学生分数
-            school_score: 学校录取分数
+            student_info: 学生信息 {rank, score, ...}
+            preferences: 用户偏好 {majors, locations, school_types, ...}
+            limit: 返回数量
+            session_id: 方案或会话标识（同一方案的后续重排复用其上下文）
             
         Returns:
-            匹配度分数 (0-100)
+            推荐列表
         """
-        if student_score <= 0:
-            return 0
-        
-        # 分数差距越小越好（每差1分扣2分，最多扣100分）
-        score_gap = abs(student_score - school_score)
-        score = max(0, 100 - score_gap * 2)
-        return score
+        try:
+            # 获取按位次排序的候选池
+            pool = self.data_service.get_candidate_pool(2025)
+            if len(pool) == 0:
+                self.logger.error("无法获取投档数据")
+                return []
+            
+            # 位次窗口内的打分分量按学生缓存，偏好编译为掩码后加权
+            context = self.get_context(student_info, limit=limit, session_id=session_id, preferences=preferences)
+            return self._recommend_from_context(context, preferences, limit)
+            
+        except Exception as e:
+            self.logger.error(f"加权推荐过程发生错误: {str(e)}")
+            return []
     
-    def calculate_school_level_score(self, tags: Dict[str, bool]) -> float:
+    def get_context(self, student_info: Dict[str, Any],
+                    window: Optional[Tuple[float, float]] = None,
+                    limit: int = 120,
+                    session_id: Optional[str] = None,
+                    preferences: Optional[Dict[str, Any]] = None) -> RecommendationContext:
         """
-        计算学校层次分数
+        获取学生的推荐上下文（按方案、学生位次、分数和数据版本缓存）
+        
+        方案内的自适应窗口只在首次创建上下文时按当时的偏好确定，之后的重排都复用该上下文；
+        无方案标识时按本次偏好确定窗口，窗口不同的请求不共用上下文
         
         Args:
-            tags: 学校标签字典
+            student_info: 学生信息 {rank, score}
+            window: 位次窗口相对学生位次的倍数 (下限, 上限)，为None时按位次密度自适应
+            limit: 推荐数量（决定自适应窗口的大小）
+            session_id: 方案或会话标识（不同方案的上下文互不共用）
+            preferences: 用户偏好（自适应窗口按满足偏好的记录密度确定）
             
         Returns:
-            层次分数
-        """
-        if tags.get('is_985'):
-            return self.school_level_scores['is_985']
-        elif tags.get('is_211'):
-            return self.school_level_scores['is_211']
-        elif tags.get('is_double_first_class'):
-            return self.school_level_scores['is_double_first_class']
+            RecommendationContext: 推荐上下文
+        """
+        student_rank = student_info.get('rank', 0)
+        student_score = student_info.get('score', 0)
+        pool = self.data_service.get_candidate_pool(2025)
+        
+        if window is not None:
+            bounds = (student_rank * window[0], student_rank * window[1])
+        elif session_id is None:
+            bounds = self._adaptive_window(pool, student_rank, limit, preferences)
         else:
-            return self.school_level_scores['normal']
+            bounds = None
+        
+        key = (session_id, student_rank, student_score, bounds, self.data_service.get_dataset_version())
+        with self._contexts_lock:
+            context = self.contexts.get(key)
+        if context is None:
+            min_rank, max_rank = bounds or self._adaptive_window(pool, student_rank, limit, preferences)
+            self.logger.info(f"位次范围限制: {min_rank} - {max_rank}")
+            context = RecommendationContext(
+                pool, student_rank, student_score, min_rank, max_rank, self.school_level_scores
+            )
+            with self._contexts_lock:
+                self.contexts[key] = context
+        return context
     
-    def calculate_major_match_score(self, major_name: str, preferences: Optional[Dict[str, Any]]) -> float:
+    def reset_session(self, session_id: str) -> None:
         """
-        计算专业匹配度分数
+        丢弃方案的推荐上下文
         
         Args:
-            major_name: 专业名称
-            preferences: 用户偏好
+            session_id: 方案或会话标识
+        """
+        with self._contexts_lock:
+            for key in [key for key in self.contexts if key[0] == session_id]:
+                self.contexts.pop(key, None)
+    
+    @staticmethod
+    def _adaptive_window(pool, student_rank: float, limit: int,
+                         preferences: Optional[Dict[str, Any]]) -> Tuple[float, float]:
+        """
+        按满足偏好的记录密度缩放默认窗口（学生位次-200至+100），使窗口内符合条件的记录数足以填满推荐数量
+        
+        Args:
+            pool: 候选池
+            student_rank: 学生位次
+            limit: 推荐数量
+            preferences: 用户偏好（为空时按全部记录的密度）
             
         Returns:
-            匹配度分数
+            (最低位次, 最高位次)
         """
-        if not preferences:
-            return 30  # 默认基础分
-        
-        preferred_majors = preferences.get('majors', [])
-        if not preferred_majors:
-            return 30
-        
-        # 检查是否包含偏好专业
-        for major in preferred_majors:
-            if major in major_name:
-                return 100
-        
-        return 30
+        mask = PreferenceFilter(pool, preferences).row_mask(0, len(pool)) if preferences else None
+        return pool.adaptive_rank_window(student_rank, limit * WINDOW_OVERSAMPLING, mask)
     
-    def calculate_location_match_score(self, school_name: str, preferences: Optional[Dict[str, Any]]) -> float:
+    def _recommend_from_context(self, context: RecommendationContext,
+                                preferences: Optional[Dict[str, Any]],
+                                limit: int,
+                                weights: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
         """
-        计算地域匹配度分数
+        在推荐上下文上按偏好筛选、加权并取前N个推荐
         
         Args:
-            school_name: 学校名称
+            context: 推荐上下文
             preferences: 用户偏好
+            limit: 返回数量
+            weights: 权重覆盖（为None时使用默认权重）
             
         Returns:
-            匹配度分数
+            推荐列表
         """
-        if not preferences:
-            return 50  # 默认基础分
+        student_rank = context.student_rank
+        scored = context.score(preferences, {**self.weights, **(weights or {})})
+        if scored is None:
+            self.logger.error("没有符合条件的候选数据（可能筛选条件过于严格）")
+            return []
         
-        preferred_locations = preferences.get('locations', [])
-        if not preferred_locations:
-            return 50
+        candidate_idx = scored['candidate_idx']
+        total_scores = scored['total_scores']
+        ranks = context.ranks[candidate_idx]
+        scores = context.scores[candidate_idx]
+        school_idx = context.school_idx[candidate_idx]
         
-        try:
-            # 获取学校信息以判断所在地
-            school_info_df = self.data_service.load_school_info()
-            if school_info_df is None or school_info_df.empty:
-                return 50
-            
-            # 确定列名
-            school_col = '学校名称' if '学校名称' in school_info_df.columns else '院校名称'
-            
-            # 查找学校
-            school_row = school_info_df[school_info_df[school_col] == school_name]
-            if school_row.empty:
-                return 50
-            
-            # 获取学校所在城市/区域
-            city = school_row.iloc[0].get('所在城市', '')
-            region = school_row.iloc[0].get('所在区域', '')
-            
-            # 检查是否匹配偏好地区
-            location_str = f"{city}{region}"
-            for pref_location in preferred_locations:
-                if pref_location in location_str:
-                    return 100  # 完全匹配
-            
-            # 如果没有匹配，给较低分数
-            return 20
-            
-        except Exception as e:
-            self.logger.warning(f"地域匹配计算失败 {school_name}: {str(e)}")
-            return 50
+        # 取综合得分最高的前N个（同分时保持原始数据顺序）
+        selected = _top_k_indices(total_scores, context.row_positions[candidate_idx], limit)
+        
+        # 仅为最终结果构建推荐项
+        pool = context.pool
+        volatility, volatile = candidate_volatility(self.data_service, context.start + candidate_idx[selected])
+        probabilities = np.round(
+            admission_probabilities(self.data_service, student_rank, ranks[selected], volatility), 1
+        )
+        recommendations = []
+        for i, probability, is_volatile in zip(selected, probabilities.tolist(), volatile.tolist()):
+            rank_value = int(ranks[i])
+            school = int(school_idx[i])
+            advantage = student_rank - rank_value
+            total_score = float(total_scores[i])
+            category, risk_level = self.determine_category_enhanced(probability, is_volatile)
+            
+            recommendations.append({
+                'school_code': '',
+                'school_name': pool.school_names[school],
+                'major_code': '',
+                'major_name': context.major_names[candidate_idx[i]],
+                'min_score': int(scores[i]),
+                'rank': rank_value,
+                'batch': '',
+                'year': 2025,
+                'advantage': advantage,
+                'total_score': total_score,
+                'category': category,
+                'risk_level': risk_level,
+                'admission_probability': probability,
+                'score_details': {
+                    'total_score': total_score,
+                    'rank_score': round(float(scored['rank_scores'][i]), 2),
+                    'score_score': round(float(scored['score_scores'][i]), 2),
+                    'level_score': scored['level_scores'][i].item(),
+                    'major_score': scored['major_scores'][i].item(),
+                    'location_score': scored['location_scores'][i].item()
+                },
+                'tags': pool.school_tags[school]
+            })
+        
+        self.logger.info(f"为学生生成{len(recommendations)}个加权推荐（筛选后总计{len(candidate_idx)}个候选）")
+        return recommendations
     
-    def calculate_weighted_score(self, student_info: Dict[str, Any], 
-                                school_info: Dict[str, Any],
-                                preferences: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def rerank(self, student_info: Dict[str, Any],
+               preferences: Optional[Dict[str, Any]] = None,
+               add: Optional[Dict[str, List[str]]] = None,
+               remove: Optional[Dict[str, List[str]]] = None,
+               weights: Optional[Dict[str, float]] = None,
+               limit: int = 120,
+               session_id: Optional[str] = None) -> Dict[str, Any]:
         """
-        计算综合加权得分
+        增量重排：在缓存的推荐上下文上应用偏好增减或权重调整
         
         Args:
             student_info: 学生信息 {rank, score}
-            school_info: 学校信息 {rank, score, school_name, major_name, tags}
-            preferences: 用户偏好
+            preferences: 调整前的完整偏好（由调用方保存并传入）
+            add: 新增的偏好
+            remove: 移除的偏好
+            weights: 权重覆盖
+            limit: 返回数量
+            session_id: 方案或会话标识
             
         Returns:
-            综合评分结果
+            {'preferences': 生效的偏好, 'volunteers': 志愿列表}
         """
-        try:
-            # 计算各项得分
-            rank_score = self.calculate_rank_match_score(
-                student_info['rank'], 
-                school_info['rank']
-            )
-            
-            score_score = self.calculate_score_match_score(
-                student_info.get('score', 0),
-                school_info['score']
-            )
-            
-            level_score = self.calculate_school_level_score(school_info['tags'])
-            
-            major_score = self.calculate_major_match_score(
-                school_info['major_name'],
-                preferences
-            )
-            
-            location_score = self.calculate_location_match_score(
-                school_info['school_name'],
-                preferences
-            )
-            
-            # 计算加权总分
-            total_score = (
-                rank_score * self.weights['rank_match'] +
-                score_score * self.weights['score_match'] +
-                level_score * self.weights['school_level'] +
-                major_score * self.weights['major_match'] +
-                location_score * self.weights['location_match']
-            )
-            
-            return {
-                'total_score': round(total_score, 2),
-                'rank_score': round(rank_score, 2),
-                'score_score': round(score_score, 2),
-                'level_score': level_score,
-                'major_score': major_score,
-                'location_score': location_score
-            }
-            
-        except Exception as e:
-            self.logger.warning(f"计算加权分数失败: {str(e)}")
-            return {
-                'total_score': 0,
-                'rank_score': 0,
-                'score_score': 0,
-                'level_score': 0,
-                'major_score': 0,
-                'location_score': 0
-            }
+        updated = apply_preference_changes(preferences, add, remove)
+        context = self.get_context(student_info, limit=limit, session_id=session_id, preferences=updated)
+        recommendations = self._recommend_from_context(context, updated, limit, weights)
+        return {'preferences': updated, 'volunteers': self._to_volunteers(recommendations)}
     
-    def determine_category_enhanced(self, advantage: int, score: float) -> tuple:
+    def optimize_plan(self, student_info: Dict[str, Any],
+                      preferences: Optional[Dict[str, Any]] = None,
+                      constraints: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        改进的志愿类别判断（基于排名优势和综合得分）
+        在约束下优化整套志愿方案（冲/稳/保比例、每校专业数、地区和学科分散度、最少保底数）
         
-        位次规则说明：
-        - 保底：录取位次 > 学生位次 且 ≤ (学生位次+100)，即 0 < advantage ≤ 100
-        - 稳健：录取位次在 (学生位次-100) 至 (学生位次+100) 之间，即 -100 ≤ advantage ≤ 100
-        - 冲刺：录取位次在 (学生位次-200) 至 学生位次 之间，即 -200 ≤ advantage ≤ 0
+        候选取自较宽的位次窗口，录取概率由录取概率模型批量给出，
+        效用综合院校录取位次、院校层次、专业和地域偏好
         
         Args:
-            advantage: 排名优势 = 学生位次 - 录取位次
-            score: 综合得分
+            student_info: 学生信息 {rank, score}
+            preferences: 用户偏好
+            constraints: 方案约束（见 PlanOptimizer.DEFAULT_CONSTRAINTS）
             
         Returns:
-            (类别, 风险等级, 录取概率)
+            {'volunteers': 志愿列表, 'summary': 方案统计}
         """
-        # 基于排名优势的类别判断（根据新的位次规则）
-        if advantage > 100:
-            category = "保底"
-            risk_level = "极低"
-            probability = min(95, 70 + (advantage - 100) * 0.05)
-        elif advantage > 0:
-            category = "保底"
-            risk_level = "低"
-            probability = min(90, 50 + advantage * 0.4)
-        elif advantage >= -100:
-            category = "稳健"
-            risk_level = "中"
-            probability = max(30, min(70, 50 + advantage * 0.2))
-        elif advantage >= -200:
-            category = "冲刺"
-            risk_level = "高"
-            probability = max(10, min(50, 30 + (advantage + 100) * 0.2))
-        else:
-            category = "冲刺+"
-            risk_level = "极高"
-            probability = max(1, min(30, 10 + (advantage + 200) * 0.1))
+        empty = {'volunteers': [], 'summary': PlanOptimizer(constraints).summarize(
+            np.empty(0), np.empty(0), np.empty(0))}
+        student_rank = student_info.get('rank', 0)
+        if student_rank <= 0:
+            return empty
+        
+        context = self.get_context(student_info, self.PLAN_WINDOW)
+        scored = context.score(preferences, self.weights)
+        if scored is None:
+            self.logger.error("没有符合条件的候选数据（可能筛选条件过于严格）")
+            return empty
+        
+        pool = context.pool
+        candidate_idx = scored['candidate_idx']
+        ranks = context.ranks[candidate_idx]
+        school_idx = context.school_idx[candidate_idx]
+        
+        # 录取概率(%)
+        volatility, volatile = candidate_volatility(self.data_service, context.start + candidate_idx)
+        probabilities = admission_probabilities(self.data_service, student_rank, ranks, volatility)
+        
+        # 效用(0-100): 录取位次越靠前越好，叠加院校层次和偏好匹配
+        prestige = 50 * np.clip(student_rank / np.maximum(ranks, 1), 0, 2)
+        level = scored['level_scores'] / max(self.school_level_scores.values()) * 100
+        utilities = (
+            prestige * self.PLAN_UTILITY_WEIGHTS['prestige'] +
+            level * self.PLAN_UTILITY_WEIGHTS['school_level'] +
+            scored['major_scores'] * self.PLAN_UTILITY_WEIGHTS['major_match'] +
+            scored['location_scores'] * self.PLAN_UTILITY_WEIGHTS['location_match']
+        )
         
-        # 综合得分调整（得分越高，概率适当提高）
-        if score >= 70:
-            probability = min(99, probability * 1.1)
-        elif score >= 50:
-            probability = min(99, probability * 1.05)
+        optimizer = PlanOptimizer(constraints)
+        plan = optimizer.optimize(
+            probabilities, utilities, school_idx,
+            pool.location_ids[school_idx],
+            pool.discipline_ids[context.start + candidate_idx]
+        )
         
-        return category, risk_level, round(probability, 1)
-    
-    def recommend_by_weighted_score(self, student_info: Dict[str, Any], 
-                                   preferences: Optional[Dict[str, Any]] = None,
-                                   limit: int = 120) -> List[Dict[str, Any]]:
-        """
-        基于多因素加权评分的推荐
+        risk_levels = {'冲刺': '高', '稳健': '中', '保底': '低'}
+        volunteers = []
+        for i, (k, category) in enumerate(zip(plan['selected'], plan['categories']), 1):
+            school = int(school_idx[k])
+            probability = round(float(probabilities[k]), 1)
+            volunteers.append({
+                'id': i,
+                'school_code': '',
+                'school_name': pool.school_names[school],
+                'major_code': '',
+                'major_name': context.major_names[candidate_idx[k]],
+                'min_score': int(context.scores[candidate_idx[k]]),
+                'avg_rank_2025': int(ranks[k]),
+                'admission_probability': probability,
+                'risk_level': RISK_ESCALATION[risk_levels[category]] if volatile[k] else risk_levels[category],
+                'category': category,
+                'category_basis': f"方案优化 | 效用:{utilities[k]:.1f} | 录取概率:{probability}%",
+                'notes': '',
+                'tags': pool.school_tags[school]
+            })
         
-        Args:
-            student_info: 学生信息 {rank, score, ...}
-            preferences: 用户偏好 {majors, locations, school_types, ...}
-            limit: 返回数量
-            
-        Returns:
-            推荐列表
-        """
-        try:
-            student_rank = student_info.get('rank', 0)
-            
-            # 获取基础数据
-            df = self.data_service.get_data(2025)
-            if df is None or df.empty:
-                self.logger.error("无法获取投档数据")
-                return []
-            
-            # 确定列名
-            school_col = '招生院校' if '招生院校' in df.columns else '院校名称' if '院校名称' in df.columns else '学校名称'
-            major_col = '招生专业' if '招生专业' in df.columns else '专业名称'
-            rank_col = '位次' if '位次' in df.columns else '投档位次'
-            score_col = '投档最低分'
-            
-            # 设置位次范围限制（主要推荐在学生位次上下200位范围内的学校）
-            min_rank = student_rank - 200  # 下限：学生位次减200
-            max_rank = student_rank + 100  # 上限：学生位次加100（保底范围稍宽）
-            self.logger.info(f"位次范围限制: {min_rank} - {max_rank}")
-            
-            # 构建候选列表并计算加权分数
-            candidates = []
-            for _, row in df.iterrows():
-                try:
-                    if pd.notna(row.get(rank_col)):
-                        rank_value = int(row.get(rank_col))
-                        
-                        # 位次范围筛选：主要推荐在合理范围内的学校
-                        if rank_value < min_rank or rank_value > max_rank:
-                            continue  # 跳过超出位次范围的学校
-                        
-                        school_name = str(row.get(school_col, '')).strip() if school_col else '未知院校'
-                        major_name = str(row.get(major_col, '')).strip() if major_col else '未知专业'
-                        
-                        # 计算各项信息
-                        school_info = {
-                            'rank': rank_value,
-                            'score': int(row.get(score_col, 0)) if pd.notna(row.get(score_col)) else 0,
-                            'school_name': school_name,
-                            'major_name': major_name,
-                            'school_code': '',
-                            'major_code': '',
-                            'batch': '',
-                            'tags': self._get_school_tags(school_name)
-                        }
-                        
-                        # 应用筛选条件
-                        if preferences:
-                            # 1. 地区筛选（只有在用户设置了偏好时才筛选）
-                            if preferences.get('locations'):
-                                location_score = self.calculate_location_match_score(school_name, preferences)
-                                if location_score < 100:  # 100表示完全匹配，小于100表示不匹配或不确定
-                                    continue  # 跳过不符合地区偏好的院校
-                            
-                            # 2. 专业筛选（只有在用户设置了偏好时才筛选）
-                            if preferences.get('majors'):
-                                major_score = self.calculate_major_match_score(major_name, preferences)
-                                if major_score < 100:  # 100表示完全匹配，小于100表示不匹配
-                                    continue  # 跳过不符合专业偏好的院校
-                        
-                        # 计算加权总分
-                        scores = self.calculate_weighted_score(student_info, school_info, preferences)
-                        
-                        # 如果有学校类型偏好，额外筛选
-                        if preferences and preferences.get('school_types'):
-                            school_type_score = scores['level_score']
-                            min_level_score = 0
-                            if '985' in preferences['school_types']:
-                                min_level_score = max(min_level_score, 20)
-                            if '211' in preferences['school_types']:
-                                min_level_score = max(min_level_score, 15)
-                            if '双一流' in preferences['school_types']:
-                                min_level_score = max(min_level_score, 10)
-                            
-                            if school_type_score < min_level_score:
-                                continue  # 跳过不符合院校层次要求的
-                        
-                        # 计算排名优势
-                        advantage = student_info['rank'] - rank_value
-                        
-                        # 确定类别、风险、概率
-                        category, risk_level, probability = self.determine_category_enhanced(advantage, scores['total_score'])
-                        
-                        # 构建推荐项
-                        candidate = {
-                            'school_code': school_info['school_code'],
-                            'school_name': school_info['school_name'],
-                            'major_code': school_info['major_code'],
-                            'major_name': school_info['major_name'],
-                            'min_score': school_info['score'],
-                            'rank': rank_value,
-                            'batch': '',
-                            'year': 2025,
-                            'advantage': advantage,
-                            'total_score': scores['total_score'],
-                            'category': category,
-                            'risk_level': risk_level,
-                            'admission_probability': probability,
-                            'score_details': scores,  # 详细分数
-                            'tags': school_info['tags']
-                        }
-                        
-                        candidates.append(candidate)
-                        
-                except (ValueError, TypeError) as e:
-                    self.logger.warning(f"数据处理错误，跳过该行: {e}")
-                    continue
-            
-            if not candidates:
-                self.logger.error("没有符合条件的候选数据（可能筛选条件过于严格）")
-                return []
-            
-            # 按综合得分排序
-            candidates.sort(key=lambda x: x['total_score'], reverse=True)
-            
-            # 返回前N个（如果不足N个，返回实际数量）
-            recommendations = candidates[:limit]
-            
-            self.logger.info(f"为学生生成{len(recommendations)}个加权推荐（筛选后总计{len(candidates)}个候选）")
-            return recommendations
-            
-        except Exception as e:
-            self.logger.error(f"加权推荐过程发生错误: {str(e)}")
-            return []
+        self.logger.info(f"方案优化完成: {plan['summary']}（候选{len(candidate_idx)}个）")
+        return {'volunteers': volunteers, 'summary': plan['summary']}
     
     def generate_weighted_volunteers(self, student_info: Dict[str, Any], 
-                                   preferences: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+                                   preferences: Optional[Dict[str, Any]] = None,
+                                   session_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         生成多因素加权的志愿列表
         
         Args:
             student_info: 学生信息 {rank, score, ...}
             preferences: 用户偏好
+            session_id: 方案或会话标识
             
         Returns:
             志愿列表
         """
+        if session_id is not None:
+            # 重新生成方案时按新的偏好重新确定窗口
+            self.reset_session(session_id)
         recommendations = self.recommend_by_weighted_score(
             student_info, 
             preferences, 
-            limit=120
+            limit=120,
+            session_id=session_id
         )
+        return self._to_volunteers(recommendations)
+    
+    def _to_volunteers(self, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        将加权推荐结果转换为标准志愿格式
         
+        Args:
+            recommendations: 推荐列表
+            
+        Returns:
+            志愿列表
+        """
         # 转换为标准志愿格式
         volunteers = []
         for i, rec in enumerate(recommendations, 1):
@@ -1011,67 +873,9 @@ class WeightedRecommendationEngine:
     
     def _get_school_tags(self, school_name: str) -> Dict[str, bool]:
         """
-        获取学校标签（复用原有逻辑）
+        获取学校标签（复用院校标签位图）
         """
-        if not school_name:
-            return {
-                'is_985': False, 'is_211': False, 'is_double_first_class': False,
-                'is_private': False, 'is_independent': False,
-                'is_chinese_foreign': False, 'is_hk_macao_taiwan': False
-            }
-        
-        if school_name in self.school_tags_cache:
-            return self.school_tags_cache[school_name]
-        
-        try:
-            school_df = self.data_service.load_school_info()
-            if school_df is None or school_df.empty:
-                tags = {'is_985': False, 'is_211': False, 'is_double_first_class': False,
-                       'is_private': False, 'is_independent': False,
-                       'is_chinese_foreign': False, 'is_hk_macao_taiwan': False}
-                self.school_tags_cache[school_name] = tags
-                return tags
-            
-            school_col = '学校名称' if '学校名称' in school_df.columns else '院校名称'
-            school_row = school_df[school_df[school_col] == school_name]
-            
-            if school_row.empty:
-                tags = {'is_985': False, 'is_211': False, 'is_double_first_class': False,
-                       'is_private': False, 'is_independent': False,
-                       'is_chinese_foreign': False, 'is_hk_macao_taiwan': False}
-                self.school_tags_cache[school_name] = tags
-                return tags
-            
-            row = school_row.iloc[0]
-            
-            def to_bool(value):
-                if pd.isna(value):
-                    return False
-                return str(value).strip().upper() == 'Y'
-            
-            tags = {
-                'is_985': to_bool(row.get('985', '')),
-                'is_211': False,
-                'is_double_first_class': to_bool(row.get('双一流', '')),
-                'is_private': to_bool(row.get('民办高校', '')),
-                'is_independent': to_bool(row.get('独立学院', '')),
-                'is_chinese_foreign': to_bool(row.get('中外合作办学', '')),
-                'is_hk_macao_taiwan': to_bool(row.get('内地与港澳台合作办学', ''))
-            }
-            
-            if tags['is_985']:
-                tags['is_211'] = True
-            
-            self.school_tags_cache[school_name] = tags
-            return tags
-            
-        except Exception as e:
-            self.logger.warning(f"获取学校标签失败 {school_name}: {str(e)}")
-            tags = {'is_985': False, 'is_211': False, 'is_double_first_class': False,
-                   'is_private': False, 'is_independent': False,
-                   'is_chinese_foreign': False, 'is_hk_macao_taiwan': False}
-            self.school_tags_cache[school_name] = tags
-            return tags
+        return self.data_service.get_school_tags().get_tags(school_name)
 
 
 # 保持原有的纯排名推荐引擎作为备选
@@ -1128,47 +932,14 @@ class RecommendationEngine(WeightedRecommendationEngine):
             推荐列表
         """
         try:
-            # 获取数据
-            df = self.data_service.get_data(2025)
-            if df is None or df.empty:
-                self.logger.error("无法获取投档数据")
-                return []
-            
-            # 确定列名
-            school_col = '招生院校' if '招生院校' in df.columns else '院校名称' if '院校名称' in df.columns else '学校名称'
-            major_col = '招生专业' if '招生专业' in df.columns else '专业名称'
-            rank_col = '位次' if '位次' in df.columns else '投档位次'
-            score_col = '投档最低分'
-            batch_col = '批次' if '批次' in df.columns else ''
-            
-            # 转换为字典列表，准备排名推荐
-            items = []
-            for _, row in df.iterrows():
-                try:
-                    # 检查必要的排名数据是否存在
-                    if pd.notna(row.get(rank_col)):
-                        rank_value = int(row.get(rank_col))
-                        # 学生位次越小越好，录取位次越大对学生越有利
-                        items.append({
-                            'school_code': '',  # 院校编号可能不存在，用空字符串
-                            'school_name': str(row.get(school_col, '')).strip() if school_col else '未知院校',
-                            'major_code': '',  # 专业编号可能不存在，用空字符串
-                            'major_name': str(row.get(major_col, '')).strip() if major_col else '未知专业',
-                            'min_score': int(row.get(score_col, 0)) if pd.notna(row.get(score_col)) else 0,
-                            'rank': rank_value,  # 录取位次（数值越大表示越容易录取）
-                            'batch': str(row.get(batch_col, '')).strip() if batch_col else '',
-                            'year': 2025
-                        })
-                except (ValueError, TypeError) as e:
-                    self.logger.warning(f"数据转换错误，跳过该行: {e}")
-                    continue
-            
-            if not items:
+            # 按位次排序的候选池(每个数据版本构建一次)
+            pool = self.data_service.get_candidate_pool(2025)
+            if len(pool) == 0:
                 self.logger.error("没有有效的录取数据可用于推荐")
                 return []
             
             # 使用纯排名推荐器
-            recommender = PureRankRecommender(items)
+            recommender = PureRankRecommender(pool)
             recommendations = recommender.recommend(student_rank, strategy="balanced", top_k=limit)
             
             self.logger.info(f"为学生位次{student_rank}生成{len(recommendations)}个排名推荐")
@@ -1219,14 +990,18 @@ class RecommendationEngine(WeightedRecommendationEngine):
         # 使用基于排名的推荐方法
         raw_recommendations = self.recommend_by_rank(student_rank, limit=num_recommendations)
         
+        # 录取概率(曲线模型)
+        probabilities = admission_probabilities(
+            self.data_service, student_rank, np.array([rec.get('rank', 0) for rec in raw_recommendations], dtype=float)
+        )
+        
         # 转换为标准志愿格式
         volunteers = []
-        for i, rec in enumerate(raw_recommendations, 1):
+        for i, (rec, admission_probability) in enumerate(zip(raw_recommendations, probabilities.tolist()), 1):
             advantage = rec.get('advantage', 0)
             school_name = rec.get('school_name', '')
             
-            # 计算录取概率和风险等级
-            admission_probability = self._calculate_admission_probability(advantage)
+            # 计算风险等级
             risk_level = self._calculate_risk_level(advantage)
             category = rec.get('category', '匹配')
             category_basis = f"排名优势:{advantage}"
@@ -1289,132 +1064,7 @@ class RecommendationEngine(WeightedRecommendationEngine):
         Returns:
             标签字典
         """
-        if not school_name:
-            return {
-                'is_985': False,
-                'is_211': False,
-                'is_double_first_class': False,
-                'is_private': False,
-                'is_independent': False,
-                'is_chinese_foreign': False,
-                'is_hk_macao_taiwan': False
-            }
-        
-        # 检查缓存
-        if school_name in self.school_tags_cache:
-            return self.school_tags_cache[school_name]
-        
-        try:
-            # 加载学校信息
-            school_df = self.data_service.load_school_info()
-            if school_df is None or school_df.empty:
-                self.logger.warning("无法加载学校信息数据")
-                # 返回默认值
-                tags = {
-                    'is_985': False,
-                    'is_211': False,
-                    'is_double_first_class': False,
-                    'is_private': False,
-                    'is_independent': False,
-                    'is_chinese_foreign': False,
-                    'is_hk_macao_taiwan': False
-                }
-                self.school_tags_cache[school_name] = tags
-                return tags
-            
-            # 确定学校名称列（可能是 '学校名称' 或 '院校名称'）
-            school_col = '学校名称' if '学校名称' in school_df.columns else '院校名称'
-            
-            # 查找学校
-            school_row = school_df[school_df[school_col] == school_name]
-            
-            if school_row.empty:
-                # 学校不存在于信息表中
-                tags = {
-                    'is_985': False,
-                    'is_211': False,
-                    'is_double_first_class': False,
-                    'is_private': False,
-                    'is_independent': False,
-                    'is_chinese_foreign': False,
-                    'is_hk_macao_taiwan': False
-                }
-                self.school_tags_cache[school_name] = tags
-                return tags
-            
-            # 获取标签
-            row = school_row.iloc[0]
-            
-            # 转换 Y/空 为 True/False
-            def to_bool(value):
-                if pd.isna(value):
-                    return False
-                return str(value).strip().upper() == 'Y'
-            
-            tags = {
-                'is_985': to_bool(row.get('985', '')),
-                'is_211': False,  # 数据中没有直接的211字段，需要从名称或其他方式判断
-                'is_double_first_class': to_bool(row.get('双一流', '')),
-                'is_private': to_bool(row.get('民办高校', '')),
-                'is_independent': to_bool(row.get('独立学院', '')),
-                'is_chinese_foreign': to_bool(row.get('中外合作办学', '')),
-                'is_hk_macao_taiwan': to_bool(row.get('内地与港澳台合作办学', ''))
-            }
-            
-            # 特殊判断：很多985学校也是211
-            if tags['is_985']:
-                tags['is_211'] = True
-            
-            # 缓存结果
-            self.school_tags_cache[school_name] = tags
-            return tags
-            
-        except Exception as e:
-            self.logger.warning(f"获取学校标签失败 {school_name}: {str(e)}")
-            # 返回默认值
-            tags = {
-                'is_985': False,
-                'is_211': False,
-                'is_double_first_class': False,
-                'is_private': False,
-                'is_independent': False,
-                'is_chinese_foreign': False,
-                'is_hk_macao_taiwan': False
-            }
-            self.school_tags_cache[school_name] = tags
-            return tags
-    
-    def _calculate_admission_probability(self, advantage: int) -> float:
-        """
-        根据排名优势计算录取概率（仅基于排名比较）
-        
-        基于新的位次范围规则：
-        - 保底（advantage > 100）：70%-95%录取概率
-        - 稳健（-100 ≤ advantage ≤ 100）：30%-90%录取概率
-        - 冲刺（-200 ≤ advantage < 0）：10%-50%录取概率
-        
-        Args:
-            advantage: 排名优势 = 学生位次 - 录取位次
-                     正数：学生排名更靠前（优势），负数：学生排名更靠后（劣势）
-        
-        Returns:
-            录取概率 (0-100)
-        """
-        if advantage > 100:
-            # 强保底：学生排名明显靠前
-            return min(95.0, 70.0 + (advantage - 100) * 0.05)
-        elif advantage > 0:
-            # 保底：学生排名稍靠前
-            return min(90.0, 50.0 + advantage * 0.4)
-        elif advantage >= -100:
-            # 稳健/匹配：学生排名相当
-            return max(30.0, min(70.0, 50.0 + advantage * 0.2))
-        elif advantage >= -200:
-            # 冲刺：学生排名稍靠后，但差距不大
-            return max(10.0, min(50.0, 30.0 + (advantage + 100) * 0.2))
-        else:
-            # 超出冲刺范围，概率很低
-            return max(1.0, min(30.0, 10.0 + (advantage + 200) * 0.1))
+        return self.data_service.get_school_tags().get_tags(school_name)
     
     def _determine_category_by_advantage(self, advantage: int) -> str:
         """
@@ -1457,39 +1107,12 @@ class RecommendationEngine(WeightedRecommendationEngine):
             return {'success': False, 'error': '缺少位次信息'}
         
         # 使用纯排名推荐器生成不同策略的推荐
-        df = self.data_service.get_data(2025)
-        if df is None or df.empty:
-            return {'success': False, 'error': '无法获取投档数据'}
-        
-        # 准备数据
-        school_col = '招生院校' if '招生院校' in df.columns else '院校名称' if '院校名称' in df.columns else '学校名称'
-        major_col = '招生专业' if '招生专业' in df.columns else '专业名称'
-        rank_col = '位次' if '位次' in df.columns else '投档位次'
-        score_col = '投档最低分'
-        
-        items = []
-        for _, row in df.iterrows():
-            try:
-                if pd.notna(row.get(rank_col)):
-                    rank_value = int(row.get(rank_col))
-                    items.append({
-                        'school_code': '',
-                        'school_name': str(row.get(school_col, '')).strip() if school_col else '未知院校',
-                        'major_code': '',
-                        'major_name': str(row.get(major_col, '')).strip() if major_col else '未知专业',
-                        'min_score': int(row.get(score_col, 0)) if pd.notna(row.get(score_col)) else 0,
-                        'rank': rank_value,
-                        'batch': '',
-                        'year': 2025
-                    })
-            except (ValueError, TypeError):
-                continue
-        
-        if not items:
+        pool = self.data_service.get_candidate_pool(2025)
+        if len(pool) == 0:
             return {'success': False, 'error': '没有有效的录取数据'}
         
         # 生成不同策略的推荐
-        recommender = PureRankRecommender(items)
+        recommender = PureRankRecommender(pool)
         conservative_rec = recommender.recommend(rank, strategy="conservative", top_k=40)
         balanced_rec = recommender.recommend(rank, strategy="balanced", top_k=120)
         aggressive_rec = recommender.recommend(rank, strategy="aggressive", top_k=40)
@@ -1528,8 +1151,8 @@ class RecommendationEngine(WeightedRecommendationEngine):
     
     def _create_volunteer(self, row, index: int, type_str: str, student_score: int) -> Dict[str, Any]:
         """创建志愿字典"""
-        import hashlib
         from datetime import datetime
+        from core.data.school_registry import legacy_school_code
         
         # 计算录取概率（简单估算）
         diff = student_score - row['投档最低分']
@@ -1567,7 +1190,7 @@ class RecommendationEngine(WeightedRecommendationEngine):
             major = row.index[1] if len(row.index) > 1 else "未知专业"
         
         # 生成学校代码（使用哈希）
-        school_code = str(int(hashlib.md5(str(school_name).encode('utf-8')).hexdigest(), 16) % 100000)
+        school_code = legacy_school_code(str(school_name))
         
         # 计算风险等级
         if probability >= 70:
@@ -1657,7 +1280,8 @@ class RecommendationEngine:
     
     def generate_volunteers(self, student_info: Dict[str, Any], 
                            preferences: Optional[Dict[str, Any]] = None,
-                           algorithm: Optional[str] = None) -> List[Dict[str, Any]]:
+                           algorithm: Optional[str] = None,
+                           session_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         生成志愿（支持算法选择）
         
@@ -1665,6 +1289,7 @@ class RecommendationEngine:
             student_info: 学生信息
             preferences: 用户偏好
             algorithm: 算法选择 ('ml', 'weighted', 或 None使用默认)
+            session_id: 方案或会话标识（加权算法的后续重排复用其上下文）
             
         Returns:
             志愿列表
@@ -1679,7 +1304,46 @@ class RecommendationEngine:
             return self.ml_engine.generate_ml_volunteers(student_info, preferences)
         else:
             # 加权评分算法（默认）
-            return self.weighted_engine.generate_weighted_volunteers(student_info, preferences)
+            return self.weighted_engine.generate_weighted_volunteers(student_info, preferences, session_id)
+    
+    def rerank_volunteers(self, student_info: Dict[str, Any],
+                          preferences: Optional[Dict[str, Any]] = None,
+                          add: Optional[Dict[str, List[str]]] = None,
+                          remove: Optional[Dict[str, List[str]]] = None,
+                          weights: Optional[Dict[str, float]] = None,
+                          session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        交互式调整偏好后增量重排志愿（加权算法）
+        
+        Args:
+            student_info: 学生信息
+            preferences: 调整前的完整偏好
+            add: 新增的偏好
+            remove: 移除的偏好
+            weights: 权重覆盖
+            session_id: 方案或会话标识
+            
+        Returns:
+            {'preferences': 生效的偏好, 'volunteers': 志愿列表}
+        """
+        return self.weighted_engine.rerank(student_info, preferences, add, remove, weights,
+                                           session_id=session_id)
+    
+    def optimize_plan(self, student_info: Dict[str, Any],
+                      preferences: Optional[Dict[str, Any]] = None,
+                      constraints: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        在约束下优化整套志愿方案
+        
+        Args:
+            student_info: 学生信息
+            preferences: 用户偏好
+            constraints: 方案约束
+            
+        Returns:
+            {'volunteers': 志愿列表, 'summary': 方案统计}
+        """
+        return self.weighted_engine.optimize_plan(student_info, preferences, constraints)
     
     def recommend_by_rank(self, student_rank: int, limit: int = 120) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,142 @@
+"""
+志愿推荐上下文
+按 (方案, 学生位次, 学生分数, 数据版本) 缓存位次窗口内与偏好无关的打分分量,
+用户调整偏好(增减地区、专业、院校类型)或权重时只需重新组合掩码和加权求和;
+上下文本身不保存偏好,偏好由调用方每次显式传入
+"""
+
+import threading
+from typing import Dict, Any, List, Optional
+import numpy as np
+from cachetools import LRUCache
+from .preference_filter import PreferenceFilter
+from utils.logger import get_logger
+
+
+# 支持增减的列表型偏好
+LIST_PREFERENCES = ('locations', 'majors', 'school_types')
+
+
+def apply_preference_changes(preferences: Optional[Dict[str, Any]],
+                             add: Optional[Dict[str, List[str]]] = None,
+                             remove: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+    """
+    在已有偏好上增减条件
+
+    Args:
+        preferences: 当前偏好
+        add: 新增的偏好 {locations, majors, school_types}
+        remove: 移除的偏好
+
+    Returns:
+        新的偏好字典(不修改传入的偏好)
+    """
+    updated = dict(preferences or {})
+    for key in LIST_PREFERENCES:
+        values = list(updated.get(key) or [])
+        for value in (add or {}).get(key) or []:
+            if value not in values:
+                values.append(value)
+        removed = set((remove or {}).get(key) or [])
+        updated[key] = [value for value in values if value not in removed]
+    return updated
+
+
+class RecommendationContext:
+    """单个学生的推荐上下文(位次窗口内的缓存打分分量)"""
+
+    # 单个关键词掩码的缓存数量上限(每个掩码与候选池等长)
+    MASK_CACHE_SIZE = 32
+
+    def __init__(self, pool, student_rank: int, student_score: int,
+                 min_rank: float, max_rank: float, school_level_scores: Dict[str, float]):
+        """
+        构建推荐上下文
+
+        Args:
+            pool: 候选池(CandidatePool)
+            student_rank: 学生位次
+            student_score: 学生分数
+            min_rank: 位次窗口下限
+            max_rank: 位次窗口上限
+            school_level_scores: 学校层次评分配置
+        """
+        self.logger = get_logger("RecommendationContext")
+        self.pool = pool
+        self.student_rank = student_rank
+        self.student_score = student_score
+        self.start, self.end = pool.rank_range(min_rank, max_rank)
+
+        self.ranks = pool.ranks[self.start:self.end]
+        self.scores = pool.scores[self.start:self.end]
+        self.school_idx = pool.school_idx[self.start:self.end]
+        self.major_names = pool.major_names[self.start:self.end]
+        self.row_positions = pool.row_positions[self.start:self.end]
+
+        # 与偏好无关的分量
+        if student_rank > 0:
+            self.rank_scores = np.maximum(0, 100 - np.abs(student_rank - self.ranks) / student_rank * 100)
+        else:
+            self.rank_scores = np.zeros(len(self.ranks))
+        if student_score > 0:
+            self.score_scores = np.maximum(0, 100 - np.abs(student_score - self.scores) * 2).astype(float)
+        else:
+            self.score_scores = np.zeros(len(self.ranks))
+        self.level_scores = pool.school_level_scores(school_level_scores)[self.school_idx]
+
+        # 单个关键词掩码缓存(有界,并发请求共用时加锁)
+        self.mask_cache: LRUCache = LRUCache(maxsize=self.MASK_CACHE_SIZE)
+        self._mask_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def score(self, preferences: Optional[Dict[str, Any]],
+              weights: Dict[str, float]) -> Optional[Dict[str, np.ndarray]]:
+        """
+        按偏好筛选并计算综合得分
+
+        Args:
+            preferences: 用户偏好
+            weights: 各分量权重
+
+        Returns:
+            候选记录的下标和各项得分(均为窗口内候选的数组),无候选时返回None
+        """
+        with self._mask_lock:
+            pref_filter = PreferenceFilter(self.pool, preferences, self.mask_cache)
+        candidate_idx = np.flatnonzero(pref_filter.row_mask(self.start, self.end))
+        if len(candidate_idx) == 0:
+            return None
+
+        # 与偏好相关的分量: 地域(院校维度)和专业(记录维度)
+        school_idx = self.school_idx[candidate_idx]
+        if pref_filter.location_match is not None:
+            location_scores = np.where(pref_filter.location_match, 100.0, 20.0)[school_idx]
+        else:
+            location_scores = np.full(len(candidate_idx), 50.0)
+        if pref_filter.major_match is not None:
+            major_scores = np.where(pref_filter.major_match[self.start:self.end][candidate_idx], 100.0, 30.0)
+        else:
+            major_scores = np.full(len(candidate_idx), 30.0)
+
+        rank_scores = self.rank_scores[candidate_idx]
+        score_scores = self.score_scores[candidate_idx]
+        level_scores = self.level_scores[candidate_idx]
+        total_scores = np.round(
+            rank_scores * weights['rank_match'] +
+            score_scores * weights['score_match'] +
+            level_scores * weights['school_level'] +
+            major_scores * weights['major_match'] +
+            location_scores * weights['location_match'],
+            2
+        )
+        return {
+            'candidate_idx': candidate_idx,
+            'total_scores': total_scores,
+            'rank_scores': rank_scores,
+            'score_scores': score_scores,
+            'level_scores': level_scores,
+            'major_scores': major_scores,
+            'location_scores': location_scores
+        }
@@ -3,8 +3,10 @@
 提供院校和专业搜索功能
 """
 
+import numpy as np
 import pandas as pd
 from typing import Dict, Any, List, Optional
+from core.data.school_tags import TAG_KNOWN, TAG_MASK_COLUMN, BASIC_TAGS, decode_tags, match_tags
 from utils.logger import get_logger
 
 
@@ -415,89 +417,57 @@ class SearchEngine:
             if rank_col and max_rank is not None:
                 df = df[df[rank_col] <= max_rank]
 
-            # 转换为列表格式（先获取基本数据）
+            # 城市和标签过滤(标签掩码列在数据加载时按院校广播,过滤为一次按位与)
+            school_tags = None
+            try:
+                school_tags = self.data_processor.get_school_tags()
+            except Exception as e:
+                self.logger.warning(f"加载学校信息进行过滤失败: {e}")
+
+            with_info = school_tags is not None and len(school_tags.school_names) > 0
+            if with_info:
+                if TAG_MASK_COLUMN in df.columns:
+                    row_masks = df[TAG_MASK_COLUMN].to_numpy(dtype=np.uint16)
+                else:
+                    row_masks = school_tags.masks_for(df[school_col])
+                keep = (row_masks & TAG_KNOWN) > 0
+                keep &= match_tags(
+                    row_masks,
+                    is_985=is_985,
+                    is_211=is_211,
+                    is_double_first_class=is_double_first_class,
+                    is_private=is_private,
+                    is_independent=is_independent
+                )
+                if city:
+                    city_schools = [name for name, c in zip(school_tags.school_names, school_tags.cities) if c == city]
+                    keep &= df[school_col].isin(city_schools).to_numpy()
+                df = df[keep]
+                row_masks = row_masks[keep]
+
+            # 转换为列表格式
+            scores = df[score_col].tolist() if score_col else [0] * len(df)
+            ranks = df[rank_col].tolist() if rank_col else [0] * len(df)
             results = []
-            for _, row in df.iterrows():
-                results.append({
-                    'university': row[school_col],
-                    'major': row[major_col],
-                    'score': int(row[score_col]) if score_col else 0,
-                    'rank': int(row[rank_col]) if rank_col else 0,
+            for i, (uni_name, major_name) in enumerate(zip(df[school_col], df[major_col])):
+                item = {
+                    'university': uni_name,
+                    'major': major_name,
+                    'score': int(scores[i]),
+                    'rank': int(ranks[i]),
                     'city': '',
                     'tags': {},
                     'postgraduate_info': None,
                     'evaluations': [],
                     'detail_link': ''
-                })
-
-            # 加载学校信息并进行城市和标签过滤
-            try:
-                school_info_df = self.data_processor.get_school_loader().load()
-                if school_info_df is not None and not school_info_df.empty:
-                    # 确定学校信息列名
-                    school_info_col = None
-                    if '学校名称' in school_info_df.columns:
-                        school_info_col = '学校名称'
-                    elif '院校名称' in school_info_df.columns:
-                        school_info_col = '院校名称'
-
-                    if school_info_col:
-                        # 创建学校信息映射
-                        school_info_map = {}
-                        for _, row in school_info_df.iterrows():
-                            school_name = row[school_info_col]
-                            school_info_map[school_name] = {
-                                'city': row.get('所在城市', row.get('所在区域', '')),
-                                'is_985': str(row.get('985', '')) == 'Y',
-                                'is_211': '211' in str(row.get('办学层次', '')),
-                                'is_double_first_class': str(row.get('双一流', '')) == 'Y',
-                                'is_private': str(row.get('民办高校', '')) == 'Y',
-                                'is_independent': str(row.get('独立学院', '')) == 'Y',
-                                'detail_link': row.get('明细链接', '')
-                            }
-
-                        # 过滤和补充信息
-                        filtered_results = []
-                        for item in results:
-                            uni_name = item['university']
-                            if uni_name in school_info_map:
-                                school_info = school_info_map[uni_name]
-
-                                # 应用城市和标签过滤
-                                passes_filter = True
-
-                                # 城市过滤
-                                if city and school_info['city'] != city:
-                                    passes_filter = False
-
-                                # 标签过滤
-                                if is_985 is not None and school_info['is_985'] != is_985:
-                                    passes_filter = False
-                                if is_211 is not None and school_info['is_211'] != is_211:
-                                    passes_filter = False
-                                if is_double_first_class is not None and school_info['is_double_first_class'] != is_double_first_class:
-                                    passes_filter = False
-                                if is_private is not None and school_info['is_private'] != is_private:
-                                    passes_filter = False
-                                if is_independent is not None and school_info['is_independent'] != is_independent:
-                                    passes_filter = False
-
-                                if passes_filter:
-                                    # 添加学校信息到结果
-                                    item['city'] = school_info['city']
-                                    item['tags'] = {
-                                        'is_985': school_info['is_985'],
-                                        'is_211': school_info['is_211'],
-                                        'is_double_first_class': school_info['is_double_first_class'],
-                                        'is_private': school_info['is_private'],
-                                        'is_independent': school_info['is_independent']
-                                    }
-                                    item['detail_link'] = school_info['detail_link']
-                                    filtered_results.append(item)
-
-                        results = filtered_results
-            except Exception as e:
-                self.logger.warning(f"加载学校信息进行过滤失败: {e}")
+                }
+                if with_info:
+                    info = school_tags.get_info(uni_name)
+                    tags = decode_tags(row_masks[i])
+                    item['city'] = info['city']
+                    item['tags'] = {name: tags[name] for name in BASIC_TAGS}
+                    item['detail_link'] = info['detail_link']
+                results.append(item)
 
             # 排序
             if sort_by == 'rank':
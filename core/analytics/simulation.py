@@ -0,0 +1,138 @@
+"""
+志愿方案蒙特卡洛模拟
+按位次预测的不确定性批量抽样各志愿下一年的录取位次,
+按平行志愿"位次优先、遵循志愿"的顺序投档规则评估整套方案
+"""
+
+from typing import Dict, Any, List, Optional
+import numpy as np
+from utils.logger import get_logger
+
+
+class PlanSimulator:
+    """志愿方案录取模拟器"""
+
+    # 默认模拟次数
+    N_SIMULATIONS = 20000
+
+    # 各志愿位次波动中全省共同因素所占的相关系数(同一年各校位次同涨同落)
+    CORRELATION = 0.5
+
+    # 无预测结果且无录取概率曲线时的相对标准差,以及相对标准差下限
+    DEFAULT_RELATIVE_STD = 0.15
+    MIN_RELATIVE_STD = 0.03
+
+    def __init__(self, prediction_engine, n_simulations: int = N_SIMULATIONS,
+                 correlation: float = CORRELATION, data_service=None):
+        """
+        初始化模拟器
+
+        Args:
+            prediction_engine: 位次预测引擎(PredictionEngine)
+            n_simulations: 模拟次数
+            correlation: 各志愿位次波动的共同因素相关系数
+            data_service: 数据服务(可选,用于获取录取概率曲线的分段漂移和波动)
+        """
+        self.prediction_engine = prediction_engine
+        self.data_service = data_service
+        self.n_simulations = n_simulations
+        self.correlation = correlation
+        self.logger = get_logger("PlanSimulator")
+
+    def simulate(self, student_rank: float, predicted_ranks: np.ndarray,
+                 relative_std: np.ndarray, seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        模拟平行志愿投档
+
+        各志愿录取位次服从对数正态分布: log(位次) = log(预测位次) + σ·(√ρ·z共同 + √(1-ρ)·z志愿),
+        每次模拟中学生被第一个满足 学生位次 ≤ 录取位次 的志愿录取
+
+        Args:
+            student_rank: 学生位次
+            predicted_ranks: 各志愿预测录取位次(按填报顺序)
+            relative_std: 各志愿录取位次的相对标准差
+            seed: 随机种子
+
+        Returns:
+            各志愿录取概率、滑档概率、期望录取志愿序号等
+        """
+        predicted_ranks = np.asarray(predicted_ranks, dtype=float)
+        n = len(predicted_ranks)
+        if n == 0:
+            return {
+                'n_simulations': 0, 'position_probabilities': [], 'entry_probabilities': [],
+                'admission_probability': 0.0, 'fall_through_probability': 100.0,
+                'expected_position': None
+            }
+
+        rng = np.random.default_rng(seed)
+        sigma = np.maximum(np.asarray(relative_std, dtype=float), self.MIN_RELATIVE_STD).astype(np.float32)
+        common = rng.standard_normal((self.n_simulations, 1), dtype=np.float32)
+        own = rng.standard_normal((self.n_simulations, n), dtype=np.float32)
+        shocks = np.sqrt(self.correlation) * common + np.sqrt(1 - self.correlation) * own
+
+        # 比较 log(学生位次) ≤ log(录取位次),避免对整张矩阵取指数
+        threshold = np.log(max(float(student_rank), 1.0)) - np.log(np.maximum(predicted_ranks, 1.0))
+        admitted = shocks * sigma >= threshold.astype(np.float32)
+
+        any_admitted = admitted.any(axis=1)
+        first = np.argmax(admitted, axis=1)[any_admitted]
+        position_counts = np.bincount(first, minlength=n)
+
+        position_probabilities = position_counts / self.n_simulations
+        entry_probabilities = admitted.mean(axis=0)
+        admission_probability = float(any_admitted.mean())
+        expected_position = float(first.mean()) + 1 if len(first) else None
+
+        return {
+            'n_simulations': self.n_simulations,
+            'position_probabilities': np.round(position_probabilities * 100, 2).tolist(),
+            'entry_probabilities': np.round(entry_probabilities * 100, 2).tolist(),
+            'admission_probability': round(admission_probability * 100, 2),
+            'fall_through_probability': round((1 - admission_probability) * 100, 2),
+            'expected_position': round(expected_position, 2) if expected_position is not None else None
+        }
+
+    def simulate_plan(self, student_rank: float, volunteers: List[Dict[str, Any]],
+                      seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        模拟整套志愿方案
+
+        各志愿的预测录取位次和波动取自专业位次预测;无预测结果时退回志愿中的
+        参考位次(avg_rank_2025 / rank),按录取概率曲线该位次段的漂移和波动调整
+        (无曲线时使用默认波动)
+
+        Args:
+            student_rank: 学生位次
+            volunteers: 志愿列表(按填报顺序,含 school_name, major_name)
+            seed: 随机种子
+
+        Returns:
+            模拟结果(含每个志愿的预测位次)
+        """
+        pairs = [(v.get('school_name', ''), v.get('major_name', '')) for v in volunteers]
+        predicted, half_width = self.prediction_engine.estimate_major_ranks(pairs)
+
+        reference = np.array([
+            v.get('avg_rank_2025') or v.get('rank') or np.nan for v in volunteers
+        ], dtype=float)
+        missing = ~np.isfinite(predicted)
+        default_std = np.full(len(volunteers), self.DEFAULT_RELATIVE_STD)
+        if self.data_service is not None and missing.any():
+            drift, spread = self.data_service.get_probability_model().band_spread(np.nan_to_num(reference))
+            reference = reference * np.exp(drift)
+            default_std = np.where(missing, spread, default_std)
+        predicted = np.where(missing, reference, predicted)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            relative_std = np.where(missing | ~np.isfinite(half_width), default_std,
+                                    half_width / predicted)
+
+        # 既无预测也无参考位次的志愿视为无法录取
+        usable = np.isfinite(predicted) & (predicted > 0)
+        predicted = np.where(usable, predicted, 0.0)
+        relative_std = np.where(usable, relative_std, self.MIN_RELATIVE_STD)
+
+        result = self.simulate(student_rank, predicted, relative_std, seed)
+        result['predicted_ranks'] = [int(round(r)) if ok else None for r, ok in zip(predicted, usable)]
+        result['predicted_count'] = int((~missing).sum())
+        return result
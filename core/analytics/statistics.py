@@ -3,8 +3,11 @@
 提供基础统计、分数分布、位次分布等功能
 """
 
+import numpy as np
 import pandas as pd
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from core.data.score_histogram import ScoreHistogram
+from core.data.order_statistics import ScoreOrderStatistics
 from utils.logger import get_logger
 
 
@@ -21,12 +24,15 @@ class StatisticsAnalyzer:
         self.data_processor = data_processor
         self.logger = get_logger("StatisticsAnalyzer")
     
+    # 基础统计附带的分数百分位
+    PERCENTILES = (10, 25, 75, 90)
+
     def get_basic_statistics(self, min_score: Optional[int] = None,
                              max_score: Optional[int] = None,
                              min_rank: Optional[int] = None,
                              max_rank: Optional[int] = None) -> Dict[str, Any]:
         """
-        获取基础统计数据
+        获取基础统计数据(有序分数数组上二分切片,前缀和求均值)
 
         Args:
             min_score: 最低分数
@@ -37,120 +43,125 @@ class StatisticsAnalyzer:
         Returns:
             统计数据字典
         """
+        empty = {
+            'total_records': 0,
+            'universities_count': 0,
+            'majors_count': 0,
+            'score_range': {
+                'min': 0,
+                'max': 0,
+                'mean': 0,
+                'median': 0
+            }
+        }
         try:
-            df = self.data_processor.get_data()
+            stats = self.data_processor.get_order_statistics()
 
-            # 检查DataFrame是否为空或缺少必需列
-            if df.empty:
+            # 检查数据是否为空或缺少必需列
+            if len(stats) == 0:
                 self.logger.warning("DataFrame为空")
-                return {
-                    'total_records': 0,
-                    'universities_count': 0,
-                    'majors_count': 0,
-                    'score_range': {
-                        'min': 0,
-                        'max': 0,
-                        'mean': 0,
-                        'median': 0
-                    }
-                }
+                return empty
 
-            if '投档最低分' not in df.columns:
-                self.logger.warning(f"DataFrame缺少'投档最低分'列，当前列: {df.columns.tolist()}")
-                return {
-                    'total_records': 0,
-                    'universities_count': 0,
-                    'majors_count': 0,
-                    'score_range': {
-                        'min': 0,
-                        'max': 0,
-                        'mean': 0,
-                        'median': 0
-                    }
-                }
+            if not stats.has_scores:
+                self.logger.warning("DataFrame缺少'投档最低分'列")
+                return empty
 
-            self.logger.info(f"DataFrame列名: {df.columns.tolist()}, 数据行数: {len(df)}")
-
-            # 应用筛选条件
-            if min_score is not None:
-                df = df[df['投档最低分'] >= min_score]
-            if max_score is not None:
-                df = df[df['投档最低分'] <= max_score]
-            if min_rank is not None and '位次' in df.columns:
-                df = df[df['位次'] >= min_rank]
-            if max_rank is not None and '位次' in df.columns:
-                df = df[df['位次'] <= max_rank]
-
-            # 计算统计信息
-            total_records = len(df)
-
-            # 确定院校列名
-            school_col = None
-            if '招生院校' in df.columns:
-                school_col = '招生院校'
-            elif '院校名称' in df.columns:
-                school_col = '院校名称'
-            elif '学校名称' in df.columns:
-                school_col = '学校名称'
-
-            # 确定专业列名
-            major_col = None
-            if '招生专业' in df.columns:
-                major_col = '招生专业'
-            elif '专业名称' in df.columns:
-                major_col = '专业名称'
-
-            universities_count = df[school_col].nunique() if school_col else 0
-            majors_count = df[major_col].nunique() if major_col else 0
-
-            if total_records > 0:
-                scores = df['投档最低分']
-                min_score_val = int(scores.min())
-                max_score_val = int(scores.max())
-                mean_score = float(scores.mean())
-                median_score = float(scores.median())
-
-                score_range = {
-                    'min': min_score_val,
-                    'max': max_score_val,
-                    'mean': mean_score,
-                    'median': median_score
-                }
+            # 筛选条件对应有序数组上的连续切片；位次不随分数单调时对筛选后的数据临时构建
+            rank_filtered = stats.has_ranks and (min_rank is not None or max_rank is not None)
+            if stats.sliceable or not rank_filtered:
+                start, end = stats.slice_range(min_score, max_score, min_rank, max_rank)
             else:
-                score_range = {
-                    'min': 0,
-                    'max': 0,
-                    'mean': 0,
-                    'median': 0
-                }
+                df = self.data_processor.get_data()
+                if min_score is not None:
+                    df = df[df['投档最低分'] >= min_score]
+                if max_score is not None:
+                    df = df[df['投档最低分'] <= max_score]
+                if min_rank is not None:
+                    df = df[df['位次'] >= min_rank]
+                if max_rank is not None:
+                    df = df[df['位次'] <= max_rank]
+                stats = ScoreOrderStatistics(df)
+                start, end = 0, len(stats)
+
+            summary = stats.summary(start, end, self.PERCENTILES)
+            score_range = {
+                'min': summary['min'],
+                'max': summary['max'],
+                'mean': summary['mean'],
+                'median': summary['median']
+            }
+            if summary['percentiles']:
+                score_range['percentiles'] = summary['percentiles']
 
             return {
-                'total_records': total_records,
-                'universities_count': universities_count,
-                'majors_count': majors_count,
+                'total_records': summary['count'],
+                'universities_count': summary['universities_count'],
+                'majors_count': summary['majors_count'],
                 'score_range': score_range
             }
         except Exception as e:
             self.logger.error(f"获取基础统计数据失败: {e}")
-            return {
-                'total_records': 0,
-                'universities_count': 0,
-                'majors_count': 0,
-                'score_range': {
-                    'min': 0,
-                    'max': 0,
-                    'mean': 0,
-                    'median': 0
-                },
-                'error': str(e)
-            }
+            return {**empty, 'error': str(e)}
     
+    # 分数分段(与 pd.cut 一致: 右闭区间, 首段包含下限)
+    SCORE_BINS = [300, 350, 400, 450, 500, 550, 600, 650, 700]
+    # 位次分段(末段不设上限)
+    RANK_BINS = [0, 20000, 40000, 60000, 80000, 100000, 120000, float('inf')]
+
+    @staticmethod
+    def _bin_bounds(bins) -> tuple:
+        """
+        将右闭分段边界转换为整数闭区间 [下限, 上限]
+
+        Args:
+            bins: 分段边界
+
+        Returns:
+            (下限数组, 上限数组)
+        """
+        lows = np.asarray(bins[:-1], dtype=float) + 1
+        lows[0] = bins[0]
+        return lows, np.asarray(bins[1:], dtype=float)
+
+    def _get_histogram(self, min_score: Optional[int], max_score: Optional[int],
+                       min_rank: Optional[int], max_rank: Optional[int]) -> tuple:
+        """
+        获取直方图及生效的分数/位次筛选区间
+
+        位次为分数的单调函数时,位次筛选换算为分数区间,直接使用预先计算的直方图;
+        否则对筛选后的数据临时构建直方图
+
+        Returns:
+            (直方图, 分数下限, 分数上限, 位次下限, 位次上限)
+        """
+        histogram = self.data_processor.get_score_histogram()
+        score_low = -np.inf if min_score is None else min_score
+        score_high = np.inf if max_score is None else max_score
+        rank_low = -np.inf if min_rank is None else min_rank
+        rank_high = np.inf if max_rank is None else max_rank
+
+        if histogram.has_ranks and (min_rank is not None or max_rank is not None):
+            bounds = histogram.score_bounds_for_ranks(min_rank, max_rank)
+            if bounds is None:
+                df = self.data_processor.get_data()
+                if min_score is not None:
+                    df = df[df['投档最低分'] >= min_score]
+                if max_score is not None:
+                    df = df[df['投档最低分'] <= max_score]
+                if min_rank is not None:
+                    df = df[df['位次'] >= min_rank]
+                if max_rank is not None:
+                    df = df[df['位次'] <= max_rank]
+                return ScoreHistogram(df), -np.inf, np.inf, -np.inf, np.inf
+            score_low, score_high = max(score_low, bounds[0]), min(score_high, bounds[1])
+        return histogram, score_low, score_high, rank_low, rank_high
+
     def get_score_distribution(self, min_score: Optional[int] = None,
                                max_score: Optional[int] = None,
                                min_rank: Optional[int] = None,
                                max_rank: Optional[int] = None) -> Dict[str, Any]:
         """
-        获取分数分布
+        获取分数分布(前缀和直方图)
 
         Args:
             min_score: 最低分数
@@ -161,57 +172,32 @@ class StatisticsAnalyzer:
         Returns:
             分数分布数据
         """
+        default = {
+            'ranges': [{'min': 300 + i * 50, 'max': 349 + i * 50} for i in range(8)],
+            'scores': [0] * 8
+        }
         try:
-            df = self.data_processor.get_data()
-
-            # 检查DataFrame是否为空或缺少必需列
-            if df.empty or '投档最低分' not in df.columns:
-                return {
-                    'ranges': [{'min': 300 + i * 50, 'max': 349 + i * 50} for i in range(8)],
-                    'scores': [0] * 8
-                }
-
-            # 应用分数筛选
-            if min_score is not None:
-                df = df[df['投档最低分'] >= min_score]
-            if max_score is not None:
-                df = df[df['投档最低分'] <= max_score]
-
-            # 应用位次筛选
-            if min_rank is not None and '位次' in df.columns:
-                df = df[df['位次'] >= min_rank]
-            if max_rank is not None and '位次' in df.columns:
-                df = df[df['位次'] <= max_rank]
-
-            if df.empty:
-                return {
-                    'ranges': [{'min': 300 + i * 50, 'max': 349 + i * 50} for i in range(8)],
-                    'scores': [0] * 8
-                }
+            histogram, score_low, score_high, _, _ = self._get_histogram(min_score, max_score, min_rank, max_rank)
+            if not histogram.has_scores or histogram.score_total == 0:
+                return default
 
             # 按50分分段
-            bins = [300, 350, 400, 450, 500, 550, 600, 650, 700]
-            labels = ['300-349', '350-399', '400-449', '450-499', '500-549', '550-599', '600-649', '650-700']
-
-            df['分数段'] = pd.cut(df['投档最低分'], bins=bins, labels=labels, include_lowest=True)
-            distribution = df['分数段'].value_counts().sort_index()
+            bins = self.SCORE_BINS
+            lows, highs = self._bin_bounds(bins)
+            counts = histogram.score_counts(np.maximum(lows, score_low), np.minimum(highs, score_high))
 
             return {
                 'ranges': [{'min': 300 + i * 50, 'max': 349 + i * 50} for i in range(len(bins) - 1)],
-                'scores': [int(val) for val in distribution.values]
+                'scores': [int(val) for val in counts]
             }
         except Exception as e:
             self.logger.error(f"获取分数分布失败: {e}")
-            return {
-                'ranges': [{'min': 300 + i * 50, 'max': 349 + i * 50} for i in range(8)],
-                'scores': [0] * 8,
-                'error': str(e)
-            }
+            return {**default, 'error': str(e)}
     
     def get_rank_distribution(self, min_rank: Optional[int] = None,
                               max_rank: Optional[int] = None) -> Dict[str, Any]:
         """
-        获取位次分布
+        获取位次分布(前缀和直方图)
 
         Args:
             min_rank: 最低位次
@@ -220,50 +206,69 @@ class StatisticsAnalyzer:
         Returns:
             位次分布数据
         """
+        default_bins = [0, 20000, 40000, 60000, 80000, 100000, 120000]
+        default = {
+            'ranges': [{'min': default_bins[i], 'max': default_bins[i + 1]} for i in range(len(default_bins) - 1)],
+            'counts': [0] * (len(default_bins) - 1)
+        }
         try:
-            df = self.data_processor.get_data()
-
-            # 检查DataFrame是否为空或缺少必需列
-            if df.empty or '位次' not in df.columns:
-                bins = [0, 20000, 40000, 60000, 80000, 100000, 120000]
-                return {
-                    'ranges': [{'min': bins[i], 'max': bins[i + 1]} for i in range(len(bins) - 1)],
-                    'counts': [0] * (len(bins) - 1)
-                }
-
-            # 应用位次筛选
-            if min_rank is not None:
-                df = df[df['位次'] >= min_rank]
-            if max_rank is not None:
-                df = df[df['位次'] <= max_rank]
-
-            if df.empty:
-                bins = [0, 20000, 40000, 60000, 80000, 100000, 120000]
-                return {
-                    'ranges': [{'min': bins[i], 'max': bins[i + 1]} for i in range(len(bins) - 1)],
-                    'counts': [0] * (len(bins) - 1)
-                }
+            histogram = self.data_processor.get_score_histogram()
+            if not histogram.has_ranks:
+                return default
 
             # 按20000位次分段
-            bins = [0, 20000, 40000, 60000, 80000, 100000, 120000, float('inf')]
-            labels = ['0-19999', '20000-39999', '40000-59999', '60000-79999', '80000-99999', '100000-119999', '120000+']
-
-            df['位次段'] = pd.cut(df['位次'], bins=bins, labels=labels, include_lowest=True)
-            distribution = df['位次段'].value_counts().sort_index()
+            bins = self.RANK_BINS
+            lows, highs = self._bin_bounds(bins)
+            rank_low = -np.inf if min_rank is None else min_rank
+            rank_high = np.inf if max_rank is None else max_rank
+            counts = histogram.rank_counts(np.maximum(lows, rank_low), np.minimum(highs, rank_high))
+            if counts.sum() == 0:
+                return default
 
             return {
                 'ranges': [{'min': bins[i], 'max': bins[i + 1] if bins[i + 1] != float('inf') else 120000} for i in range(len(bins) - 1)],
-                'counts': [int(val) for val in distribution.values]
+                'counts': [int(val) for val in counts]
             }
         except Exception as e:
             self.logger.error(f"获取位次分布失败: {e}")
-            bins = [0, 20000, 40000, 60000, 80000, 100000, 120000]
-            return {
-                'ranges': [{'min': bins[i], 'max': bins[i + 1]} for i in range(len(bins) - 1)],
-                'counts': [0] * (len(bins) - 1),
-                'error': str(e)
-            }
+            return {**default, 'error': str(e)}
     
+    def get_rollup(self, group_by: Optional[str] = None,
+                   years: Optional[List[int]] = None,
+                   provinces: Optional[List[str]] = None,
+                   min_score: Optional[int] = None,
+                   max_score: Optional[int] = None,
+                   min_rank: Optional[int] = None,
+                   max_rank: Optional[int] = None,
+                   score_bucket: int = 10,
+                   **tag_flags: Optional[bool]) -> List[Dict[str, Any]]:
+        """
+        看板多维筛选与上卷(基于预聚合立方体)
+
+        Args:
+            group_by: 分组维度(year/province/tags/score),None表示汇总为一组
+            years: 年份筛选
+            provinces: 省份筛选
+            min_score: 最低分数
+            max_score: 最高分数
+            min_rank: 最低位次
+            max_rank: 最高位次
+            score_bucket: 按分数分组时的分段宽度
+            **tag_flags: 标签筛选条件,如 is_985=True
+
+        Returns:
+            各组统计列表
+        """
+        try:
+            cube = self.data_processor.get_dashboard_cube()
+            return cube.query(group_by, years, provinces, min_score, max_score,
+                              min_rank, max_rank, score_bucket, **tag_flags)
+        except ValueError:
+            raise
+        except Exception as e:
+            self.logger.error(f"看板上卷统计失败: {e}")
+            return []
+
     def get_top_universities(self, limit: int = 20,
                             min_score: Optional[int] = None,
                             max_score: Optional[int] = None,
@@ -296,6 +301,7 @@ class StatisticsAnalyzer:
 
             unis = unis.head(limit)
 
+            school_tags = self.data_processor.get_school_tags()
             results = []
             for _, row in unis.iterrows():
                 result = {
@@ -331,9 +337,10 @@ class StatisticsAnalyzer:
                         result['region'] = school_data.get('所在区域', '')
                         result['authority'] = school_data.get('主管部门', '')
                         result['level'] = school_data.get('办学层次', '')
-                        result['is_double_first_class'] = school_data.get('双一流', '') == 'Y'
-                        result['is_985'] = school_data.get('985', '') == 'Y'
-                        result['is_211'] = school_data.get('211', '') == 'Y'
+                        tags = school_tags.get_tags(row['院校名称'])
+                        result['is_double_first_class'] = tags['is_double_first_class']
+                        result['is_985'] = tags['is_985']
+                        result['is_211'] = tags['is_211']
                         result['tags'] = {
                             'is_985': result['is_985'],
                             'is_211': result['is_211'],
@@ -10,6 +10,18 @@ from .school_loader import SchoolLoader
 from .subject_loader import SubjectLoader
 from .graduate_rate_loader import GraduateRateLoader
 from .wide_table_builder import WideTableBuilder
+from .aggregate_cube import AggregateCube
+from .school_registry import SchoolRegistry, legacy_school_code
+from .major_linker import MajorLinker, normalize_major_name
+from .candidate_pool import CandidatePool
+from .school_tags import SchoolTags
+from .score_histogram import ScoreHistogram
+from .order_statistics import ScoreOrderStatistics
+from .dashboard_cube import DashboardCube
+from .admission_index import AdmissionIndex
+from .score_segment_loader import ScoreSegmentLoader
+from .score_rank_table import ScoreRankTable, ScoreRankCurve
+from .volatility_table import VolatilityTable
 
 __all__ = [
     "CacheManager",
@@ -20,5 +32,20 @@ __all__ = [
     "SchoolLoader",
     "SubjectLoader",
     "GraduateRateLoader",
-    "WideTableBuilder"
+    "WideTableBuilder",
+    "AggregateCube",
+    "SchoolRegistry",
+    "legacy_school_code",
+    "MajorLinker",
+    "normalize_major_name",
+    "CandidatePool",
+    "SchoolTags",
+    "ScoreHistogram",
+    "ScoreOrderStatistics",
+    "DashboardCube",
+    "AdmissionIndex",
+    "ScoreSegmentLoader",
+    "ScoreRankTable",
+    "ScoreRankCurve",
+    "VolatilityTable"
 ]
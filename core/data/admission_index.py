@@ -0,0 +1,96 @@
+"""
+(院校, 专业) 哈希索引
+将单一年份投档数据按 (院校编号, 专业编号) 聚合为紧凑数组,
+院校名称、专业名称各自编号后组合为一个 int64 键;
+一批 (院校, 专业) 目标通过一次哈希 get_indexer 连接到聚合行,无需逐个扫描DataFrame
+"""
+
+from typing import Optional, Sequence
+import numpy as np
+import pandas as pd
+from .aggregate_cube import resolve_column
+from .school_tags import SchoolTags, TAG_985, TAG_DOUBLE_FIRST_CLASS
+from utils.logger import get_logger
+
+
+class AdmissionIndex:
+    """单一年份的 (院校, 专业) 哈希索引"""
+
+    def __init__(self, df: Optional[pd.DataFrame], year: int = 2025,
+                 school_tags: Optional[SchoolTags] = None):
+        """
+        构建索引
+
+        Args:
+            df: 单一年份投档数据
+            year: 数据年份
+            school_tags: 院校标签位图(可选,用于院校层次特征)
+        """
+        self.logger = get_logger("AdmissionIndex")
+        self.year = year
+
+        if df is None:
+            df = pd.DataFrame()
+        school_col = resolve_column(df, '招生院校', '院校名称', '学校名称')
+        major_col = resolve_column(df, '招生专业', '专业名称')
+        score_col = resolve_column(df, '投档最低分')
+        rank_col = resolve_column(df, '位次')
+
+        if not school_col or not major_col or df.empty:
+            frame = pd.DataFrame({'school': [], 'major': [], 'score': [], 'rank': []})
+        else:
+            frame = pd.DataFrame({
+                'school': df[school_col].astype(str).to_numpy(),
+                'major': df[major_col].astype(str).to_numpy(),
+                'score': pd.to_numeric(df[score_col], errors='coerce').to_numpy(dtype=float) if score_col
+                else np.full(len(df), np.nan),
+                'rank': pd.to_numeric(df[rank_col], errors='coerce').to_numpy(dtype=float) if rank_col
+                else np.full(len(df), np.nan),
+            })
+
+        # 院校编号、专业编号(名称哈希表)
+        school_codes, schools = pd.factorize(frame['school'])
+        major_codes, majors = pd.factorize(frame['major'])
+        self.schools = pd.Index(schools)
+        self.majors = pd.Index(majors)
+
+        # 同一 (院校, 专业) 的多条记录取均值(与逐条查询时的 mean 一致)
+        keys = school_codes.astype(np.int64) * max(len(self.majors), 1) + major_codes
+        grouped = pd.DataFrame({'key': keys, 'score': frame['score'], 'rank': frame['rank'],
+                                'school_id': school_codes}).groupby('key', sort=False)
+        means = grouped[['score', 'rank']].mean()
+        self.keys = pd.Index(means.index.to_numpy(dtype=np.int64))
+        self.scores = means['score'].to_numpy(dtype=float)
+        self.ranks = means['rank'].to_numpy(dtype=float)
+        self.school_ids = grouped['school_id'].first().to_numpy(dtype=np.int64)
+
+        # 院校层次(院校维度的标签位掩码)
+        if school_tags is not None:
+            masks = np.asarray(school_tags.masks_for(list(self.schools)))[self.school_ids]
+        else:
+            masks = np.zeros(len(self.keys), dtype=np.uint16)
+        self.is_985 = (masks & TAG_985) > 0
+        self.is_double_first_class = (masks & TAG_DOUBLE_FIRST_CLASS) > 0
+
+        self.logger.info(f"{year}年(院校, 专业)索引构建完成: 组合={len(self.keys)}, 院校={len(self.schools)}")
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, school_names: Sequence[str], major_names: Sequence[str]) -> np.ndarray:
+        """
+        批量定位 (院校, 专业) 目标
+
+        Args:
+            school_names: 院校名称序列
+            major_names: 专业名称序列(与院校名称等长)
+
+        Returns:
+            各目标的聚合行下标,未找到为-1
+        """
+        school_ids = self.schools.get_indexer(pd.Index(list(school_names), dtype=object))
+        major_ids = self.majors.get_indexer(pd.Index(list(major_names), dtype=object))
+        found = (school_ids >= 0) & (major_ids >= 0)
+        keys = school_ids.astype(np.int64) * max(len(self.majors), 1) + major_ids
+        positions = self.keys.get_indexer(keys)
+        return np.where(found, positions, -1)
@@ -0,0 +1,222 @@
+"""
+多年份聚合立方体
+按数据版本预先计算 (院校, 年份) 与 (专业, 年份) 的统计量,
+历史分析、预测等接口直接查表,避免每次请求重复 groupby
+"""
+
+from typing import Dict, Any, Optional, List
+import pandas as pd
+from .score_rank_table import EQUIVALENT_SCORE_COLUMN
+from utils.logger import get_logger
+
+
+def resolve_column(df: pd.DataFrame, *candidates: str) -> Optional[str]:
+    """获取DataFrame中存在的列名（按优先级检查）"""
+    for col in candidates:
+        if col in df.columns:
+            return col
+    return None
+
+
+class AggregateCube:
+    """多年份院校/专业聚合立方体"""
+
+    # 院校汇总表列名（与 DataService.get_universities 保持一致）
+    UNIVERSITY_COLUMNS = ['院校名称', '最低分', '最高分', '平均分', '最低位次', '专业数量']
+    # 专业汇总表列名（与 DataService.get_majors 保持一致）
+    MAJOR_COLUMNS = ['专业名称', '最低分', '最高分', '平均分', '院校数量']
+
+    def __init__(self, years_data: Dict[int, pd.DataFrame]):
+        """
+        构建聚合立方体
+
+        Args:
+            years_data: 年份到投档数据的映射
+        """
+        self.logger = get_logger("AggregateCube")
+        self.years: List[int] = []
+
+        # (院校, 年份) -> 统计量
+        self.school_stats: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        # (专业, 年份) -> 统计量
+        self.major_stats: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        # (院校, 年份) -> 专业明细
+        self.school_majors: Dict[str, Dict[int, Dict[str, Dict[str, Any]]]] = {}
+        # 年份 -> 院校汇总表
+        self._university_tables: Dict[int, pd.DataFrame] = {}
+        # 年份 -> 专业汇总表
+        self._major_tables: Dict[int, pd.DataFrame] = {}
+
+        for year in sorted(years_data):
+            df = years_data[year]
+            if df is None or df.empty:
+                continue
+            self._build_year(year, df)
+
+        self.logger.info(
+            f"聚合立方体构建完成: 年份={self.years}, 院校={len(self.school_stats)}, 专业={len(self.major_stats)}"
+        )
+
+    def _build_year(self, year: int, df: pd.DataFrame) -> None:
+        """构建单个年份的聚合数据"""
+        school_col = resolve_column(df, '招生院校', '院校名称', '学校名称')
+        major_col = resolve_column(df, '招生专业', '专业名称', '专业')
+        score_col = resolve_column(df, '投档最低分', '投档分', '分数')
+        rank_col = resolve_column(df, '位次', '排名')
+        major_code_col = resolve_column(df, '专业编号', '专业代码')
+        equivalent_col = resolve_column(df, EQUIVALENT_SCORE_COLUMN)
+
+        if not school_col or not score_col:
+            self.logger.warning(f"{year}年数据缺少必要列, 跳过聚合")
+            return
+
+        self.years.append(year)
+
+        # (院校, 年份)
+        agg_spec = {
+            'min_score': (score_col, 'min'),
+            'max_score': (score_col, 'max'),
+            'avg_score': (score_col, 'mean'),
+            'median_score': (score_col, 'median'),
+            'record_count': (score_col, 'size'),
+        }
+        if rank_col:
+            agg_spec.update({
+                'min_rank': (rank_col, 'min'),
+                'max_rank': (rank_col, 'max'),
+                'avg_rank': (rank_col, 'mean'),
+                'median_rank': (rank_col, 'median'),
+            })
+        if equivalent_col:
+            # 同位分: 换算到参考年份的分数,跨年份可直接比较(可空整数列按浮点聚合)
+            df = df.assign(**{equivalent_col: df[equivalent_col].astype(float)})
+            agg_spec.update({
+                'min_equivalent_score': (equivalent_col, 'min'),
+                'max_equivalent_score': (equivalent_col, 'max'),
+                'avg_equivalent_score': (equivalent_col, 'mean'),
+            })
+        if major_col:
+            agg_spec['major_count'] = (major_col, 'nunique')
+
+        school_groups = df.groupby(school_col).agg(**agg_spec)
+        for school_name, stats in school_groups.to_dict('index').items():
+            self.school_stats.setdefault(school_name, {})[year] = stats
+
+        # 院校汇总表
+        table = pd.DataFrame({
+            '院校名称': school_groups.index,
+            '最低分': school_groups['min_score'].values,
+            '最高分': school_groups['max_score'].values,
+            '平均分': school_groups['avg_score'].values,
+            '最低位次': school_groups['min_rank'].values if rank_col else None,
+            '专业数量': school_groups['record_count'].values,
+        })
+        self._university_tables[year] = table.sort_values('平均分', ascending=False).reset_index(drop=True)
+
+        if not major_col:
+            return
+
+        # (专业, 年份)
+        major_spec = {k: v for k, v in agg_spec.items() if k != 'major_count'}
+        major_spec['school_count'] = (school_col, 'nunique')
+        major_groups = df.groupby(major_col).agg(**major_spec)
+        for major_name, stats in major_groups.to_dict('index').items():
+            self.major_stats.setdefault(major_name, {})[year] = stats
+
+        # 专业汇总表
+        table = pd.DataFrame({
+            '专业名称': major_groups.index,
+            '最低分': major_groups['min_score'].values,
+            '最高分': major_groups['max_score'].values,
+            '平均分': major_groups['avg_score'].values,
+            '院校数量': major_groups['school_count'].values,
+        })
+        self._major_tables[year] = table.sort_values('平均分', ascending=False)
+
+        # (院校, 专业, 年份) 明细
+        detail_spec = {'score': (score_col, 'min')}
+        if rank_col:
+            detail_spec['rank'] = (rank_col, 'min')
+        if equivalent_col:
+            detail_spec['equivalent_score'] = (equivalent_col, 'min')
+        if major_code_col:
+            detail_spec['major_code'] = (major_code_col, 'first')
+        details = df.groupby([school_col, major_col], sort=True).agg(**detail_spec).reset_index()
+
+        for row in details.to_dict('records'):
+            majors = self.school_majors.setdefault(row[school_col], {}).setdefault(year, {})
+            major_code = str(row['major_code']) if major_code_col else str(len(majors))
+            majors[major_code] = {
+                'major_code': major_code,
+                'major_name': row[major_col],
+                'score': float(row['score']) if pd.notna(row['score']) else 0,
+                'rank': float(row['rank']) if rank_col and pd.notna(row['rank']) else 0
+            }
+            if equivalent_col:
+                majors[major_code]['equivalent_score'] = \
+                    float(row['equivalent_score']) if pd.notna(row['equivalent_score']) else 0
+
+    def get_school_years(self, school_name: str) -> Dict[int, Dict[str, Any]]:
+        """
+        获取院校各年份统计量
+
+        Args:
+            school_name: 院校名称
+
+        Returns:
+            年份到统计量的映射
+        """
+        return self.school_stats.get(school_name, {})
+
+    def get_school_year(self, school_name: str, year: int) -> Optional[Dict[str, Any]]:
+        """获取院校指定年份统计量"""
+        return self.school_stats.get(school_name, {}).get(year)
+
+    def get_school_majors(self, school_name: str, year: int) -> Dict[str, Dict[str, Any]]:
+        """获取院校指定年份的专业明细"""
+        return self.school_majors.get(school_name, {}).get(year, {})
+
+    def get_major_years(self, major_name: str) -> Dict[int, Dict[str, Any]]:
+        """获取专业各年份统计量"""
+        return self.major_stats.get(major_name, {})
+
+    def get_school_names(self, year: Optional[int] = None) -> List[str]:
+        """
+        获取院校名称列表
+
+        Args:
+            year: 年份,为None时返回任一年份出现过的院校
+        """
+        if year is None:
+            return list(self.school_stats.keys())
+        return [name for name, years in self.school_stats.items() if year in years]
+
+    def get_university_table(self, year: int) -> pd.DataFrame:
+        """
+        获取院校汇总表(按平均分降序)
+
+        Args:
+            year: 年份
+
+        Returns:
+            DataFrame: 院校汇总数据
+        """
+        table = self._university_tables.get(year)
+        if table is None:
+            return pd.DataFrame(columns=self.UNIVERSITY_COLUMNS)
+        return table
+
+    def get_major_table(self, year: int) -> pd.DataFrame:
+        """
+        获取专业汇总表(按平均分降序)
+
+        Args:
+            year: 年份
+
+        Returns:
+            DataFrame: 专业汇总数据
+        """
+        table = self._major_tables.get(year)
+        if table is None:
+            return pd.DataFrame(columns=self.MAJOR_COLUMNS)
+        return table
@@ -0,0 +1,261 @@
+"""
+志愿候选池
+将单一年份的投档数据按位次排序为紧凑的NumPy数组,并预先计算每所院校的标签位掩码和所在地区,
+推荐引擎据此按位次区间二分切片并向量化打分
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .aggregate_cube import resolve_column
+from .major_linker import normalize_major_name, parse_major_name
+from .school_tags import (SchoolTags, decode_tags, match_tags,
+                          TAG_985, TAG_211, TAG_DOUBLE_FIRST_CLASS)
+from utils.logger import get_logger
+
+
+class CandidatePool:
+    """按位次排序的志愿候选池"""
+
+    # 位次密度直方图的分桶宽度
+    DENSITY_BUCKET = 10
+
+    # 默认位次窗口(学生位次以下/以上的幅度)及自适应窗口的缩放倍数(1/4 至 64 倍)
+    RANK_WINDOW = (200, 100)
+    WINDOW_SCALES = 2.0 ** np.arange(-2, 6.25, 0.25)
+
+    def __init__(self, df: pd.DataFrame, school_info_df: Optional[pd.DataFrame] = None, year: int = 2025,
+                 school_tags: Optional[SchoolTags] = None):
+        """
+        构建候选池
+
+        Args:
+            df: 单一年份投档数据
+            school_info_df: 学校信息(用于院校标签和所在地区)
+            year: 数据年份
+            school_tags: 院校标签位图(为None时由学校信息构建)
+        """
+        self.logger = get_logger("CandidatePool")
+        self.year = year
+
+        school_col = resolve_column(df, '招生院校', '院校名称', '学校名称')
+        major_col = resolve_column(df, '招生专业', '专业名称')
+        rank_col = resolve_column(df, '位次', '投档位次')
+        score_col = resolve_column(df, '投档最低分')
+
+        if df is None or df.empty or not rank_col:
+            ranks = pd.Series([], dtype=float)
+        else:
+            ranks = pd.to_numeric(df[rank_col], errors='coerce')
+        valid = ranks.notna().to_numpy()
+        ranks = ranks.to_numpy()[valid].astype(np.int64)
+
+        # 按位次稳定排序,位次相同时保持原始行序
+        order = np.argsort(ranks, kind='stable')
+        self.ranks = ranks[order]
+        self.row_positions = np.flatnonzero(valid)[order]
+
+        def column_values(column: Optional[str], default: str) -> np.ndarray:
+            if column is None:
+                return np.full(len(self.ranks), default, dtype=object)
+            values = df[column].to_numpy(dtype=object)[valid][order]
+            return np.array([str(v).strip() for v in values], dtype=object)
+
+        names = column_values(school_col, '未知院校')
+        self.major_names = column_values(major_col, '未知专业')
+
+        if score_col:
+            scores = pd.to_numeric(df[score_col], errors='coerce').to_numpy()[valid][order]
+            self.scores = np.where(np.isnan(scores), 0, scores).astype(np.int64)
+        else:
+            self.scores = np.zeros(len(self.ranks), dtype=np.int64)
+
+        # 院校索引与院校属性向量
+        codes, uniques = pd.factorize(pd.Series(names, dtype=object))
+        self.school_idx = codes.astype(np.int32)
+        self.school_names: List[str] = [str(name) for name in uniques]
+        self.school_index: Dict[str, int] = {name: i for i, name in enumerate(self.school_names)}
+
+        if school_tags is None:
+            school_tags = SchoolTags(school_info_df)
+        self.tag_masks = school_tags.masks_for(self.school_names)
+        self.school_tags: List[Dict[str, bool]] = [decode_tags(mask) for mask in self.tag_masks]
+        self.is_985 = (self.tag_masks & TAG_985) > 0
+        self.is_211 = (self.tag_masks & TAG_211) > 0
+        self.is_double_first_class = (self.tag_masks & TAG_DOUBLE_FIRST_CLASS) > 0
+
+        # 所在地区(学校信息中不存在的院校为None)
+        self.school_locations: List[Optional[str]] = [None] * len(self.school_names)
+        if school_info_df is not None and not school_info_df.empty:
+            info_col = '学校名称' if '学校名称' in school_info_df.columns else '院校名称'
+            info = school_info_df.drop_duplicates(info_col).set_index(info_col)
+            for i, name in enumerate(self.school_names):
+                if name not in info.index:
+                    continue
+                row = info.loc[name]
+                parts = [row.get('所在城市', ''), row.get('所在区域', '')]
+                self.school_locations[i] = ''.join(str(p) for p in parts if pd.notna(p))
+
+        # 地区 -> 院校索引
+        self.location_index: Dict[str, np.ndarray] = {}
+        for i, location in enumerate(self.school_locations):
+            if location is not None:
+                self.location_index.setdefault(location, []).append(i)
+        self.location_index = {k: np.array(v, dtype=np.int32) for k, v in self.location_index.items()}
+
+        # 地区编号(院校维度,未知为-1)与学科编号(记录维度,按去括号的基础专业名称)
+        location_codes, _ = pd.factorize(pd.Series(self.school_locations, dtype=object))
+        self.location_ids = location_codes.astype(np.int32)
+        disciplines = [parse_major_name(normalize_major_name(name))[0] for name in self.major_names]
+        self.discipline_ids = pd.factorize(pd.Series(disciplines, dtype=object))[0].astype(np.int32)
+
+        # 位次密度直方图的前缀和: density_prefix[k] 为位次低于 k*DENSITY_BUCKET 的记录数
+        counts = np.bincount(self.ranks // self.DENSITY_BUCKET) if len(self.ranks) else np.zeros(0, dtype=np.int64)
+        self.density_prefix = np.concatenate([[0], np.cumsum(counts)])
+
+        # 专业名称 n-gram 倒排索引(单字和二元组 -> 行下标)
+        self.major_ngrams = self._build_ngram_index(self.major_names)
+
+        self.logger.info(f"{year}年候选池构建完成: 记录={len(self.ranks)}, 院校={len(self.school_names)}")
+
+    @staticmethod
+    def _build_ngram_index(names: np.ndarray) -> Dict[str, np.ndarray]:
+        """构建单字和二元组倒排索引"""
+        postings: Dict[str, List[int]] = {}
+        for i, name in enumerate(names):
+            grams = set(name) | {name[j:j + 2] for j in range(len(name) - 1)}
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        return {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.ranks)
+
+    def rank_range(self, min_rank: float, max_rank: float) -> Tuple[int, int]:
+        """
+        二分查找位次区间 [min_rank, max_rank] 对应的下标范围
+
+        Returns:
+            (起始下标, 结束下标)
+        """
+        start = int(np.searchsorted(self.ranks, min_rank, side='left'))
+        end = int(np.searchsorted(self.ranks, max_rank, side='right'))
+        return start, max(start, end)
+
+    def adaptive_rank_window(self, student_rank: float, target: int,
+                             mask: Optional[np.ndarray] = None) -> Tuple[int, int]:
+        """
+        按位次密度确定推荐窗口
+
+        在默认窗口 (学生位次-200, 学生位次+100) 的基础上按比例缩放,取窗口内记录数不少于
+        target 的最小倍数;高分段密集时窗口收窄,低分段稀疏或筛选条件严格时窗口放宽,
+        64倍仍不足时继续倍增直至覆盖整个候选池
+
+        Args:
+            student_rank: 学生位次
+            target: 期望的窗口内记录数
+            mask: 满足筛选条件的记录掩码(与候选池等长,为None时按全部记录计数)
+
+        Returns:
+            (位次下限, 位次上限)
+        """
+        below, above = self.RANK_WINDOW
+        scales = self.WINDOW_SCALES
+        if len(self.ranks):
+            # 覆盖整个候选池所需的倍数
+            cover = max((student_rank - self.ranks[0]) / below, (self.ranks[-1] - student_rank) / above, 1.0)
+            extra = 2.0 ** np.arange(np.log2(scales[-1]) + 1, np.ceil(np.log2(cover)) + 1)
+            scales = np.concatenate([scales, extra])
+        lows = student_rank - below * scales
+        highs = student_rank + above * scales
+
+        if mask is None:
+            # 位次直方图前缀和之差估计各倍数窗口内的记录数
+            last = len(self.density_prefix) - 1
+            low_buckets = np.clip(np.floor(lows / self.DENSITY_BUCKET).astype(np.int64), 0, last)
+            high_buckets = np.clip(np.floor(highs / self.DENSITY_BUCKET).astype(np.int64) + 1, 0, last)
+            counts = self.density_prefix[high_buckets] - self.density_prefix[low_buckets]
+        else:
+            # 掩码累计和之差精确统计各倍数窗口内满足条件的记录数
+            prefix = np.concatenate([[0], np.cumsum(mask, dtype=np.int64)])
+            starts = np.searchsorted(self.ranks, lows, side='left')
+            ends = np.searchsorted(self.ranks, highs, side='right')
+            counts = prefix[ends] - prefix[starts]
+
+        enough = np.flatnonzero(counts >= target)
+        k = int(enough[0]) if len(enough) else len(scales) - 1
+        return int(np.floor(lows[k])), int(np.ceil(highs[k]))
+
+    def location_mask(self, locations: List[str]) -> np.ndarray:
+        """
+        计算各院校是否位于偏好地区
+
+        Args:
+            locations: 偏好地区关键词
+
+        Returns:
+            院校维度的布尔数组
+        """
+        mask = np.zeros(len(self.school_names), dtype=bool)
+        for location, school_ids in self.location_index.items():
+            if any(pref in location for pref in locations):
+                mask[school_ids] = True
+        return mask
+
+    def major_mask(self, keywords: List[str]) -> np.ndarray:
+        """
+        计算各记录的专业名称是否包含任一关键词
+
+        先由 n-gram 倒排索引求交得到候选行,再对候选行做子串校验
+
+        Args:
+            keywords: 专业关键词
+
+        Returns:
+            记录维度的布尔数组
+        """
+        mask = np.zeros(len(self.ranks), dtype=bool)
+        for keyword in keywords:
+            if not keyword:
+                mask[:] = True
+                break
+            grams = [keyword] if len(keyword) == 1 else [keyword[j:j + 2] for j in range(len(keyword) - 1)]
+            rows = None
+            for gram in grams:
+                posting = self.major_ngrams.get(gram)
+                if posting is None:
+                    rows = np.empty(0, dtype=np.int32)
+                    break
+                rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+            if len(keyword) > 2:
+                rows = np.array([r for r in rows if keyword in self.major_names[r]], dtype=np.int32)
+            mask[rows] = True
+        return mask
+
+    def tag_mask(self, **flags: Optional[bool]) -> np.ndarray:
+        """
+        按标签条件筛选院校(一次按位与)
+
+        Args:
+            **flags: 标签筛选条件,如 is_985=True
+
+        Returns:
+            院校维度的布尔数组
+        """
+        return match_tags(self.tag_masks, **flags)
+
+    def school_level_scores(self, level_scores: Dict[str, float]) -> np.ndarray:
+        """
+        计算各院校的层次分数(985 > 211 > 双一流 > 普通)
+
+        Args:
+            level_scores: 层次分数配置
+
+        Returns:
+            院校维度的分数数组
+        """
+        return np.select(
+            [self.is_985, self.is_211, self.is_double_first_class],
+            [level_scores['is_985'], level_scores['is_211'], level_scores['is_double_first_class']],
+            default=level_scores['normal']
+        ).astype(float)
@@ -0,0 +1,278 @@
+"""
+看板多维聚合立方体(OLAP)
+按 (年份, 省份, 院校标签位掩码, 分数段) 预先计算记录数、分数和/位次和以及分数/位次极值,
+看板任意组合的年份、省份、标签、分数/位次筛选都在预聚合单元上切片和上卷,无需扫描投档记录
+"""
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .aggregate_cube import resolve_column
+from .school_tags import SchoolTags, decode_tags, match_tags
+from utils.logger import get_logger
+
+
+# 可上卷的维度
+ROLLUP_DIMENSIONS = ('year', 'province', 'tags', 'score')
+
+# 院校不在学校信息表中时的省份名称
+UNKNOWN_PROVINCE = '未知'
+
+
+class DashboardCube:
+    """(年份, 省份, 标签位掩码, 分数段) 预聚合立方体"""
+
+    # 分数维度的分段宽度(1分精度,分数筛选精确)
+    SCORE_BUCKET = 1
+
+    def __init__(self, years_data: Dict[int, pd.DataFrame], school_tags: SchoolTags):
+        """
+        构建立方体
+
+        Args:
+            years_data: 年份到投档数据的映射
+            school_tags: 院校标签位图(提供标签位掩码和所在省份)
+        """
+        self.logger = get_logger("DashboardCube")
+
+        frames = []
+        for year in sorted(years_data):
+            df = years_data[year]
+            school_col = resolve_column(df, '招生院校', '院校名称', '学校名称') if df is not None else None
+            score_col = resolve_column(df, '投档最低分') if df is not None else None
+            if df is None or df.empty or not school_col or not score_col:
+                continue
+            rank_col = resolve_column(df, '位次')
+            names = pd.Index(df[school_col], dtype=object)
+            positions = school_tags.school_index.get_indexer(names)
+            provinces = np.array(school_tags.cities, dtype=object)[np.maximum(positions, 0)] \
+                if len(school_tags.cities) else np.full(len(df), '', dtype=object)
+            provinces = np.where((positions >= 0) & (provinces != ''), provinces, UNKNOWN_PROVINCE)
+            frames.append(pd.DataFrame({
+                'year': year,
+                'province': provinces,
+                'mask': school_tags.masks_for(names),
+                'score': pd.to_numeric(df[score_col], errors='coerce').to_numpy(),
+                'rank': pd.to_numeric(df[rank_col], errors='coerce').to_numpy() if rank_col else np.nan,
+            }))
+
+        data = pd.concat(frames, ignore_index=True) if frames else \
+            pd.DataFrame(columns=['year', 'province', 'mask', 'score', 'rank'])
+        data = data[data['score'].notna()]
+
+        # 维度取值
+        self.years: List[int] = sorted(int(y) for y in data['year'].unique())
+        self.provinces: List[str] = sorted(str(p) for p in data['province'].unique())
+        self.masks = np.array(sorted(int(m) for m in data['mask'].unique()), dtype=np.uint16)
+        scores = np.floor(data['score'].to_numpy(dtype=float)).astype(np.int64)
+        self.score_offset = int(scores.min()) if len(scores) else 0
+        n_scores = (int(scores.max()) - self.score_offset) // self.SCORE_BUCKET + 1 if len(scores) else 0
+
+        # 单元坐标
+        year_idx = np.searchsorted(self.years, data['year'].to_numpy())
+        province_idx = np.searchsorted(self.provinces, data['province'].to_numpy(dtype=str))
+        mask_idx = np.searchsorted(self.masks, data['mask'].to_numpy(dtype=np.uint16))
+        score_idx = (scores - self.score_offset) // self.SCORE_BUCKET
+        shape = (len(self.years), len(self.provinces), len(self.masks), n_scores)
+        cells = np.ravel_multi_index((year_idx, province_idx, mask_idx, score_idx), shape) \
+            if len(scores) else np.zeros(0, dtype=np.int64)
+        size = int(np.prod(shape))
+
+        ranks = data['rank'].to_numpy(dtype=float)
+        has_rank = ~np.isnan(ranks)
+        raw_scores = data['score'].to_numpy(dtype=float)
+
+        def total(values: Optional[np.ndarray] = None, rows: Optional[np.ndarray] = None) -> np.ndarray:
+            rows = slice(None) if rows is None else rows
+            weights = None if values is None else values[rows]
+            return np.bincount(cells[rows], weights=weights, minlength=size).reshape(shape)
+
+        def extreme(ufunc, values: np.ndarray, rows: np.ndarray, fill: float) -> np.ndarray:
+            result = np.full(size, fill)
+            ufunc.at(result, cells[rows], values[rows])
+            return result.reshape(shape)
+
+        all_rows = np.ones(len(cells), dtype=bool)
+        self.cells: Dict[str, np.ndarray] = {
+            'count': total(rows=all_rows),
+            'score_sum': total(raw_scores),
+            'rank_count': total(rows=has_rank),
+            'rank_sum': total(ranks, has_rank),
+            'score_min': extreme(np.minimum, raw_scores, all_rows, np.inf),
+            'score_max': extreme(np.maximum, raw_scores, all_rows, -np.inf),
+            'rank_min': extreme(np.minimum, ranks, has_rank, np.inf),
+            'rank_max': extreme(np.maximum, ranks, has_rank, -np.inf),
+        }
+        # 上卷后的子立方体缓存: 上卷的维度 -> 各度量
+        self._cuboids: Dict[Tuple[int, ...], Dict[str, np.ndarray]] = {(): self.cells}
+
+        # 各年份每个分数段的位次范围(位次筛选换算为分数段)
+        year_cells = self.cuboid((1, 2))
+        self.year_rank_min = year_cells['rank_min'][:, 0, 0, :]
+        self.year_rank_max = year_cells['rank_max'][:, 0, 0, :]
+
+        self.logger.info(
+            f"看板立方体构建完成: 年份={self.years}, 省份={len(self.provinces)}, "
+            f"标签组合={len(self.masks)}, 分数段={n_scores}, 记录={len(scores)}"
+        )
+
+    @staticmethod
+    def _reduce(name: str, values: np.ndarray, axis: Tuple[int, ...], keepdims: bool = False) -> np.ndarray:
+        """按度量类型沿指定维度上卷(计数/求和相加,极值取最小/最大)"""
+        if name.endswith('_min'):
+            return values.min(axis=axis, keepdims=keepdims, initial=np.inf)
+        if name.endswith('_max'):
+            return values.max(axis=axis, keepdims=keepdims, initial=-np.inf)
+        return values.sum(axis=axis, keepdims=keepdims)
+
+    def cuboid(self, axes: Tuple[int, ...]) -> Dict[str, np.ndarray]:
+        """
+        获取沿指定维度上卷后的子立方体(保留长度为1的维度,首次访问时计算并缓存)
+
+        Args:
+            axes: 上卷的维度下标(0年份, 1省份, 2标签, 3分数段)
+
+        Returns:
+            度量名到数组的映射
+        """
+        axes = tuple(sorted(axes))
+        cuboid = self._cuboids.get(axes)
+        if cuboid is None:
+            cuboid = {name: self._reduce(name, values, axes, keepdims=True) for name, values in self.cells.items()}
+            self._cuboids[axes] = cuboid
+        return cuboid
+
+    @property
+    def score_values(self) -> np.ndarray:
+        """各分数段的下限分数"""
+        return self.score_offset + np.arange(self.cells['count'].shape[3]) * self.SCORE_BUCKET
+
+    def _select(self, years: Optional[Sequence[int]], provinces: Optional[Sequence[str]],
+                min_score: Optional[float], max_score: Optional[float],
+                min_rank: Optional[float], max_rank: Optional[float],
+                tag_flags: Dict[str, Optional[bool]]) -> tuple:
+        """
+        将筛选条件编译为各维度的下标和 (年份, 分数段) 掩码
+
+        位次筛选按各年份分数段的位次范围换算: 分数段内全部记录的位次都在区间内才入选
+        (位次是分数的单调函数,每个分数只对应一个位次,因此结果是精确的)
+
+        Returns:
+            (年份下标, 省份下标, 标签下标, 分数段掩码),不筛选的维度为None
+        """
+        year_idx = None if not years else np.flatnonzero(np.isin(self.years, list(years)))
+        province_idx = None if not provinces else np.flatnonzero(np.isin(self.provinces, list(provinces)))
+        mask_idx = None if all(v is None for v in tag_flags.values()) else \
+            np.flatnonzero(match_tags(self.masks, **tag_flags))
+
+        if min_score is None and max_score is None and min_rank is None and max_rank is None:
+            return year_idx, province_idx, mask_idx, None
+
+        values = self.score_values
+        score_mask = np.ones((1, len(values)), dtype=bool)
+        if min_score is not None:
+            score_mask &= values >= min_score
+        if max_score is not None:
+            score_mask &= values <= max_score
+        if min_rank is not None or max_rank is not None:
+            rows = slice(None) if year_idx is None else year_idx
+            if min_rank is not None:
+                score_mask = score_mask & (self.year_rank_min[rows] >= min_rank)
+            if max_rank is not None:
+                score_mask = score_mask & (self.year_rank_max[rows] <= max_rank)
+        return year_idx, province_idx, mask_idx, score_mask
+
+    def query(self, group_by: Optional[str] = None,
+              years: Optional[Sequence[int]] = None,
+              provinces: Optional[Sequence[str]] = None,
+              min_score: Optional[float] = None, max_score: Optional[float] = None,
+              min_rank: Optional[float] = None, max_rank: Optional[float] = None,
+              score_bucket: int = 10,
+              **tag_flags: Optional[bool]) -> List[Dict[str, Any]]:
+        """
+        切片并上卷
+
+        未筛选且不分组的维度直接使用已上卷的子立方体,只有被筛选的维度按下标切片
+
+        Args:
+            group_by: 保留的维度(year/province/tags/score),None表示全部上卷为一组
+            years: 年份筛选
+            provinces: 省份筛选
+            min_score: 最低分数
+            max_score: 最高分数
+            min_rank: 最低位次
+            max_rank: 最高位次
+            score_bucket: 按分数分组时的分段宽度
+            **tag_flags: 标签筛选条件,如 is_985=True
+
+        Returns:
+            各组的 {key, count, avg_score, min_score, max_score, avg_rank, min_rank, max_rank}
+        """
+        if group_by is not None and group_by not in ROLLUP_DIMENSIONS:
+            raise ValueError(f"不支持的上卷维度: {group_by}")
+        group_axis = None if group_by is None else ROLLUP_DIMENSIONS.index(group_by)
+
+        year_idx, province_idx, mask_idx, score_mask = self._select(
+            years, provinces, min_score, max_score, min_rank, max_rank, tag_flags
+        )
+        # 按年份不同的分数段掩码(位次筛选)需要保留年份维度
+        per_year_mask = score_mask is not None and score_mask.shape[0] > 1
+        selections = [year_idx, province_idx, mask_idx, None]
+        rolled = tuple(
+            axis for axis, index in enumerate(selections)
+            if index is None and axis != group_axis
+            and not (axis == 0 and per_year_mask) and not (axis == 3 and score_mask is not None)
+        )
+        cuboid = self.cuboid(rolled)
+
+        region = np.ix_(*[
+            np.zeros(1, dtype=np.int64) if axis in rolled
+            else np.arange(cuboid['count'].shape[axis]) if index is None else index
+            for axis, index in enumerate(selections)
+        ])
+        keep = None if score_mask is None else score_mask[:, None, None, :]
+
+        reduce_axes = tuple(axis for axis in range(4) if axis != group_axis)
+        stats = {}
+        for name, values in cuboid.items():
+            values = values[region]
+            if keep is not None:
+                fill = np.inf if name.endswith('_min') else -np.inf if name.endswith('_max') else 0
+                values = np.where(keep, values, fill)
+            stats[name] = np.atleast_1d(self._reduce(name, values, reduce_axes))
+
+        if group_by is None:
+            keys: List[Any] = ['all']
+        elif group_by == 'year':
+            keys = [self.years[i] for i in (range(len(self.years)) if year_idx is None else year_idx)]
+        elif group_by == 'province':
+            keys = [self.provinces[i] for i in (range(len(self.provinces)) if province_idx is None else province_idx)]
+        elif group_by == 'tags':
+            keys = [decode_tags(self.masks[i]) for i in (range(len(self.masks)) if mask_idx is None else mask_idx)]
+        else:
+            # 1分精度的分数段再上卷为 score_bucket 宽度
+            buckets = (self.score_values // score_bucket) * score_bucket
+            starts = np.flatnonzero(np.diff(buckets, prepend=-np.inf))
+            keys = [int(b) for b in buckets[starts]]
+            if len(buckets):
+                stats = {
+                    name: (np.minimum if name.endswith('_min') else np.maximum if name.endswith('_max')
+                           else np.add).reduceat(values, starts)
+                    for name, values in stats.items()
+                }
+
+        return [
+            {
+                'key': key,
+                'count': int(stats['count'][i]),
+                'avg_score': round(float(stats['score_sum'][i] / stats['count'][i]), 2) if stats['count'][i] else 0,
+                'min_score': int(stats['score_min'][i]) if stats['count'][i] else 0,
+                'max_score': int(stats['score_max'][i]) if stats['count'][i] else 0,
+                'avg_rank': round(float(stats['rank_sum'][i] / stats['rank_count'][i]), 2)
+                if stats['rank_count'][i] else 0,
+                'min_rank': int(stats['rank_min'][i]) if stats['rank_count'][i] else 0,
+                'max_rank': int(stats['rank_max'][i]) if stats['rank_count'][i] else 0,
+            }
+            for i, key in enumerate(keys)
+            if group_by is None or stats['count'][i] > 0
+        ]
@@ -0,0 +1,341 @@
+"""
+专业跨年份关联表
+将 (年份, 院校编号, 专业编号) 映射为稳定的整数专业编号(major_id),
+多年份分析、预测统一按 major_id 关联,避免按名称精确匹配或子串匹配
+"""
+
+import re
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+import pandas as pd
+from .aggregate_cube import resolve_column
+from utils.logger import get_logger
+
+
+BRACKET_PATTERN = re.compile(r'[\(\[]([^\(\)\[\]]*)[\)\]]')
+
+
+def normalize_major_name(name: str) -> str:
+    """
+    规范化专业名称(统一全角括号、去除空白)
+
+    Args:
+        name: 专业名称
+
+    Returns:
+        规范化后的名称
+    """
+    name = str(name).strip()
+    for src, dst in (('（', '('), ('）', ')'), ('【', '['), ('】', ']'), ('，', '、'), (',', '、')):
+        name = name.replace(src, dst)
+    return re.sub(r'\s+', '', name)
+
+
+def parse_major_name(name: str) -> Tuple[str, Set[str]]:
+    """
+    拆分专业名称为基础名称和括号内容
+
+    括号内容按顿号拆分,例如 "数学类(数学与应用数学、统计学)(师范)"
+    解析为 ("数学类", {"数学与应用数学", "统计学", "师范"})
+
+    Args:
+        name: 规范化后的专业名称
+
+    Returns:
+        (基础名称, 括号内容集合)
+    """
+    qualifiers: Set[str] = set()
+    # 由内向外逐层剥离括号(兼容嵌套括号)
+    while True:
+        found = BRACKET_PATTERN.findall(name)
+        if not found:
+            break
+        for content in found:
+            qualifiers.update(part for part in content.split('、') if part)
+        name = BRACKET_PATTERN.sub('', name)
+    return name.strip('()[]'), qualifiers
+
+
+def major_similarity(name_a: str, name_b: str, same_code: bool = False) -> float:
+    """
+    计算两个专业名称的相似度(0~1)
+
+    基础名称的字符相似度占0.7,括号内容的Jaccard相似度占0.2,
+    专业编号相同再加0.1
+
+    Args:
+        name_a: 规范化专业名称
+        name_b: 规范化专业名称
+        same_code: 专业编号是否相同
+    """
+    base_a, qual_a = parse_major_name(name_a)
+    base_b, qual_b = parse_major_name(name_b)
+    base_score = SequenceMatcher(None, base_a, base_b).ratio()
+    if qual_a or qual_b:
+        qual_score = len(qual_a & qual_b) / len(qual_a | qual_b)
+    else:
+        qual_score = 1.0
+    return 0.7 * base_score + 0.2 * qual_score + (0.1 if same_code else 0.0)
+
+
+class MajorLinker:
+    """专业跨年份关联表"""
+
+    # 模糊关联的最低相似度
+    SIMILARITY_THRESHOLD = 0.75
+
+    LINK_COLUMNS = ['year', 'school_code', 'major_code', 'major_id']
+
+    # 关联规则或缓存格式变化时递增,使旧的磁盘缓存失效
+    LINK_FORMAT_VERSION = 1
+    CACHE_PREFIX = 'major_links_'
+
+    @classmethod
+    def cache_file_name(cls, dataset_version: str) -> str:
+        """
+        关联表缓存文件名(包含格式版本和数据版本)
+
+        Args:
+            dataset_version: 数据版本号
+
+        Returns:
+            文件名
+        """
+        return f"{cls.CACHE_PREFIX}v{cls.LINK_FORMAT_VERSION}_{dataset_version}.csv"
+
+    def __init__(self, years_data: Dict[int, pd.DataFrame], cache_file: Optional[str] = None):
+        """
+        构建关联表(存在磁盘缓存时直接读取)
+
+        Args:
+            years_data: 年份到投档数据的映射
+            cache_file: 关联表缓存文件路径(CSV)
+        """
+        self.logger = get_logger("MajorLinker")
+        self.rows = self._collect_rows(years_data)
+
+        links = self._load_links(cache_file) if cache_file else None
+        if links is None:
+            links = self._build_links()
+            if cache_file:
+                self._save_links(links, cache_file)
+
+        self.rows = self.rows.merge(links, on=['year', 'school_code', 'major_code'], how='left')
+        self.rows['major_id'] = self.rows['major_id'].fillna(-1).astype(int)
+
+        self._id_index: Dict[Tuple[int, str, str], int] = {
+            key: major_id for key, major_id in zip(
+                zip(self.rows['year'], self.rows['school_code'], self.rows['major_code']),
+                self.rows['major_id']
+            )
+        }
+        # (院校名称, 规范化专业名称) -> major_id,首次查找时构建
+        self._pair_index: Optional[Dict[Tuple[str, str], int]] = None
+        self._name_index: Dict[str, List[int]] = {}
+        self._base_index: Dict[str, List[int]] = {}
+        for norm_name, major_id in zip(self.rows['norm_name'], self.rows['major_id']):
+            self._name_index.setdefault(norm_name, []).append(major_id)
+            self._base_index.setdefault(parse_major_name(norm_name)[0], []).append(major_id)
+
+        self.logger.info(
+            f"专业关联表就绪: 记录={len(self.rows)}, 专业序列={self.rows['major_id'].nunique()}"
+        )
+
+    def _collect_rows(self, years_data: Dict[int, pd.DataFrame]) -> pd.DataFrame:
+        """汇总各年份专业记录"""
+        frames = []
+        for year in sorted(years_data):
+            df = years_data[year]
+            if df is None or df.empty:
+                continue
+            school_code_col = resolve_column(df, '院校编号', '院校代码')
+            school_col = resolve_column(df, '招生院校', '院校名称', '学校名称')
+            major_code_col = resolve_column(df, '专业编号', '专业代码')
+            major_col = resolve_column(df, '招生专业', '专业名称', '专业')
+            score_col = resolve_column(df, '投档最低分', '投档分', '分数')
+            rank_col = resolve_column(df, '位次', '排名')
+            if not school_code_col or not school_col or not major_code_col or not major_col:
+                self.logger.warning(f"{year}年数据缺少院校/专业编号列, 跳过关联")
+                continue
+
+            frame = pd.DataFrame({
+                'year': year,
+                'school_code': df[school_code_col].astype(str).str.strip().values,
+                'school_name': df[school_col].astype(str).values,
+                'major_code': df[major_code_col].astype(str).str.strip().values,
+                'major_name': df[major_col].astype(str).values,
+                'score': pd.to_numeric(df[score_col], errors='coerce').values if score_col else float('nan'),
+                'rank': pd.to_numeric(df[rank_col], errors='coerce').values if rank_col else float('nan'),
+            })
+            frame['norm_name'] = frame['major_name'].map(normalize_major_name)
+            frames.append(frame.drop_duplicates(['school_code', 'major_code']))
+
+        if not frames:
+            return pd.DataFrame(columns=['year', 'school_code', 'school_name', 'major_code',
+                                         'major_name', 'score', 'rank', 'norm_name'])
+        return pd.concat(frames, ignore_index=True)
+
+    def _build_links(self) -> pd.DataFrame:
+        """
+        计算关联表
+
+        1. 同一院校编号下按规范化名称精确关联,同名专业按专业编号顺序依次对应
+        2. 相邻年份间未关联的专业,在同一院校内按名称相似度贪心配对
+        """
+        rows = self.rows.sort_values(['year', 'school_code', 'major_code'], kind='stable').copy()
+        rows['occurrence'] = rows.groupby(['year', 'school_code', 'norm_name']).cumcount()
+        series = rows.groupby(['school_code', 'norm_name', 'occurrence'], sort=False).ngroup().to_numpy()
+        rows['series'] = series
+
+        years = sorted(rows['year'].unique())
+        remap: Dict[int, int] = {}
+        for prev_year, year in zip(years, years[1:]):
+            rows['series'] = rows['series'].map(lambda s: remap.get(s, s))
+            seen_before = set(rows.loc[rows['year'] < year, 'series'])
+            current = set(rows.loc[rows['year'] == year, 'series'])
+            ended = rows[(rows['year'] == prev_year) & ~rows['series'].isin(current)]
+            started = rows[(rows['year'] == year) & ~rows['series'].isin(seen_before)]
+            if ended.empty or started.empty:
+                continue
+
+            ended_by_school = {code: group for code, group in ended.groupby('school_code')}
+            for school_code, new_group in started.groupby('school_code'):
+                old_group = ended_by_school.get(school_code)
+                if old_group is None:
+                    continue
+                for new_series, old_series in self._match_group(old_group, new_group):
+                    remap[new_series] = old_series
+        rows['series'] = rows['series'].map(lambda s: remap.get(s, s))
+
+        # 按首次出现顺序分配稳定的整数编号
+        first_seen = rows.drop_duplicates('series')['series']
+        id_map = {s: i for i, s in enumerate(first_seen)}
+        rows['major_id'] = rows['series'].map(id_map).astype(int)
+        return rows[self.LINK_COLUMNS].reset_index(drop=True)
+
+    def _match_group(self, old_group: pd.DataFrame, new_group: pd.DataFrame) -> List[Tuple[int, int]]:
+        """同一院校内按相似度贪心配对未关联专业"""
+        candidates = []
+        for new_name, new_code, new_series in zip(new_group['norm_name'], new_group['major_code'], new_group['series']):
+            for old_name, old_code, old_series in zip(old_group['norm_name'], old_group['major_code'], old_group['series']):
+                score = major_similarity(new_name, old_name, same_code=(new_code == old_code))
+                if score >= self.SIMILARITY_THRESHOLD:
+                    candidates.append((score, new_series, old_series))
+
+        matched_new, matched_old, pairs = set(), set(), []
+        for score, new_series, old_series in sorted(candidates, key=lambda c: -c[0]):
+            if new_series in matched_new or old_series in matched_old:
+                continue
+            matched_new.add(new_series)
+            matched_old.add(old_series)
+            pairs.append((new_series, old_series))
+        return pairs
+
+    def _load_links(self, cache_file: str) -> Optional[pd.DataFrame]:
+        """读取磁盘缓存的关联表"""
+        path = Path(cache_file)
+        if not path.exists():
+            return None
+        try:
+            links = pd.read_csv(path, dtype={'school_code': str, 'major_code': str})
+            if list(links.columns) != self.LINK_COLUMNS:
+                return None
+            self.logger.info(f"读取专业关联表缓存: {path}")
+            return links
+        except Exception as e:
+            self.logger.warning(f"读取专业关联表缓存失败: {e}")
+            return None
+
+    def _save_links(self, links: pd.DataFrame, cache_file: str) -> None:
+        """保存关联表到磁盘"""
+        try:
+            path = Path(cache_file)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            links.to_csv(path, index=False)
+        except Exception as e:
+            self.logger.warning(f"保存专业关联表缓存失败: {e}")
+            return
+        self._prune_links(path)
+
+    def _prune_links(self, current: Path) -> None:
+        """删除同目录下其他数据版本或格式版本的关联表缓存"""
+        for stale in current.parent.glob(f"{self.CACHE_PREFIX}*.csv"):
+            if stale == current:
+                continue
+            try:
+                stale.unlink()
+                self.logger.info(f"删除过期的专业关联表缓存: {stale}")
+            except OSError as e:
+                self.logger.warning(f"删除过期的专业关联表缓存失败: {e}")
+
+    def get_major_id(self, year: int, school_code: str, major_code: str) -> Optional[int]:
+        """
+        获取专业编号对应的 major_id
+
+        Args:
+            year: 年份
+            school_code: 院校编号
+            major_code: 专业编号
+
+        Returns:
+            major_id,不存在返回None
+        """
+        return self._id_index.get((year, str(school_code), str(major_code)))
+
+    def find_major_ids(self, major_name: str) -> List[int]:
+        """
+        按专业名称查找 major_id
+
+        优先按规范化名称精确匹配,其次按去括号的基础名称匹配
+
+        Args:
+            major_name: 专业名称
+
+        Returns:
+            major_id列表(去重)
+        """
+        norm_name = normalize_major_name(major_name)
+        ids = self._name_index.get(norm_name)
+        if not ids:
+            ids = self._base_index.get(parse_major_name(norm_name)[0], [])
+        return list(dict.fromkeys(ids))
+
+    def lookup_ids(self, school_names: Sequence[str], major_names: Sequence[str]) -> np.ndarray:
+        """
+        按 (院校名称, 专业名称) 批量查找 major_id
+
+        专业名称先规范化;同一名称对应多个专业序列时取最近年份、专业编号靠前者
+
+        Args:
+            school_names: 院校名称序列
+            major_names: 专业名称序列(与院校名称等长)
+
+        Returns:
+            major_id数组,未找到为-1
+        """
+        if self._pair_index is None:
+            rows = self.rows[self.rows['major_id'] >= 0]
+            ordered = rows.sort_values(['year', 'school_code', 'major_code'], ascending=[False, True, True])
+            self._pair_index = {}
+            for key, major_id in zip(zip(ordered['school_name'], ordered['norm_name']), ordered['major_id']):
+                self._pair_index.setdefault(key, int(major_id))
+        return np.array([
+            self._pair_index.get((school_name, normalize_major_name(major_name)), -1)
+            for school_name, major_name in zip(school_names, major_names)
+        ], dtype=np.int64)
+
+    def get_rows(self, major_ids: Optional[List[int]] = None) -> pd.DataFrame:
+        """
+        获取关联后的专业记录
+
+        Args:
+            major_ids: 限定的 major_id,为None时返回全部
+
+        Returns:
+            DataFrame: 含 major_id 列的专业记录
+        """
+        if major_ids is None:
+            return self.rows
+        return self.rows[self.rows['major_id'].isin(major_ids)]
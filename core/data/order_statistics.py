@@ -0,0 +1,154 @@
+"""
+分数顺序统计结构
+按年份将投档记录按 (分数升序, 位次降序) 排好,与分数前缀和一起保存;
+任意分数/位次区间对应有序数组上的一段连续切片,
+中位数、任意百分位、均值都由 searchsorted 和前缀和直接得到
+"""
+
+from typing import Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .aggregate_cube import resolve_column
+from utils.logger import get_logger
+
+
+class ScoreOrderStatistics:
+    """单一年份的分数顺序统计"""
+
+    def __init__(self, df: Optional[pd.DataFrame], year: int = 2025):
+        """
+        构建顺序统计结构
+
+        Args:
+            df: 单一年份投档数据
+            year: 数据年份
+        """
+        self.logger = get_logger("ScoreOrderStatistics")
+        self.year = year
+
+        if df is None:
+            df = pd.DataFrame()
+        score_col = resolve_column(df, '投档最低分')
+        rank_col = resolve_column(df, '位次')
+        school_col = resolve_column(df, '招生院校', '院校名称', '学校名称')
+        major_col = resolve_column(df, '招生专业', '专业名称')
+        self.has_scores = score_col is not None
+        self.has_ranks = rank_col is not None
+
+        scores = pd.to_numeric(df[score_col], errors='coerce').to_numpy(dtype=float) if score_col \
+            else np.zeros(len(df))
+        ranks = pd.to_numeric(df[rank_col], errors='coerce').to_numpy(dtype=float) if rank_col \
+            else np.zeros(len(df))
+
+        # 按 (分数升序, 位次降序) 排序: 位次为分数的单调函数时位次数组单调不增
+        order = np.lexsort((-ranks, scores))
+        self.scores = scores[order]
+        self.ranks = ranks[order]
+        self._neg_ranks = -self.ranks
+        self.score_prefix = np.concatenate([[0.0], np.cumsum(np.nan_to_num(self.scores))])
+
+        def codes(column: Optional[str]) -> np.ndarray:
+            if column is None:
+                return np.full(len(order), -1, dtype=np.int64)
+            return pd.factorize(df[column])[0][order]
+
+        self.school_codes = codes(school_col)
+        self.major_codes = codes(major_col)
+
+        # 缺失分数排在末尾,分数统计只使用前 finite_count 条
+        self.finite_count = int(np.count_nonzero(~np.isnan(self.scores)))
+
+        # 位次筛选要求分数、位次完整且位次随分数单调
+        complete = self.finite_count == len(self.scores) and not np.isnan(self.ranks).any()
+        self.sliceable = bool(complete and np.all(np.diff(self.ranks) <= 0))
+
+        self.logger.info(f"{year}年分数顺序统计构建完成: 记录={len(self.scores)}, 可切片={self.sliceable}")
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def slice_range(self, min_score: Optional[float] = None, max_score: Optional[float] = None,
+                    min_rank: Optional[float] = None, max_rank: Optional[float] = None) -> Tuple[int, int]:
+        """
+        二分查找分数/位次筛选对应的有序数组切片
+
+        Args:
+            min_score: 最低分数
+            max_score: 最高分数
+            min_rank: 最低位次
+            max_rank: 最高位次
+
+        Returns:
+            (起始下标, 结束下标)
+        """
+        start, end = 0, len(self.scores)
+        if min_score is not None:
+            start = max(start, int(np.searchsorted(self.scores, min_score, side='left')))
+        if max_score is not None:
+            end = min(end, int(np.searchsorted(self.scores, max_score, side='right')))
+        if self.has_ranks:
+            # 位次 <= max_rank 等价于 -位次 >= -max_rank
+            if max_rank is not None:
+                start = max(start, int(np.searchsorted(self._neg_ranks, -max_rank, side='left')))
+            if min_rank is not None:
+                end = min(end, int(np.searchsorted(self._neg_ranks, -min_rank, side='right')))
+        return start, max(start, end)
+
+    def percentiles(self, start: int, end: int, q: Sequence[float]) -> np.ndarray:
+        """
+        计算切片内分数的百分位(线性插值,与 pandas/NumPy 默认一致)
+
+        Args:
+            start: 起始下标
+            end: 结束下标
+            q: 百分位(0-100)
+
+        Returns:
+            各百分位的分数
+        """
+        count = end - start
+        if count <= 0:
+            return np.zeros(len(q))
+        position = start + np.asarray(q, dtype=float) / 100 * (count - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, end - 1)
+        fraction = position - lower
+        return self.scores[lower] + (self.scores[upper] - self.scores[lower]) * fraction
+
+    def summary(self, start: int, end: int, q: Sequence[float] = ()) -> Dict[str, Any]:
+        """
+        统计切片内的记录数、院校数、专业数和分数分布
+
+        Args:
+            start: 起始下标
+            end: 结束下标
+            q: 额外计算的百分位
+
+        Returns:
+            {'count', 'universities_count', 'majors_count', 'min', 'max', 'mean', 'median', 'percentiles'},
+            分数统计忽略缺失分数的记录
+        """
+        def distinct(codes: np.ndarray) -> int:
+            values = np.unique(codes[start:end])
+            return int(np.count_nonzero(values >= 0))
+
+        result = {
+            'count': max(0, end - start),
+            'universities_count': distinct(self.school_codes),
+            'majors_count': distinct(self.major_codes),
+            'min': 0, 'max': 0, 'mean': 0, 'median': 0, 'percentiles': {}
+        }
+        valid_end = min(end, self.finite_count)
+        valid = valid_end - start
+        if valid <= 0:
+            return result
+
+        values = self.percentiles(start, valid_end, [50, *q])
+        result.update({
+            'min': int(self.scores[start]),
+            'max': int(self.scores[valid_end - 1]),
+            'mean': float((self.score_prefix[valid_end] - self.score_prefix[start]) / valid),
+            'median': float(values[0]),
+            'percentiles': {f'p{p:g}': float(v) for p, v in zip(q, values[1:])}
+        })
+        return result
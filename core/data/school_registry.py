@@ -0,0 +1,123 @@
+"""
+院校编号注册表
+在加载时一次性建立 院校编号 / 历史哈希代码 / 院校名称 之间的双向映射,
+请求路径上的代码查找为 O(1) 字典访问
+"""
+
+import hashlib
+from typing import Dict, Optional, List
+import pandas as pd
+from .aggregate_cube import resolve_column
+from utils.logger import get_logger
+
+
+def legacy_school_code(school_name: str) -> str:
+    """
+    生成历史哈希代码(与前端已有链接保持兼容)
+
+    Args:
+        school_name: 院校名称
+
+    Returns:
+        哈希代码字符串
+    """
+    return str(int(hashlib.md5(school_name.encode('utf-8')).hexdigest(), 16) % 100000)
+
+
+class SchoolRegistry:
+    """院校编号注册表"""
+
+    def __init__(self, years_data: Dict[int, pd.DataFrame]):
+        """
+        构建注册表
+
+        Args:
+            years_data: 年份到投档数据的映射
+        """
+        self.logger = get_logger("SchoolRegistry")
+
+        self.name_by_code: Dict[str, str] = {}
+        self.code_by_name: Dict[str, str] = {}
+        self.name_by_legacy: Dict[str, str] = {}
+        self.legacy_by_name: Dict[str, str] = {}
+        # 历史哈希代码冲突: 代码 -> 未能占用该代码的院校名称
+        self.legacy_collisions: Dict[str, List[str]] = {}
+
+        # 院校编号按年份升序写入,同一编号改名时保留最新名称
+        names_by_year: Dict[int, List[str]] = {}
+        for year in sorted(years_data):
+            df = years_data[year]
+            if df is None or df.empty:
+                continue
+
+            school_col = resolve_column(df, '招生院校', '院校名称', '学校名称')
+            code_col = resolve_column(df, '院校编号', '院校代码')
+            if not school_col:
+                continue
+
+            if code_col:
+                pairs = df[[code_col, school_col]].dropna().drop_duplicates()
+                for code, name in zip(pairs[code_col], pairs[school_col]):
+                    code = str(code).strip()
+                    self.name_by_code[code] = name
+                    self.code_by_name[name] = code
+            names_by_year[year] = [name for name in df[school_col].dropna().unique() if name]
+
+        # 历史哈希代码按年份降序、年内按出现顺序写入: 冲突时保留最新年份中先出现的院校
+        # (与原先按2025年数据逐个匹配的结果一致)
+        for year in sorted(names_by_year, reverse=True):
+            for name in names_by_year[year]:
+                if name in self.legacy_by_name:
+                    continue
+                legacy = legacy_school_code(name)
+                self.legacy_by_name[name] = legacy
+                if legacy in self.name_by_legacy:
+                    self.legacy_collisions.setdefault(legacy, []).append(name)
+                else:
+                    self.name_by_legacy[legacy] = name
+
+        for legacy, names in self.legacy_collisions.items():
+            self.logger.warning(
+                f"历史哈希代码冲突: {legacy} 解析为 {self.name_by_legacy[legacy]}, 无法解析: {', '.join(names)}"
+            )
+        shadowed = sorted(set(self.name_by_legacy) & set(self.name_by_code))
+        if shadowed:
+            self.logger.warning(f"历史哈希代码与院校编号重复(优先按院校编号解析): {', '.join(shadowed)}")
+
+        self.logger.info(
+            f"院校注册表构建完成: 院校={len(self.legacy_by_name)}, 院校编号={len(self.name_by_code)}, "
+            f"哈希冲突={len(self.legacy_collisions)}"
+        )
+
+    def resolve(self, code) -> Optional[str]:
+        """
+        根据代码查找院校名称(院校编号优先,其次为历史哈希代码)
+
+        Args:
+            code: 院校编号或历史哈希代码
+
+        Returns:
+            院校名称,不存在则返回None
+        """
+        code = str(code).strip()
+        name = self.name_by_code.get(code)
+        if name is None:
+            name = self.name_by_legacy.get(code)
+        return name
+
+    def get_legacy_code(self, school_name: str) -> str:
+        """获取院校的历史哈希代码(哈希代码无法解析回该院校时改用院校编号)"""
+        legacy = self.legacy_by_name.get(school_name)
+        if legacy is None:
+            legacy = legacy_school_code(school_name)
+        if self.resolve(legacy) not in (None, school_name) and school_name in self.code_by_name:
+            return self.code_by_name[school_name]
+        return legacy
+
+    def get_school_code(self, school_name: str) -> Optional[str]:
+        """获取院校编号"""
+        return self.code_by_name.get(school_name)
+
+    def get_school_names(self) -> List[str]:
+        """获取全部院校名称"""
+        return list(self.legacy_by_name.keys())
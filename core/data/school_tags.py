@@ -0,0 +1,218 @@
+"""
+院校标签位图
+每所院校的标签(985/211/双一流/民办/独立/中外合作/港澳台)压缩为一个uint16位掩码,
+投档记录加载时按院校广播为行级掩码列,所有标签筛选统一为一次向量化的按位与
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from utils.logger import get_logger
+
+
+# 标签位
+TAG_985 = 1 << 0
+TAG_211 = 1 << 1
+TAG_DOUBLE_FIRST_CLASS = 1 << 2
+TAG_PRIVATE = 1 << 3
+TAG_INDEPENDENT = 1 << 4
+TAG_CHINESE_FOREIGN = 1 << 5
+TAG_HK_MACAO_TAIWAN = 1 << 6
+# 院校存在于学校信息表中
+TAG_KNOWN = 1 << 15
+
+TAG_BITS = {
+    'is_985': TAG_985,
+    'is_211': TAG_211,
+    'is_double_first_class': TAG_DOUBLE_FIRST_CLASS,
+    'is_private': TAG_PRIVATE,
+    'is_independent': TAG_INDEPENDENT,
+    'is_chinese_foreign': TAG_CHINESE_FOREIGN,
+    'is_hk_macao_taiwan': TAG_HK_MACAO_TAIWAN,
+}
+
+EMPTY_TAGS = {name: False for name in TAG_BITS}
+
+# 查询类接口返回的基础标签
+BASIC_TAGS = ('is_985', 'is_211', 'is_double_first_class', 'is_private', 'is_independent')
+
+# 投档数据中的行级标签掩码列
+TAG_MASK_COLUMN = '标签掩码'
+
+
+def decode_tags(mask: int) -> Dict[str, bool]:
+    """
+    将位掩码解码为标签字典
+
+    Args:
+        mask: 标签位掩码
+
+    Returns:
+        标签字典
+    """
+    mask = int(mask)
+    return {name: bool(mask & bit) for name, bit in TAG_BITS.items()}
+
+
+def tag_filter_bits(**flags: Optional[bool]) -> Tuple[int, int]:
+    """
+    将标签筛选条件编译为 (关注位, 期望值)
+
+    Args:
+        **flags: 标签筛选条件,如 is_985=True, is_private=False; None表示不筛选
+
+    Returns:
+        (关注位, 期望值),记录满足 (mask & 关注位) == 期望值 即通过
+    """
+    care, want = 0, 0
+    for name, value in flags.items():
+        if value is None:
+            continue
+        bit = TAG_BITS[name]
+        care |= bit
+        if value:
+            want |= bit
+    return care, want
+
+
+def match_tags(masks: np.ndarray, **flags: Optional[bool]) -> np.ndarray:
+    """
+    按标签条件筛选位掩码数组
+
+    Args:
+        masks: 位掩码数组
+        **flags: 标签筛选条件(同 tag_filter_bits)
+
+    Returns:
+        布尔数组
+    """
+    care, want = tag_filter_bits(**flags)
+    masks = np.asarray(masks, dtype=np.uint16)
+    return (masks & np.uint16(care)) == np.uint16(want)
+
+
+class SchoolTags:
+    """院校标签位图(统一的标签定义: 985院校同时视为211)"""
+
+    def __init__(self, school_info_df: Optional[pd.DataFrame]):
+        """
+        由学校信息表构建标签位图
+
+        Args:
+            school_info_df: 学校信息DataFrame
+        """
+        self.logger = get_logger("SchoolTags")
+        self.school_names: List[str] = []
+        self.masks = np.zeros(0, dtype=np.uint16)
+        self.cities: List[str] = []
+        self.detail_links: List[str] = []
+
+        if school_info_df is None or school_info_df.empty:
+            self.school_index = pd.Index([], dtype=object)
+            return
+
+        school_col = '学校名称' if '学校名称' in school_info_df.columns else '院校名称'
+        info = school_info_df.drop_duplicates(school_col)
+
+        def flag(column: str) -> np.ndarray:
+            if column not in info.columns:
+                return np.zeros(len(info), dtype=bool)
+            values = info[column]
+            return (values.notna() & (values.astype(str).str.strip().str.upper() == 'Y')).to_numpy()
+
+        is_985 = flag('985')
+        is_211 = is_985 | flag('211')
+        if '办学层次' in info.columns:
+            is_211 |= info['办学层次'].astype(str).str.contains('211', regex=False).to_numpy()
+
+        masks = np.full(len(info), TAG_KNOWN, dtype=np.uint16)
+        for values, bit in (
+            (is_985, TAG_985),
+            (is_211, TAG_211),
+            (flag('双一流'), TAG_DOUBLE_FIRST_CLASS),
+            (flag('民办高校'), TAG_PRIVATE),
+            (flag('独立学院'), TAG_INDEPENDENT),
+            (flag('中外合作办学'), TAG_CHINESE_FOREIGN),
+            (flag('内地与港澳台合作办学'), TAG_HK_MACAO_TAIWAN),
+        ):
+            masks[values] |= bit
+
+        def text(column: str) -> List[str]:
+            if column not in info.columns:
+                return [''] * len(info)
+            return ['' if pd.isna(v) else v for v in info[column]]
+
+        self.school_names = [str(name) for name in info[school_col]]
+        self.school_index = pd.Index(self.school_names, dtype=object)
+        self.masks = masks
+        self.cities = text('所在城市') if '所在城市' in info.columns else text('所在区域')
+        self.detail_links = text('明细链接')
+
+        self.logger.info(f"院校标签位图构建完成: 院校={len(self.school_names)}")
+
+    def _position(self, school_name: str) -> int:
+        """院校在位图中的下标(不存在返回-1)"""
+        try:
+            return int(self.school_index.get_loc(school_name))
+        except KeyError:
+            return -1
+
+    def contains(self, school_name: str) -> bool:
+        """院校是否存在于学校信息表"""
+        return self._position(school_name) >= 0
+
+    def get_mask(self, school_name: str) -> int:
+        """
+        获取院校标签位掩码
+
+        Args:
+            school_name: 院校名称
+
+        Returns:
+            位掩码,院校不存在时为0
+        """
+        pos = self._position(school_name)
+        return int(self.masks[pos]) if pos >= 0 else 0
+
+    def get_tags(self, school_name: str) -> Dict[str, bool]:
+        """
+        获取院校标签字典
+
+        Args:
+            school_name: 院校名称
+
+        Returns:
+            标签字典
+        """
+        return decode_tags(self.get_mask(school_name))
+
+    def get_info(self, school_name: str) -> Dict[str, Any]:
+        """
+        获取院校的所在城市和明细链接
+
+        Args:
+            school_name: 院校名称
+
+        Returns:
+            {'city', 'detail_link'},院校不存在时为空字符串
+        """
+        pos = self._position(school_name)
+        if pos < 0:
+            return {'city': '', 'detail_link': ''}
+        return {'city': self.cities[pos], 'detail_link': self.detail_links[pos]}
+
+    def masks_for(self, school_names) -> np.ndarray:
+        """
+        将院校名称序列广播为位掩码数组
+
+        Args:
+            school_names: 院校名称序列(如投档数据的院校列)
+
+        Returns:
+            uint16数组,不在学校信息表中的院校为0
+        """
+        positions = self.school_index.get_indexer(pd.Index(school_names, dtype=object))
+        masks = np.zeros(len(positions), dtype=np.uint16)
+        found = positions >= 0
+        masks[found] = self.masks[positions[found]]
+        return masks
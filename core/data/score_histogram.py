@@ -0,0 +1,156 @@
+"""
+分数/位次前缀和直方图
+按年份预先计算逐分(1分精度)和逐位次的累计记录数,
+任意 [下限, 上限] 区间和任意分段宽度的分布统计都由前缀和之差得到,无需筛选DataFrame
+"""
+
+from typing import Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .aggregate_cube import resolve_column
+from utils.logger import get_logger
+
+
+def _prefix_counts(values: np.ndarray, offset: int) -> np.ndarray:
+    """
+    构建累计计数数组: prefix[k] 为取值小于 offset + k 的记录数
+
+    Args:
+        values: 整数取值数组
+        offset: 起始取值
+
+    Returns:
+        前缀和数组(长度为取值跨度+1)
+    """
+    if len(values) == 0:
+        return np.zeros(1, dtype=np.int64)
+    counts = np.bincount(values - offset)
+    return np.concatenate([[0], np.cumsum(counts)])
+
+
+def _range_counts(prefix: np.ndarray, offset: int, lows: np.ndarray, highs: np.ndarray) -> np.ndarray:
+    """
+    由前缀和计算闭区间 [low, high] 内的记录数
+
+    Args:
+        prefix: 前缀和数组
+        offset: 起始取值
+        lows: 区间下限数组
+        highs: 区间上限数组
+
+    Returns:
+        各区间的记录数
+    """
+    last = len(prefix) - 1
+    start = np.clip(np.ceil(lows - offset), 0, last).astype(np.int64)
+    end = np.clip(np.floor(highs - offset) + 1, 0, last).astype(np.int64)
+    return np.maximum(prefix[end] - prefix[start], 0)
+
+
+class ScoreHistogram:
+    """单一年份的分数/位次前缀和直方图"""
+
+    def __init__(self, df: Optional[pd.DataFrame], year: int = 2025):
+        """
+        构建直方图
+
+        Args:
+            df: 单一年份投档数据
+            year: 数据年份
+        """
+        self.logger = get_logger("ScoreHistogram")
+        self.year = year
+
+        score_col = resolve_column(df, '投档最低分') if df is not None else None
+        rank_col = resolve_column(df, '位次') if df is not None else None
+        scores = pd.to_numeric(df[score_col], errors='coerce') if score_col else pd.Series([], dtype=float)
+        ranks = pd.to_numeric(df[rank_col], errors='coerce') if rank_col else pd.Series([], dtype=float)
+        self.has_scores = score_col is not None
+        self.has_ranks = rank_col is not None
+
+        valid_scores = np.floor(scores.dropna().to_numpy()).astype(np.int64)
+        valid_ranks = np.floor(ranks.dropna().to_numpy()).astype(np.int64)
+        self.score_offset = int(valid_scores.min()) if len(valid_scores) else 0
+        self.rank_offset = int(valid_ranks.min()) if len(valid_ranks) else 0
+        self.score_prefix = _prefix_counts(valid_scores, self.score_offset)
+        self.rank_prefix = _prefix_counts(valid_ranks, self.rank_offset)
+
+        # 位次是否为分数的单调函数(每个分数只对应一个位次,分数越高位次越小),
+        # 成立时位次区间等价于分数区间,可与分数筛选组合
+        self.score_values = np.zeros(0, dtype=np.int64)
+        self.score_ranks = np.zeros(0, dtype=np.int64)
+        self.rank_monotone = False
+        if self.has_scores and self.has_ranks and scores.notna().equals(ranks.notna()) and len(valid_scores):
+            by_score = pd.DataFrame({'score': scores, 'rank': ranks}).dropna().groupby('score')['rank']
+            low, high = by_score.min(), by_score.max()
+            self.rank_monotone = bool((low == high).all() and low.is_monotonic_decreasing)
+            if self.rank_monotone:
+                self.score_values = low.index.to_numpy().astype(np.int64)
+                self.score_ranks = low.to_numpy().astype(np.int64)
+
+        self.logger.info(
+            f"{year}年分数直方图构建完成: 分数记录={self.score_total}, 位次记录={self.rank_total}, "
+            f"位次单调={self.rank_monotone}"
+        )
+
+    @property
+    def score_total(self) -> int:
+        """有分数的记录数"""
+        return int(self.score_prefix[-1])
+
+    @property
+    def rank_total(self) -> int:
+        """有位次的记录数"""
+        return int(self.rank_prefix[-1])
+
+    def score_counts(self, lows: Sequence[float], highs: Sequence[float]) -> np.ndarray:
+        """
+        批量统计分数闭区间 [low, high] 内的记录数
+
+        Args:
+            lows: 区间下限
+            highs: 区间上限
+
+        Returns:
+            各区间的记录数
+        """
+        return _range_counts(self.score_prefix, self.score_offset,
+                             np.asarray(lows, dtype=float), np.asarray(highs, dtype=float))
+
+    def rank_counts(self, lows: Sequence[float], highs: Sequence[float]) -> np.ndarray:
+        """
+        批量统计位次闭区间 [low, high] 内的记录数
+
+        Args:
+            lows: 区间下限
+            highs: 区间上限
+
+        Returns:
+            各区间的记录数
+        """
+        return _range_counts(self.rank_prefix, self.rank_offset,
+                             np.asarray(lows, dtype=float), np.asarray(highs, dtype=float))
+
+    def score_bounds_for_ranks(self, min_rank: Optional[float],
+                               max_rank: Optional[float]) -> Optional[Tuple[float, float]]:
+        """
+        将位次区间换算为等价的分数区间(仅位次为分数的单调函数时可用)
+
+        Args:
+            min_rank: 最低位次(None表示不限)
+            max_rank: 最高位次(None表示不限)
+
+        Returns:
+            (分数下限, 分数上限),不可换算时返回None
+        """
+        if not self.rank_monotone:
+            return None
+        keep = np.ones(len(self.score_values), dtype=bool)
+        if min_rank is not None:
+            keep &= self.score_ranks >= min_rank
+        if max_rank is not None:
+            keep &= self.score_ranks <= max_rank
+        if not keep.any():
+            return (np.inf, -np.inf)
+        selected = self.score_values[keep]
+        return (float(selected.min()), float(selected.max()))
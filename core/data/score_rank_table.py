@@ -0,0 +1,252 @@
+"""
+分数-位次换算表
+按年份由一分一段表(存在时)或投档数据中的 (投档最低分, 位次) 点构建单调曲线,
+分数与位次之间用 log(位次) 关于分数的分段线性插值互相换算;
+插值节点按分数有序存放,整组分数/位次的换算为一次向量化的二分查找。
+同位分: 将某年的分数按位次等价换算为参考年份(默认最新年份)的分数,使不同年份的分数可比
+"""
+
+from typing import Dict, Any, Optional, Union
+import numpy as np
+import pandas as pd
+from utils.logger import get_logger
+
+
+ArrayLike = Union[float, int, np.ndarray, list, pd.Series]
+
+# 投档数据中的同位分列(参考年份的等位次分数)
+EQUIVALENT_SCORE_COLUMN = '同位分'
+
+
+class ScoreRankCurve:
+    """单一年份的分数-位次单调曲线"""
+
+    def __init__(self, scores: np.ndarray, ranks: np.ndarray, year: int, source: str):
+        """
+        构建曲线
+
+        Args:
+            scores: 节点分数
+            ranks: 节点位次(该分数考生的最低排名,即累计人数)
+            year: 年份
+            source: 数据来源('segment' 一分一段表 / 'admission' 投档数据)
+        """
+        self.year = year
+        self.source = source
+
+        points = pd.DataFrame({'score': scores, 'rank': ranks}).dropna()
+        points = points[points['rank'] > 0]
+        # 同一分数取最大位次(与一分一段表累计人数的含义一致)
+        by_score = points.groupby('score')['rank'].max().sort_index()
+        score_values = by_score.index.to_numpy(dtype=float)
+        rank_values = by_score.to_numpy(dtype=float)
+
+        # 强制单调: 分数越高位次越小,从高分往低分取累计最大值
+        rank_values = np.maximum.accumulate(rank_values[::-1])[::-1]
+
+        self.scores = score_values
+        self.ranks = rank_values
+        self.log_ranks = np.log(rank_values)
+
+        # 反向换算的节点: 位次升序,位次相同时保留最高分
+        inverse_ranks, first = np.unique(self.log_ranks[::-1], return_index=True)
+        self._inverse_log_ranks = inverse_ranks
+        self._inverse_scores = score_values[::-1][first]
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def score_to_rank(self, scores: np.ndarray) -> np.ndarray:
+        """
+        分数换算位次(超出节点范围时取端点值)
+
+        Args:
+            scores: 分数数组
+
+        Returns:
+            位次数组
+        """
+        return np.exp(np.interp(scores, self.scores, self.log_ranks))
+
+    def rank_to_score(self, ranks: np.ndarray) -> np.ndarray:
+        """
+        位次换算分数(超出节点范围时取端点值)
+
+        Args:
+            ranks: 位次数组
+
+        Returns:
+            分数数组
+        """
+        log_ranks = np.log(np.maximum(ranks, 1.0))
+        return np.interp(log_ranks, self._inverse_log_ranks, self._inverse_scores)
+
+
+class ScoreRankTable:
+    """多年份分数-位次换算服务"""
+
+    # 构成曲线所需的最少节点数
+    MIN_POINTS = 2
+
+    def __init__(self, years_data: Dict[int, pd.DataFrame],
+                 segment_tables: Optional[Dict[int, pd.DataFrame]] = None):
+        """
+        构建各年份的换算曲线
+
+        Args:
+            years_data: 年份到投档数据的映射
+            segment_tables: 年份到一分一段表的映射(含 分数、累计人数 列),优先于投档数据
+        """
+        self.logger = get_logger("ScoreRankTable")
+        self.curves: Dict[int, ScoreRankCurve] = {}
+
+        segment_tables = segment_tables or {}
+        for year in sorted(set(years_data) | set(segment_tables)):
+            curve = self._build_curve(year, segment_tables.get(year), years_data.get(year))
+            if curve is not None:
+                self.curves[year] = curve
+
+        summary = ', '.join(f"{y}({c.source}, {len(c)}点)" for y, c in self.curves.items())
+        self.logger.info(f"分数-位次换算表构建完成: {summary}")
+
+    def _build_curve(self, year: int, segment: Optional[pd.DataFrame],
+                     df: Optional[pd.DataFrame]) -> Optional[ScoreRankCurve]:
+        """
+        构建单一年份曲线: 优先使用一分一段表,否则使用投档数据
+
+        Args:
+            year: 年份
+            segment: 一分一段表
+            df: 投档数据
+
+        Returns:
+            ScoreRankCurve,数据不足时返回None
+        """
+        if segment is not None and {'分数', '累计人数'} <= set(segment.columns):
+            curve = ScoreRankCurve(
+                pd.to_numeric(segment['分数'], errors='coerce').to_numpy(dtype=float),
+                pd.to_numeric(segment['累计人数'], errors='coerce').to_numpy(dtype=float),
+                year, 'segment'
+            )
+            if len(curve) >= self.MIN_POINTS:
+                return curve
+
+        if df is None or df.empty:
+            return None
+        if '投档最低分' not in df.columns or '位次' not in df.columns:
+            return None
+        curve = ScoreRankCurve(
+            pd.to_numeric(df['投档最低分'], errors='coerce').to_numpy(dtype=float),
+            pd.to_numeric(df['位次'], errors='coerce').to_numpy(dtype=float),
+            year, 'admission'
+        )
+        return curve if len(curve) >= self.MIN_POINTS else None
+
+    @property
+    def years(self) -> list:
+        """可换算的年份(升序)"""
+        return list(self.curves)
+
+    def get_curve(self, year: Optional[int] = None) -> ScoreRankCurve:
+        """
+        获取年份曲线
+
+        Args:
+            year: 年份(None表示最新年份)
+
+        Returns:
+            ScoreRankCurve
+        """
+        if not self.curves:
+            raise ValueError("没有可用的分数-位次数据")
+        if year is None:
+            year = self.years[-1]
+        if year not in self.curves:
+            raise ValueError(f"没有{year}年的分数-位次数据")
+        return self.curves[year]
+
+    @staticmethod
+    def _convert(values: ArrayLike, func) -> Any:
+        """对标量或数组调用换算函数,标量输入返回标量"""
+        array = np.asarray(values, dtype=float)
+        result = func(array)
+        return float(result) if array.ndim == 0 else result
+
+    def score_to_rank(self, scores: ArrayLike, year: Optional[int] = None) -> Any:
+        """
+        分数换算位次
+
+        Args:
+            scores: 分数(标量或数组)
+            year: 年份(None表示最新年份)
+
+        Returns:
+            位次(与输入同形,浮点数)
+        """
+        return self._convert(scores, self.get_curve(year).score_to_rank)
+
+    def rank_to_score(self, ranks: ArrayLike, year: Optional[int] = None) -> Any:
+        """
+        位次换算分数
+
+        Args:
+            ranks: 位次(标量或数组)
+            year: 年份(None表示最新年份)
+
+        Returns:
+            分数(与输入同形,浮点数)
+        """
+        return self._convert(ranks, self.get_curve(year).rank_to_score)
+
+    def complete(self, score: Optional[float] = None, rank: Optional[float] = None,
+                 year: Optional[int] = None) -> Dict[str, Optional[int]]:
+        """
+        由分数或位次补全另一项
+
+        Args:
+            score: 分数
+            rank: 位次
+            year: 年份(None表示最新年份)
+
+        Returns:
+            {'score', 'rank'},两者都缺失时原样返回
+        """
+        if score is not None and rank is None:
+            rank = int(round(self.score_to_rank(score, year)))
+        elif rank is not None and score is None:
+            score = int(round(self.rank_to_score(rank, year)))
+        return {'score': score, 'rank': rank}
+
+    def equivalent_scores(self, scores: ArrayLike, ranks: Optional[ArrayLike] = None,
+                          year: Optional[int] = None, reference_year: Optional[int] = None) -> np.ndarray:
+        """
+        计算同位分: 与给定年份分数位次相同的参考年份分数
+
+        有位次时直接按位次换算,缺位次时先按该年份曲线将分数换算为位次;
+        参考年份本身的同位分即原分数
+
+        Args:
+            scores: 分数数组
+            ranks: 位次数组(可选,与分数等长)
+            year: 分数所属年份
+            reference_year: 参考年份(None表示最新年份)
+
+        Returns:
+            同位分数组(浮点数,无法换算为NaN)
+        """
+        scores = np.asarray(scores, dtype=float)
+        ranks = np.full(scores.shape, np.nan) if ranks is None else np.asarray(ranks, dtype=float).copy()
+
+        missing = ~np.isfinite(ranks) & np.isfinite(scores)
+        if missing.any() and year in self.curves:
+            ranks[missing] = self.curves[year].score_to_rank(scores[missing])
+
+        reference = self.get_curve(reference_year)
+        if year == reference.year:
+            return scores.copy()
+
+        result = np.full(scores.shape, np.nan)
+        known = np.isfinite(ranks) & (ranks > 0)
+        if known.any():
+            result[known] = reference.rank_to_score(ranks[known])
+        return result
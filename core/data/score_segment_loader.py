@@ -0,0 +1,106 @@
+"""
+一分一段表加载器
+加载各年份的一分一段表(分数 / 本段人数 / 累计人数)
+"""
+
+import pandas as pd
+from .base_loader import BaseLoader
+
+
+class ScoreSegmentLoader(BaseLoader):
+    """一分一段表加载器"""
+
+    # 累计人数列的常见写法
+    COLUMN_MAPPINGS = {
+        '分数段': '分数',
+        '成绩': '分数',
+        '位次': '累计人数',
+        '累计': '累计人数',
+        '本段人数': '人数',
+        '同分人数': '人数'
+    }
+
+    def __init__(self, cache_manager, year: int, file_path: str):
+        """
+        初始化加载器
+
+        Args:
+            cache_manager: 缓存管理器
+            year: 年份
+            file_path: 一分一段表文件路径
+        """
+        self.year = year
+        super().__init__(cache_manager, file_path)
+
+    def _generate_cache_key(self) -> str:
+        """生成缓存键"""
+        return f"score_segment_{self.year}_{self.file_path.name}"
+
+    def _load_from_file(self) -> pd.DataFrame:
+        """
+        从文件加载数据
+
+        Returns:
+            DataFrame: 原始数据
+        """
+        if self.file_path.suffix == '.md':
+            return self._load_from_markdown()
+        elif self.file_path.suffix in ['.xlsx', '.xls']:
+            return pd.read_excel(self.file_path)
+        elif self.file_path.suffix == '.csv':
+            return pd.read_csv(self.file_path)
+        else:
+            raise ValueError(f"不支持的文件格式: {self.file_path.suffix}")
+
+    def _load_from_markdown(self) -> pd.DataFrame:
+        """从Markdown文件加载数据"""
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        table_start = content.find('|')
+        if table_start == -1:
+            raise ValueError("未找到表格数据")
+
+        lines = []
+        for line in content[table_start:].split('\n'):
+            if '|' not in line or '---' in line:
+                continue
+            cells = [cell.strip() for cell in line.strip().strip('|').split('|')]
+            if len(cells) >= 2:
+                lines.append(cells)
+
+        if not lines:
+            raise ValueError("表格数据为空")
+
+        width = len(lines[0])
+        return pd.DataFrame([row[:width] for row in lines[1:] if len(row) >= width], columns=lines[0])
+
+    def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        数据清洗: 统一列名,缺少累计人数时由本段人数从高分向低分累加
+
+        Args:
+            df: 原始数据
+
+        Returns:
+            DataFrame: 含 分数、累计人数 两列、按分数降序排列的数据
+        """
+        df = df.rename(columns={k: v for k, v in self.COLUMN_MAPPINGS.items() if v not in df.columns})
+        if '分数' not in df.columns:
+            raise ValueError("一分一段表缺少分数列")
+
+        # "700及以上" 之类的分数段取其数值部分
+        scores = pd.to_numeric(df['分数'].astype(str).str.extract(r'(\d+(?:\.\d+)?)')[0], errors='coerce')
+        result = pd.DataFrame({'分数': scores})
+        if '累计人数' in df.columns:
+            result['累计人数'] = pd.to_numeric(df['累计人数'], errors='coerce')
+        elif '人数' in df.columns:
+            result['人数'] = pd.to_numeric(df['人数'], errors='coerce').fillna(0)
+            result = result.sort_values('分数', ascending=False)
+            result['累计人数'] = result['人数'].cumsum()
+        else:
+            raise ValueError("一分一段表缺少累计人数或本段人数列")
+
+        result = result.dropna(subset=['分数', '累计人数'])
+        result['year'] = self.year
+        return result[['分数', '累计人数', 'year']].sort_values('分数', ascending=False).reset_index(drop=True)
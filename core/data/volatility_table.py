@@ -0,0 +1,166 @@
+"""
+位次波动指标表
+由 (对象 × 年份) 位次矩阵一次向量化计算每个院校/专业的年际波动指标:
+位次标准差、变异系数、最大相邻年份跳变、变化方向一致性、对数位次年际波动;
+每个数据版本构建一次,供预测、录取概率、推荐风险和历史对比共用
+"""
+
+from typing import Dict, Any, Hashable, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from utils.logger import get_logger
+
+
+class VolatilityTable:
+    """院校/专业位次波动指标表"""
+
+    # 变异系数不低于该值视为波动较大
+    VOLATILE_CV = 0.2
+
+    # 可按列名读取的指标
+    METRICS = ('year_count', 'mean_rank', 'rank_std', 'cv', 'max_jump',
+               'direction_consistency', 'log_volatility')
+
+    def __init__(self, keys: Sequence[Hashable], years: Sequence[int], rank_matrix: np.ndarray):
+        """
+        构建波动指标表
+
+        Args:
+            keys: 对象标识(与矩阵行对应)
+            years: 年份(与矩阵列对应,升序)
+            rank_matrix: 位次矩阵,缺失值为NaN
+        """
+        self.logger = get_logger("VolatilityTable")
+        self.keys = pd.Index(list(keys))
+        self.years: List[int] = list(years)
+
+        ranks = np.asarray(rank_matrix, dtype=float).reshape(len(self.keys), len(self.years))
+        valid = np.isfinite(ranks) & (ranks > 0)
+        self.ranks = np.where(valid, ranks, np.nan)
+        self._compute(valid)
+        self.logger.info(f"波动指标表构建完成: 对象={len(self.keys)}, 年份={self.years}")
+
+    @classmethod
+    def from_records(cls, keys: Sequence[Hashable], years: Sequence[int], ranks: Sequence[float],
+                     aggfunc: str = 'mean') -> 'VolatilityTable':
+        """
+        由 (对象, 年份, 位次) 记录构建(同一对象同一年份多条记录按 aggfunc 聚合)
+
+        Args:
+            keys: 各记录的对象标识
+            years: 各记录的年份
+            ranks: 各记录的位次
+            aggfunc: 聚合方式
+
+        Returns:
+            VolatilityTable
+        """
+        records = pd.DataFrame({'key': list(keys), 'year': list(years),
+                                'rank': pd.to_numeric(pd.Series(list(ranks), dtype=object), errors='coerce')})
+        matrix = records.dropna(subset=['rank']).pivot_table(
+            index='key', columns='year', values='rank', aggfunc=aggfunc
+        )
+        return cls(matrix.index, [int(year) for year in matrix.columns], matrix.to_numpy(dtype=float))
+
+    def _compute(self, valid: np.ndarray) -> None:
+        """计算全部对象的波动指标"""
+        n_rows, n_years = self.ranks.shape
+        ranks = np.where(valid, self.ranks, 1.0)
+        self.year_count = valid.sum(axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            count = np.maximum(self.year_count, 1)
+            self.mean_rank = np.where(self.year_count > 0, np.where(valid, ranks, 0.0).sum(axis=1) / count, np.nan)
+            sq_dev = (np.where(valid, ranks - self.mean_rank[:, None], 0.0) ** 2).sum(axis=1)
+            self.rank_std = np.where(self.year_count >= 2, np.sqrt(sq_dev / np.maximum(self.year_count - 1, 1)),
+                                     np.nan)
+            self.cv = self.rank_std / self.mean_rank
+
+        # 相邻有效年份的变化(中间缺失的年份跳过)
+        columns = np.arange(n_years)
+        last_valid = np.maximum.accumulate(np.where(valid, columns, -1), axis=1)
+        previous = np.concatenate([np.full((n_rows, 1), -1), last_valid[:, :-1]], axis=1)
+        has_change = valid & (previous >= 0)
+        previous_ranks = np.take_along_axis(ranks, np.maximum(previous, 0), axis=1)
+        changes = np.where(has_change, ranks - previous_ranks, 0.0)
+        log_changes = np.where(has_change, np.log(ranks) - np.log(previous_ranks), 0.0)
+        n_changes = has_change.sum(axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.max_jump = np.where(n_changes > 0, np.abs(changes).max(axis=1, initial=0.0), np.nan)
+            # 1 表示每年同向变化, 0 表示涨跌相抵
+            self.direction_consistency = np.where(
+                n_changes > 0, np.abs(np.sign(changes).sum(axis=1)) / np.maximum(n_changes, 1), np.nan
+            )
+            # 对数位次年际变化的均方根(与录取概率曲线的波动同一量纲)
+            self.log_volatility = np.where(
+                n_changes > 0, np.sqrt((log_changes ** 2).sum(axis=1) / np.maximum(n_changes, 1)), np.nan
+            )
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, keys: Sequence[Hashable]) -> np.ndarray:
+        """
+        批量定位对象
+
+        Args:
+            keys: 对象标识序列
+
+        Returns:
+            各对象的行号,未找到为-1
+        """
+        return self.keys.get_indexer(pd.Index(list(keys)))
+
+    def column(self, name: str, positions: np.ndarray) -> np.ndarray:
+        """
+        按行号读取指标列
+
+        Args:
+            name: 指标名(见 METRICS)
+            positions: 行号数组,-1表示无数据
+
+        Returns:
+            指标数组,无数据为NaN
+        """
+        if name not in self.METRICS:
+            raise ValueError(f"未知的波动指标: {name}")
+        positions = np.asarray(positions, dtype=np.int64)
+        found = positions >= 0
+        values = np.full(len(positions), np.nan)
+        values[found] = getattr(self, name)[positions[found]]
+        return values
+
+    def is_volatile(self, positions: np.ndarray) -> np.ndarray:
+        """按变异系数判断是否波动较大(无数据视为否)"""
+        return np.nan_to_num(self.column('cv', positions)) >= self.VOLATILE_CV
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """构造单行波动指标"""
+        def rounded(values: np.ndarray, digits: int) -> Optional[float]:
+            value = values[i]
+            return round(float(value), digits) if np.isfinite(value) else None
+
+        cv = self.cv[i]
+        return {
+            'year_count': int(self.year_count[i]),
+            'rank_std': rounded(self.rank_std, 1),
+            'cv': rounded(self.cv, 4),
+            'max_jump': rounded(self.max_jump, 1),
+            'direction_consistency': rounded(self.direction_consistency, 2),
+            'log_volatility': rounded(self.log_volatility, 4),
+            'stability': round(max(0.0, 1 - float(cv)), 4) if np.isfinite(cv) else None
+        }
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        获取单个对象的波动指标
+
+        Args:
+            key: 对象标识
+
+        Returns:
+            波动指标字典,不存在返回None
+        """
+        i = self.keys.get_indexer([key])[0]
+        return self.row(i) if i >= 0 else None
@@ -3,6 +3,7 @@
 整合三年投档数据、学校信息、学科评估、保研率,生成综合大宽表
 """
 
+import numpy as np
 import pandas as pd
 from typing import Dict, Any, Optional
 from pathlib import Path
@@ -11,6 +12,7 @@ from .admission_loader import MultiYearAdmissionLoader
 from .school_loader import SchoolLoader
 from .subject_loader import SubjectLoader
 from .graduate_rate_loader import GraduateRateLoader
+from .score_rank_table import ScoreRankTable, EQUIVALENT_SCORE_COLUMN
 from core.models.admission_data import ComprehensiveRecord
 from utils.logger import get_logger
 
@@ -37,7 +39,8 @@ class WideTableBuilder(BaseLoader):
                         school_loader: Optional[SchoolLoader] = None,
                         subject_loader: Optional[SubjectLoader] = None,
                         graduate_rate_loader: Optional[GraduateRateLoader] = None,
-                        force_rebuild: bool = False) -> pd.DataFrame:
+                        force_rebuild: bool = False,
+                        score_rank_table: Optional[ScoreRankTable] = None) -> pd.DataFrame:
         """
         构建综合大宽表
         
@@ -47,6 +50,7 @@ class WideTableBuilder(BaseLoader):
             subject_loader: 学科评估加载器(可选)
             graduate_rate_loader: 保研率加载器(可选)
             force_rebuild: 是否强制重建
+            score_rank_table: 分数-位次换算表(可选,用于计算同位分)
         
         Returns:
             DataFrame: 综合大宽表
@@ -65,15 +69,24 @@ class WideTableBuilder(BaseLoader):
         df_2024 = multi_year_loader.load_year(2024)
         df_2025 = multi_year_loader.load_year(2025)
         
-        # Step 2: 重命名列
-        df_2023 = df_2023.rename(columns={'score': 'score_2023', 'rank': 'rank_2023'})
-        df_2024 = df_2024.rename(columns={'score': 'score_2024', 'rank': 'rank_2024'})
-        df_2025 = df_2025.rename(columns={'score': 'score_2025', 'rank': 'rank_2025'})
+        # Step 2: 添加同位分并重命名列
+        df_2023 = self._with_equivalent_scores(df_2023, 2023, score_rank_table)
+        df_2024 = self._with_equivalent_scores(df_2024, 2024, score_rank_table)
+        df_2025 = self._with_equivalent_scores(df_2025, 2025, score_rank_table)
+        df_2023 = df_2023.rename(columns={'score': 'score_2023', 'rank': 'rank_2023',
+                                          EQUIVALENT_SCORE_COLUMN: 'equivalent_score_2023'})
+        df_2024 = df_2024.rename(columns={'score': 'score_2024', 'rank': 'rank_2024',
+                                          EQUIVALENT_SCORE_COLUMN: 'equivalent_score_2024'})
+        df_2025 = df_2025.rename(columns={'score': 'score_2025', 'rank': 'rank_2025',
+                                          EQUIVALENT_SCORE_COLUMN: 'equivalent_score_2025'})
         
         # Step 3: 提取关键字段
-        key_cols_2023 = ['school_code', 'school_name', 'major_code', 'major_name', 'score_2023', 'rank_2023']
-        key_cols_2024 = ['school_code', 'school_name', 'major_code', 'major_name', 'score_2024', 'rank_2024']
-        key_cols_2025 = ['school_code', 'school_name', 'major_code', 'major_name', 'score_2025', 'rank_2025']
+        key_cols_2023 = ['school_code', 'school_name', 'major_code', 'major_name', 'score_2023', 'rank_2023',
+                         'equivalent_score_2023']
+        key_cols_2024 = ['school_code', 'school_name', 'major_code', 'major_name', 'score_2024', 'rank_2024',
+                         'equivalent_score_2024']
+        key_cols_2025 = ['school_code', 'school_name', 'major_code', 'major_name', 'score_2025', 'rank_2025',
+                         'equivalent_score_2025']
         
         df_2023 = df_2023[[col for col in key_cols_2023 if col in df_2023.columns]]
         df_2024 = df_2024[[col for col in key_cols_2024 if col in df_2024.columns]]
@@ -151,11 +164,14 @@ class WideTableBuilder(BaseLoader):
         # Step 8: 计算趋势分析字段
         self.logger.info("计算趋势分析字段")
         
-        # 分数变化
+        # 分数变化(有同位分时按同位分比较,消除各年难度差异)
+        change_2023, change_2025 = 'score_2023', 'score_2025'
+        if 'equivalent_score_2023' in df.columns and 'equivalent_score_2025' in df.columns:
+            change_2023, change_2025 = 'equivalent_score_2023', 'equivalent_score_2025'
         df['score_change'] = None
-        df.loc[df['score_2023'].notna() & df['score_2025'].notna(), 'score_change'] = \
-            df.loc[df['score_2023'].notna() & df['score_2025'].notna(), 'score_2025'] - \
-            df.loc[df['score_2023'].notna() & df['score_2025'].notna(), 'score_2023']
+        df.loc[df[change_2023].notna() & df[change_2025].notna(), 'score_change'] = \
+            df.loc[df[change_2023].notna() & df[change_2025].notna(), change_2025] - \
+            df.loc[df[change_2023].notna() & df[change_2025].notna(), change_2023]
         
         # 位次变化
         df['rank_change'] = None
@@ -192,9 +208,9 @@ class WideTableBuilder(BaseLoader):
             'is_985', 'is_211', 'is_double_first_class', 'is_private', 'is_independent',
             'graduate_rate', 'graduate_rank', 'graduate_count', 'graduate_rank_change',
             'top_subject',
-            'score_2023', 'rank_2023',
-            'score_2024', 'rank_2024',
-            'score_2025', 'rank_2025',
+            'score_2023', 'rank_2023', 'equivalent_score_2023',
+            'score_2024', 'rank_2024', 'equivalent_score_2024',
+            'score_2025', 'rank_2025', 'equivalent_score_2025',
             'score_trend', 'score_change', 'rank_change',
             'has_three_years'
         ]
@@ -209,6 +225,18 @@ class WideTableBuilder(BaseLoader):
         
         return df
     
+    def _with_equivalent_scores(self, df: pd.DataFrame, year: int,
+                                score_rank_table: Optional[ScoreRankTable]) -> pd.DataFrame:
+        """为缺少同位分列的年份数据补充同位分"""
+        if score_rank_table is None or EQUIVALENT_SCORE_COLUMN in df.columns or 'score' not in df.columns:
+            return df
+        equivalent = score_rank_table.equivalent_scores(
+            pd.to_numeric(df['score'], errors='coerce'),
+            pd.to_numeric(df['rank'], errors='coerce') if 'rank' in df.columns else None,
+            year
+        )
+        return df.assign(**{EQUIVALENT_SCORE_COLUMN: pd.array(np.round(equivalent), dtype='Int64')})
+
     def _extract_province(self, region: str) -> Optional[str]:
         """从区域字符串中提取省份"""
         if not region or pd.isna(region):
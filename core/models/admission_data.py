@@ -114,10 +114,13 @@ class ComprehensiveRecord(BaseModel):
     rank_2024: Optional[int] = Field(None, description="2024年投档位次")
     score_2025: Optional[int] = Field(None, description="2025年投档分数")
     rank_2025: Optional[int] = Field(None, description="2025年投档位次")
+    equivalent_score_2023: Optional[int] = Field(None, description="2023年同位分(换算到2025年)")
+    equivalent_score_2024: Optional[int] = Field(None, description="2024年同位分(换算到2025年)")
+    equivalent_score_2025: Optional[int] = Field(None, description="2025年同位分")
     
     # 趋势分析
     score_trend: Optional[str] = Field(None, description="分数趋势(上升/下降/稳定)")
-    score_change: Optional[int] = Field(None, description="分数变化(2025-2023)")
+    score_change: Optional[int] = Field(None, description="同位分变化(2025-2023)")
     rank_change: Optional[int] = Field(None, description="位次变化(2025-2023)")
     has_three_years: bool = Field(False, description="是否有三年数据")
     
@@ -3,14 +3,30 @@
 提供数据加载和访问的统一接口
 """
 
-from typing import Dict, Optional
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional
+import numpy as np
 import pandas as pd
 from core.data import CacheManager, CacheInvalidator
+from core.data.aggregate_cube import AggregateCube, resolve_column
+from core.data.school_registry import SchoolRegistry
+from core.data.major_linker import MajorLinker
+from core.data.candidate_pool import CandidatePool
+from core.data.school_tags import SchoolTags, TAG_MASK_COLUMN
+from core.data.score_histogram import ScoreHistogram
+from core.data.order_statistics import ScoreOrderStatistics
+from core.data.dashboard_cube import DashboardCube
+from core.data.admission_index import AdmissionIndex
+from core.data.score_rank_table import ScoreRankTable, EQUIVALENT_SCORE_COLUMN
+from core.data.score_segment_loader import ScoreSegmentLoader
+from core.data.volatility_table import VolatilityTable
 from core.data.base_loader import BaseLoader
 from core.data.admission_loader import MultiYearAdmissionLoader
 from core.data.school_loader import SchoolLoader
 from core.data.subject_loader import SubjectLoader
 from core.data.graduate_rate_loader import GraduateRateLoader
+from core.analytics.probability_model import ProbabilityModel, DEFAULT_MODEL_PATH, load_probability_model
 from utils.logger import get_logger
 
 
@@ -33,6 +49,12 @@ class DataService:
         self.school_loader = None  # 懒加载
         self.subject_loader = None  # 懒加载
         self.graduate_rate_loader = None  # 懒加载
+        self.segment_loaders: Dict[int, ScoreSegmentLoader] = {}
+
+        # 按数据版本保存的派生结构(不受缓存管理器的过期和容量淘汰影响,数据版本变化时整体清空)
+        self._derived: Dict[str, Any] = {}
+        self._derived_version: Optional[str] = None
+        self._derived_lock = threading.RLock()
     
     def add_admission_data(self, year: int, file_path: str) -> None:
         """
@@ -44,6 +66,32 @@ class DataService:
         """
         self.multi_year_loader.add_year(year, file_path)
         self.logger.info(f"添加投档数据: {year}")
+
+    def add_score_segment_table(self, year: int, file_path: str) -> None:
+        """
+        添加一分一段表(用于分数-位次换算,优先于投档数据)
+
+        Args:
+            year: 年份
+            file_path: 一分一段表文件路径
+        """
+        self.segment_loaders[year] = ScoreSegmentLoader(self.cache_manager, year, file_path)
+        self.logger.info(f"添加一分一段表: {year}")
+
+    def load_score_segment_tables(self) -> Dict[int, pd.DataFrame]:
+        """
+        加载所有已注册的一分一段表(加载失败的年份跳过)
+
+        Returns:
+            Dict[int, DataFrame]: 年份到一分一段表的映射
+        """
+        tables = {}
+        for year, loader in self.segment_loaders.items():
+            try:
+                tables[year] = loader.load()
+            except Exception as e:
+                self.logger.warning(f"加载{year}年一分一段表失败: {e}")
+        return tables
     
     def load_admission_data(self, year: int, force_reload: bool = False) -> Optional[pd.DataFrame]:
         """
@@ -54,9 +102,10 @@ class DataService:
             force_reload: 是否强制重新加载
         
         Returns:
-            DataFrame: 数据
+            DataFrame: 数据(含行级标签掩码列)
         """
-        return self.multi_year_loader.load_year(year, force_reload)
+        df = self._attach_tag_masks(self.multi_year_loader.load_year(year, force_reload))
+        return self._attach_equivalent_scores(df, year)
     
     def load_all_admission_data(self, force_reload: bool = False) -> Dict[int, pd.DataFrame]:
         """
@@ -68,8 +117,61 @@ class DataService:
         Returns:
             Dict[int, DataFrame]: 年份到数据的映射
         """
-        return self.multi_year_loader.load_all_years(force_reload)
+        years_data = self.multi_year_loader.load_all_years(force_reload)
+        return {
+            year: self._attach_equivalent_scores(self._attach_tag_masks(df), year)
+            for year, df in years_data.items()
+        }
+
+    def _attach_tag_masks(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """
+        将院校标签位掩码广播为投档数据的行级列(每份数据只计算一次)
+
+        Args:
+            df: 投档数据
+
+        Returns:
+            DataFrame: 原数据(已添加标签掩码列)
+        """
+        if df is None or df.empty or TAG_MASK_COLUMN in df.columns:
+            return df
+        school_col = resolve_column(df, '招生院校', '院校名称', '学校名称')
+        if not school_col:
+            return df
+        try:
+            df[TAG_MASK_COLUMN] = self.get_school_tags().masks_for(df[school_col])
+        except Exception as e:
+            self.logger.warning(f"添加标签掩码列失败: {e}")
+        return df
     
+    def _attach_equivalent_scores(self, df: Optional[pd.DataFrame], year: int) -> Optional[pd.DataFrame]:
+        """
+        添加同位分列: 按位次换算为参考年份(最新年份)的等价分数(每份数据只计算一次)
+
+        Args:
+            df: 投档数据
+            year: 数据年份
+
+        Returns:
+            DataFrame: 原数据(已添加同位分列)
+        """
+        if df is None or df.empty or EQUIVALENT_SCORE_COLUMN in df.columns:
+            return df
+        score_col = resolve_column(df, '投档最低分')
+        rank_col = resolve_column(df, '位次')
+        if not score_col:
+            return df
+        try:
+            equivalent = self.get_score_rank_table().equivalent_scores(
+                pd.to_numeric(df[score_col], errors='coerce'),
+                pd.to_numeric(df[rank_col], errors='coerce') if rank_col else None,
+                year
+            )
+            df[EQUIVALENT_SCORE_COLUMN] = pd.array(np.round(equivalent), dtype='Int64')
+        except Exception as e:
+            self.logger.warning(f"添加同位分列失败: {e}")
+        return df
+
     def get_school_loader(self, file_path: str = "data/学校信息.md") -> SchoolLoader:
         """
         获取学校信息加载器(懒加载)
@@ -166,6 +268,8 @@ class DataService:
     def clear_all_caches(self) -> None:
         """清空所有缓存"""
         self.cache_manager.clear()
+        with self._derived_lock:
+            self._derived.clear()
         self.logger.info("清空所有缓存")
     
     def get_cache_stats(self) -> Dict[str, any]:
@@ -177,6 +281,243 @@ class DataService:
         """
         return self.cache_manager.get_stats()
 
+    def get_dataset_version(self) -> str:
+        """
+        获取数据版本号(基于已注册数据文件的路径和修改时间)
+
+        Returns:
+            数据版本号
+        """
+        parts = []
+        for year, loader in sorted(self.multi_year_loader.loaders.items()):
+            timestamp = self.cache_invalidator.get_file_timestamp(str(loader.file_path))
+            parts.append(f"{year}:{loader.file_path}:{timestamp}")
+        for year, loader in sorted(self.segment_loaders.items()):
+            timestamp = self.cache_invalidator.get_file_timestamp(str(loader.file_path))
+            parts.append(f"segment{year}:{loader.file_path}:{timestamp}")
+        return hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()[:12]
+
+    def _get_derived(self, name: str, builder: Callable[[], Any]) -> Any:
+        """
+        获取按数据版本缓存的派生结构(不存在时构建)
+
+        Args:
+            name: 派生结构名称
+            builder: 构建函数
+
+        Returns:
+            派生结构
+        """
+        version = self.get_dataset_version()
+        with self._derived_lock:
+            if version != self._derived_version:
+                if self._derived:
+                    self.logger.info(f"数据版本变化,清空派生数据: {self._derived_version} -> {version}")
+                self._derived.clear()
+                self._derived_version = version
+            if name not in self._derived:
+                self.logger.info(f"构建派生数据: {name}_{version}")
+                self._derived[name] = builder()
+            return self._derived[name]
+
+    def get_aggregate_cube(self) -> AggregateCube:
+        """
+        获取多年份聚合立方体(每个数据版本构建一次)
+
+        Returns:
+            AggregateCube: 聚合立方体
+        """
+        return self._get_derived(
+            'aggregate_cube',
+            lambda: AggregateCube(self.load_all_admission_data())
+        )
+
+    def get_school_registry(self) -> SchoolRegistry:
+        """
+        获取院校编号注册表(每个数据版本构建一次)
+
+        Returns:
+            SchoolRegistry: 院校编号注册表
+        """
+        return self._get_derived(
+            'school_registry',
+            lambda: SchoolRegistry(self.load_all_admission_data())
+        )
+
+    def get_school_tags(self) -> SchoolTags:
+        """
+        获取院校标签位图(每个数据版本构建一次)
+
+        Returns:
+            SchoolTags: 院校标签位图
+        """
+        return self._get_derived(
+            'school_tags',
+            lambda: SchoolTags(self.load_school_info())
+        )
+
+    def get_major_linker(self) -> MajorLinker:
+        """
+        获取专业跨年份关联表(每个数据版本构建一次,关联结果缓存到磁盘)
+
+        Returns:
+            MajorLinker: 专业关联表
+        """
+        version = self.get_dataset_version()
+        cache_file = self.cache_manager.cache_dir / MajorLinker.cache_file_name(version)
+        return self._get_derived(
+            'major_linker',
+            lambda: MajorLinker(self.load_all_admission_data(), str(cache_file))
+        )
+
+    def get_probability_model(self) -> ProbabilityModel:
+        """
+        获取录取概率曲线模型(每个数据版本加载一次,离线模型文件与数据版本不一致时重新训练)
+
+        Returns:
+            ProbabilityModel: 录取概率模型,训练数据不足时为默认曲线
+        """
+        model_path = self.cache_manager.cache_dir / DEFAULT_MODEL_PATH.name
+        return self._get_derived('probability_model', lambda: load_probability_model(self, model_path))
+
+    def get_candidate_pool(self, year: int = 2025) -> CandidatePool:
+        """
+        获取按位次排序的志愿候选池(每个数据版本构建一次)
+
+        Args:
+            year: 年份
+
+        Returns:
+            CandidatePool: 候选池
+        """
+        return self._get_derived(
+            f'candidate_pool_{year}',
+            lambda: CandidatePool(self.get_data(year), self.load_school_info(), year, self.get_school_tags())
+        )
+
+    def get_score_histogram(self, year: int = 2025) -> ScoreHistogram:
+        """
+        获取分数/位次前缀和直方图(每个数据版本构建一次)
+
+        Args:
+            year: 年份
+
+        Returns:
+            ScoreHistogram: 前缀和直方图
+        """
+        return self._get_derived(
+            f'score_histogram_{year}',
+            lambda: ScoreHistogram(self.get_data(year), year)
+        )
+
+    def get_order_statistics(self, year: int = 2025) -> ScoreOrderStatistics:
+        """
+        获取分数顺序统计结构(每个数据版本构建一次)
+
+        Args:
+            year: 年份
+
+        Returns:
+            ScoreOrderStatistics: 顺序统计结构
+        """
+        return self._get_derived(
+            f'order_statistics_{year}',
+            lambda: ScoreOrderStatistics(self.get_data(year), year)
+        )
+
+    def get_dashboard_cube(self) -> DashboardCube:
+        """
+        获取看板多维聚合立方体(每个数据版本构建一次)
+
+        Returns:
+            DashboardCube: (年份, 省份, 标签, 分数段) 预聚合立方体
+        """
+        return self._get_derived(
+            'dashboard_cube',
+            lambda: DashboardCube(self.load_all_admission_data(), self.get_school_tags())
+        )
+
+    def get_admission_index(self, year: int = 2025) -> AdmissionIndex:
+        """
+        获取 (院校, 专业) 哈希索引(每个数据版本构建一次)
+
+        Args:
+            year: 年份
+
+        Returns:
+            AdmissionIndex: (院校, 专业) 索引
+        """
+        return self._get_derived(
+            f'admission_index_{year}',
+            lambda: AdmissionIndex(self.get_data(year), year, self.get_school_tags())
+        )
+
+    def get_score_rank_table(self) -> ScoreRankTable:
+        """
+        获取分数-位次换算表(每个数据版本构建一次)
+
+        Returns:
+            ScoreRankTable: 按年份的分数-位次换算服务
+        """
+        return self._get_derived(
+            'score_rank_table',
+            # 使用原始投档数据构建(同位分列依赖换算表)
+            lambda: ScoreRankTable(self.multi_year_loader.load_all_years(), self.load_score_segment_tables())
+        )
+
+    def get_school_volatility(self) -> VolatilityTable:
+        """
+        获取院校位次波动指标表(每个数据版本构建一次,院校各年份位次取均值)
+
+        Returns:
+            VolatilityTable: 以院校名称为键的波动指标表
+        """
+        def build() -> VolatilityTable:
+            keys, years, ranks = [], [], []
+            for year, df in self.load_all_admission_data().items():
+                school_col = resolve_column(df, '招生院校', '院校名称', '学校名称')
+                rank_col = resolve_column(df, '位次', '排名')
+                if df is None or df.empty or not school_col or not rank_col:
+                    continue
+                keys.extend(df[school_col].astype(str))
+                years.extend([year] * len(df))
+                ranks.extend(pd.to_numeric(df[rank_col], errors='coerce'))
+            return VolatilityTable.from_records(keys, years, ranks, aggfunc='mean')
+
+        return self._get_derived('school_volatility', build)
+
+    def get_major_volatility(self) -> VolatilityTable:
+        """
+        获取专业位次波动指标表(每个数据版本构建一次,按 major_id 跨年份关联,同年取最小位次)
+
+        Returns:
+            VolatilityTable: 以 major_id 为键的波动指标表
+        """
+        def build() -> VolatilityTable:
+            rows = self.get_major_linker().get_rows()
+            rows = rows[rows['major_id'] >= 0]
+            return VolatilityTable.from_records(rows['major_id'], rows['year'], rows['rank'], aggfunc='min')
+
+        return self._get_derived('major_volatility', build)
+
+    def get_candidate_volatility_rows(self, year: int = 2025) -> np.ndarray:
+        """
+        获取候选池各记录在专业波动指标表中的行号(每个数据版本构建一次)
+
+        Args:
+            year: 年份
+
+        Returns:
+            与候选池记录顺序一致的行号数组,无关联专业为-1
+        """
+        def build() -> np.ndarray:
+            pool = self.get_candidate_pool(year)
+            school_names = [pool.school_names[i] for i in pool.school_idx]
+            major_ids = self.get_major_linker().lookup_ids(school_names, pool.major_names)
+            return self.get_major_volatility().lookup(major_ids)
+
+        return self._get_derived(f'candidate_volatility_rows_{year}', build)
+
     def get_data(self, year: int = 2025) -> pd.DataFrame:
         """
         获取数据（用于分析引擎）
@@ -204,44 +545,10 @@ class DataService:
         Returns:
             DataFrame: 院校数据
         """
-        df = self.get_data(year)
-
-        if df.empty:
-            return pd.DataFrame(columns=['院校名称', '最低分', '最高分', '平均分', '最低位次', '专业数量'])
-
-        # 确定院校列名
-        school_col = None
-        if '招生院校' in df.columns:
-            school_col = '招生院校'
-        elif '院校名称' in df.columns:
-            school_col = '院校名称'
-        elif '学校名称' in df.columns:
-            school_col = '学校名称'
-
-        # 确定专业列名
-        major_col = None
-        if '招生专业' in df.columns:
-            major_col = '招生专业'
-        elif '专业名称' in df.columns:
-            major_col = '专业名称'
-
-        if not school_col or not major_col:
-            return pd.DataFrame(columns=['院校名称', '最低分', '最高分', '平均分', '最低位次', '专业数量'])
-
-        # 聚合院校数据
-        agg_dict = {
-            '投档最低分': ['min', 'max', 'mean'],
-            major_col: 'count'
-        }
-        if '位次' in df.columns:
-            agg_dict['位次'] = 'min'
-
-        uni_groups = df.groupby(school_col).agg(agg_dict).reset_index()
+        if year not in self.multi_year_loader.loaders:
+            return pd.DataFrame(columns=AggregateCube.UNIVERSITY_COLUMNS)
 
-        # 重命名列
-        uni_groups.columns = ['院校名称', '最低分', '最高分', '平均分', '最低位次', '专业数量']
-
-        return uni_groups.sort_values('平均分', ascending=False)
+        return self.get_aggregate_cube().get_university_table(year)
 
     def get_majors(self, year: int = 2025) -> pd.DataFrame:
         """
@@ -253,36 +560,7 @@ class DataService:
         Returns:
             DataFrame: 专业数据
         """
-        df = self.get_data(year)
-
-        if df.empty:
-            return pd.DataFrame(columns=['专业名称', '最低分', '最高分', '平均分', '院校数量'])
-
-        # 确定院校列名
-        school_col = None
-        if '招生院校' in df.columns:
-            school_col = '招生院校'
-        elif '院校名称' in df.columns:
-            school_col = '院校名称'
-        elif '学校名称' in df.columns:
-            school_col = '学校名称'
-
-        # 确定专业列名
-        major_col = None
-        if '招生专业' in df.columns:
-            major_col = '招生专业'
-        elif '专业名称' in df.columns:
-            major_col = '专业名称'
-
-        if not school_col or not major_col:
-            return pd.DataFrame(columns=['专业名称', '最低分', '最高分', '平均分', '院校数量'])
-
-        # 聚合专业数据
-        major_groups = df.groupby(major_col).agg({
-            '投档最低分': ['min', 'max', 'mean'],
-            school_col: 'nunique'
-        }).reset_index()
-
-        # 重命名列
-        major_groups.columns = ['专业名称', '最低分', '最高分', '平均分', '院校数量']
-        return major_groups.sort_values('平均分', ascending=False)
+        if year not in self.multi_year_loader.loaders:
+            return pd.DataFrame(columns=AggregateCube.MAJOR_COLUMNS)
+
+        return self.get_aggregate_cube().get_major_table(year)
@@ -0,0 +1,150 @@
+"""
+图表输出缓存
+按 (图表类型, 规范化筛选条件, 数据版本) 缓存已序列化、已压缩的图表JSON和ETag,
+相同筛选条件的图表请求直接返回缓存字节,无需重新统计和序列化
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+from cachetools import LRUCache
+from .chart_renderer import ChartRenderer
+from .logger import get_logger
+
+
+class CachedChart(NamedTuple):
+    """已序列化的图表输出"""
+    body: bytes
+    gzip_body: bytes
+    etag: str
+    # 完整图表(含布局),用于服务端渲染静态图片
+    figure: Dict[str, Any]
+
+
+class ChartCache:
+    """图表输出缓存"""
+
+    # 各图表类型使用的筛选参数(其余参数不影响输出,不参与缓存键)
+    CHART_FILTERS = {
+        'score_distribution': ('min_score', 'max_score'),
+        'rank_distribution': ('min_rank', 'max_rank'),
+        'top_universities': ('limit', 'min_score', 'max_score'),
+        'top_majors': ('limit', 'min_score', 'max_score'),
+        'score_radar': ('min_score', 'max_score', 'min_rank', 'max_rank'),
+    }
+
+    # 排行图默认数量与上限
+    DEFAULT_LIMIT = 15
+    MAX_LIMIT = 100
+
+    # 最多缓存的图表数量
+    MAX_ENTRIES = 512
+
+    def __init__(self, analytics_engine, data_service, max_entries: int = MAX_ENTRIES):
+        """
+        初始化图表缓存
+
+        Args:
+            analytics_engine: 分析引擎(提供图表的统计数据)
+            data_service: 数据服务(提供数据版本)
+            max_entries: 最多缓存的图表数量
+        """
+        self.analytics_engine = analytics_engine
+        self.data_service = data_service
+        self.renderer = ChartRenderer()
+        self.logger = get_logger("ChartCache")
+        self._cache: LRUCache = LRUCache(maxsize=max_entries)
+        self._lock = threading.Lock()
+
+        self._builders: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            'score_distribution': lambda f: self.renderer.build_score_distribution_figure(
+                self.analytics_engine.get_score_distribution(f['min_score'], f['max_score'])),
+            'rank_distribution': lambda f: self.renderer.build_rank_distribution_figure(
+                self.analytics_engine.get_rank_distribution(f['min_rank'], f['max_rank'])),
+            'top_universities': lambda f: self.renderer.build_top_universities_figure(
+                self.analytics_engine.get_top_universities(f['limit'], f['min_score'], f['max_score'])),
+            'top_majors': lambda f: self.renderer.build_top_majors_figure(
+                self.analytics_engine.get_top_majors(f['limit'], f['min_score'], f['max_score'])),
+            'score_radar': lambda f: self.renderer.build_radar_figure(
+                self.analytics_engine.get_basic_statistics(
+                    f['min_score'], f['max_score'], f['min_rank'], f['max_rank'])),
+        }
+
+    def supports(self, chart_type: str) -> bool:
+        """是否为可缓存的图表类型"""
+        return chart_type in self.CHART_FILTERS
+
+    def normalize_filters(self, chart_type: str, args: Mapping[str, Any]) -> Tuple[Tuple[str, Optional[int]], ...]:
+        """
+        规范化筛选条件: 只保留该图表使用的参数,非整数值视为未指定,排行数量限定在合理范围
+
+        Args:
+            chart_type: 图表类型
+            args: 请求参数
+
+        Returns:
+            (参数名, 值) 元组(可作为缓存键)
+        """
+        filters = []
+        for name in self.CHART_FILTERS.get(chart_type, ()):
+            try:
+                value = int(args.get(name)) if args.get(name) not in (None, '') else None
+            except (TypeError, ValueError):
+                value = None
+            if name == 'limit':
+                value = min(max(value, 1), self.MAX_LIMIT) if value is not None else self.DEFAULT_LIMIT
+            filters.append((name, value))
+        return tuple(filters)
+
+    def get(self, chart_type: str, args: Optional[Mapping[str, Any]] = None) -> Optional[CachedChart]:
+        """
+        获取图表输出(未缓存时生成)
+
+        Args:
+            chart_type: 图表类型
+            args: 请求参数
+
+        Returns:
+            CachedChart,未知图表类型返回None
+        """
+        if not self.supports(chart_type):
+            return None
+        filters = self.normalize_filters(chart_type, args or {})
+        key = (chart_type, filters, self.data_service.get_dataset_version())
+
+        with self._lock:
+            chart = self._cache.get(key)
+        if chart is not None:
+            return chart
+
+        figure = self._builders[chart_type](dict(filters))
+        # 接口只返回 data 部分(布局由前端决定)
+        body = json.dumps(figure['data']).encode('utf-8')
+        chart = CachedChart(body, gzip.compress(body, compresslevel=6), hashlib.md5(body).hexdigest(), figure)
+        with self._lock:
+            self._cache[key] = chart
+        return chart
+
+    def warm_up(self) -> int:
+        """
+        预生成看板默认(无筛选)图表
+
+        Returns:
+            生成的图表数量
+        """
+        count = 0
+        for chart_type in self.CHART_FILTERS:
+            try:
+                self.get(chart_type)
+                count += 1
+            except Exception as e:
+                self.logger.warning(f"预生成图表失败 {chart_type}: {e}")
+        self.logger.info(f"图表预生成完成: {count}个")
+        return count
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._cache.clear()
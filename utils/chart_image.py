@@ -0,0 +1,249 @@
+"""
+图表静态图片渲染
+使用 kaleido 将 Plotly 图表渲染为 PNG/SVG,供导出和低端移动设备直接显示(无需 Plotly JS);
+渲染在有界的进程池中进行,每个工作进程常驻一个 kaleido 渲染器,
+结果按 (图表内容, 格式, 尺寸) 的哈希缓存到磁盘;
+磁盘缓存按文件数和总大小限额,超出时删除最久未使用的图片,数据版本变化时删除旧版本的图片
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from .logger import get_logger
+
+
+# 工作进程内常驻的 kaleido 渲染器
+_scope = None
+
+
+def _init_worker() -> None:
+    """工作进程初始化: 启动 kaleido 渲染器(进程存活期间复用)"""
+    global _scope
+    import plotly
+    from kaleido.scopes.plotly import PlotlyScope
+    # 使用 plotly 包自带的 plotly.js(kaleido 默认从CDN加载,离线服务器不可用)
+    plotlyjs = Path(plotly.__file__).parent / 'package_data' / 'plotly.min.js'
+    _scope = PlotlyScope(plotlyjs=str(plotlyjs) if plotlyjs.exists() else None)
+
+
+def _render_in_worker(figure: Dict[str, Any], fmt: str, width: int, height: int) -> bytes:
+    """在工作进程中渲染图表"""
+    return _scope.transform(figure, format=fmt, width=width, height=height)
+
+
+class ChartImageRenderer:
+    """图表静态图片渲染器"""
+
+    # 支持的图片格式及其MIME类型
+    FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+    # 默认尺寸与尺寸范围
+    DEFAULT_WIDTH = 800
+    DEFAULT_HEIGHT = 500
+    MIN_SIZE = 200
+    MAX_SIZE = 2000
+
+    # 工作进程数、排队上限和单次渲染超时(秒)
+    MAX_WORKERS = 2
+    MAX_PENDING = 8
+    RENDER_TIMEOUT = 30
+
+    # 磁盘缓存的文件数和总大小上限
+    MAX_CACHE_FILES = 500
+    MAX_CACHE_BYTES = 200 * 1024 * 1024
+
+    def __init__(self, cache_dir: str = "cache/chart_images", max_workers: int = MAX_WORKERS,
+                 max_pending: int = MAX_PENDING, max_files: int = MAX_CACHE_FILES,
+                 max_bytes: int = MAX_CACHE_BYTES):
+        """
+        初始化渲染器(进程池在首次渲染时启动)
+
+        Args:
+            cache_dir: 图片缓存目录
+            max_workers: 工作进程数
+            max_pending: 同时渲染或排队的最大请求数
+            max_files: 磁盘缓存文件数上限
+            max_bytes: 磁盘缓存总字节数上限
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max_workers
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.logger = get_logger("ChartImageRenderer")
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    @property
+    def available(self) -> bool:
+        """kaleido 是否可用"""
+        return importlib.util.find_spec('kaleido') is not None
+
+    def clamp_size(self, value: Optional[int], default: int) -> int:
+        """将图片尺寸限定在允许范围内"""
+        if value is None:
+            return default
+        return min(max(int(value), self.MIN_SIZE), self.MAX_SIZE)
+
+    @staticmethod
+    def image_key(figure: Dict[str, Any], fmt: str, width: int, height: int) -> str:
+        """
+        计算图片缓存键(图表内容与渲染参数的哈希)
+
+        Args:
+            figure: Plotly图表
+            fmt: 图片格式
+            width: 宽度
+            height: 高度
+
+        Returns:
+            十六进制哈希
+        """
+        payload = json.dumps([figure, fmt, width, height], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def resolve(self, figure: Dict[str, Any], fmt: str, width: Optional[int] = None,
+                height: Optional[int] = None) -> Tuple[str, int, int]:
+        """
+        限定尺寸并计算图片缓存键(无需渲染,可用于条件请求)
+
+        Args:
+            figure: Plotly图表
+            fmt: 图片格式
+            width: 宽度(像素)
+            height: 高度(像素)
+
+        Returns:
+            (缓存键, 宽度, 高度)
+        """
+        width = self.clamp_size(width, self.DEFAULT_WIDTH)
+        height = self.clamp_size(height, self.DEFAULT_HEIGHT)
+        return self.image_key(figure, fmt, width, height), width, height
+
+    def cache_path(self, key: str, fmt: str, version: Optional[str] = None) -> Path:
+        """图片缓存文件路径(文件名带数据版本前缀)"""
+        return self.cache_dir / (f"{version}_{key}.{fmt}" if version else f"{key}.{fmt}")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """获取进程池(首次调用时启动)"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+                self.logger.info(f"图表渲染进程池已启动: {self.max_workers}个进程")
+            return self._executor
+
+    def _reset_executor(self, broken: ProcessPoolExecutor) -> None:
+        """丢弃异常退出的进程池(其他线程已重建时不重复处理)"""
+        with self._executor_lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _render(self, figure: Dict[str, Any], fmt: str, width: int, height: int) -> bytes:
+        """在进程池中渲染;工作进程异常退出导致进程池损坏时重建进程池并重试一次"""
+        executor = self._get_executor()
+        try:
+            return executor.submit(_render_in_worker, figure, fmt, width, height).result(timeout=self.RENDER_TIMEOUT)
+        except BrokenProcessPool:
+            self.logger.warning("图表渲染进程池异常退出,重建后重试")
+            self._reset_executor(executor)
+            executor = self._get_executor()
+            return executor.submit(_render_in_worker, figure, fmt, width, height).result(timeout=self.RENDER_TIMEOUT)
+
+    def render(self, figure: Dict[str, Any], fmt: str = 'png', width: Optional[int] = None,
+               height: Optional[int] = None, version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        渲染图表为静态图片(命中磁盘缓存时直接读取)
+
+        Args:
+            figure: Plotly图表(data 与 layout)
+            fmt: 图片格式(png / svg)
+            width: 宽度(像素)
+            height: 高度(像素)
+            version: 数据版本(写入缓存时删除其他版本的图片)
+
+        Returns:
+            {'content', 'mimetype', 'key'}
+        """
+        if fmt not in self.FORMATS:
+            raise ValueError(f"不支持的图片格式: {fmt}")
+        if not self.available:
+            raise RuntimeError("kaleido 未安装,无法渲染静态图片")
+
+        key, width, height = self.resolve(figure, fmt, width, height)
+        path = self.cache_path(key, fmt, version)
+
+        content = self._read_cache(path)
+        if content is None:
+            if not self._slots.acquire(timeout=self.RENDER_TIMEOUT):
+                raise RuntimeError("图表渲染繁忙,请稍后重试")
+            try:
+                content = self._render(figure, fmt, width, height)
+            finally:
+                self._slots.release()
+            self._write_cache(path, content)
+            self._prune_cache(path, version)
+
+        return {'content': content, 'mimetype': self.FORMATS[fmt], 'key': key}
+
+    def _read_cache(self, path: Path) -> Optional[bytes]:
+        """读取磁盘缓存并刷新修改时间(按最近使用淘汰),不存在时返回None"""
+        try:
+            content = path.read_bytes()
+            os.utime(path)
+            return content
+        except OSError:
+            return None
+
+    def _write_cache(self, path: Path, content: bytes) -> None:
+        """写入磁盘缓存(先写临时文件再替换,避免并发读到不完整的文件)"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"写入图片缓存失败: {e}")
+
+    def _prune_cache(self, current: Path, version: Optional[str] = None) -> None:
+        """删除其他数据版本的图片,并按最近使用时间淘汰超出文件数或总大小上限的图片"""
+        entries = []
+        for path in self.cache_dir.glob('*.*'):
+            if path == current or path.suffix[1:] not in self.FORMATS:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+
+        stale = [path for path, _, _ in entries if version and not path.name.startswith(f"{version}_")]
+        kept = sorted((e for e in entries if e[0] not in stale), key=lambda e: e[1], reverse=True)
+        total = current.stat().st_size if current.exists() else 0
+        for count, (path, _, size) in enumerate(kept, start=1):
+            total += size
+            if count >= self.max_files or total > self.max_bytes:
+                stale.append(path)
+
+        for path in stale:
+            try:
+                path.unlink()
+            except OSError as e:
+                self.logger.warning(f"删除图片缓存失败: {e}")
+        if stale:
+            self.logger.info(f"删除图片缓存: {len(stale)}个")
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -42,7 +42,7 @@ class ChartRenderer:
             self.logger.error(f"生成图表失败: {e}")
             return json.dumps({})
 
-    def generate_score_distribution_chart(self, data: Dict[str, Any]) -> str:
+    def build_score_distribution_figure(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成分数分布柱状图
 
@@ -50,7 +50,7 @@ class ChartRenderer:
             data: 分数分布数据
 
         Returns:
-            图表JSON配置
+            Plotly图表(data 与 layout)
         """
         ranges = data.get('ranges', [])
         scores = data.get('scores', [])
@@ -77,9 +77,9 @@ class ChartRenderer:
             'margin': {'l': 50, 'r': 20, 't': 50, 'b': 60}
         }
 
-        return json.dumps(chart_data)
+        return {'data': chart_data, 'layout': layout}
 
-    def generate_rank_distribution_chart(self, data: Dict[str, Any]) -> str:
+    def build_rank_distribution_figure(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成位次分布柱状图
 
@@ -87,7 +87,7 @@ class ChartRenderer:
             data: 位次分布数据
 
         Returns:
-            图表JSON配置
+            Plotly图表(data 与 layout)
         """
         ranges = data.get('ranges', [])
         counts = data.get('counts', [])
@@ -114,9 +114,9 @@ class ChartRenderer:
             'margin': {'l': 50, 'r': 20, 't': 50, 'b': 60}
         }
 
-        return json.dumps(chart_data)
+        return {'data': chart_data, 'layout': layout}
 
-    def generate_top_universities_chart(self, data: List[Dict[str, Any]]) -> str:
+    def build_top_universities_figure(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         生成热门院校排行柱状图
 
@@ -124,11 +124,11 @@ class ChartRenderer:
             data: 院校数据列表
 
         Returns:
-            图表JSON配置
+            Plotly图表(data 与 layout)
         """
         if not data:
             # 返回空图表
-            return json.dumps([])
+            return {'data': [], 'layout': {}}
 
         names = [item.get('name', '') for item in data]
         avg_scores = [item.get('avg_score', 0) for item in data]
@@ -154,9 +154,9 @@ class ChartRenderer:
             'margin': {'l': 50, 'r': 20, 't': 50, 'b': 100}
         }
 
-        return json.dumps(chart_data)
+        return {'data': chart_data, 'layout': layout}
 
-    def generate_top_majors_chart(self, data: List[Dict[str, Any]]) -> str:
+    def build_top_majors_figure(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         生成热门专业排行柱状图
 
@@ -164,11 +164,11 @@ class ChartRenderer:
             data: 专业数据列表
 
         Returns:
-            图表JSON配置
+            Plotly图表(data 与 layout)
         """
         if not data:
             # 返回空图表
-            return json.dumps([])
+            return {'data': [], 'layout': {}}
 
         names = [item.get('name', '') for item in data]
         avg_scores = [item.get('avg_score', 0) for item in data]
@@ -194,9 +194,9 @@ class ChartRenderer:
             'margin': {'l': 50, 'r': 20, 't': 50, 'b': 100}
         }
 
-        return json.dumps(chart_data)
+        return {'data': chart_data, 'layout': layout}
 
-    def generate_radar_chart(self, data: Dict[str, Any]) -> str:
+    def build_radar_figure(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         生成分数分布雷达图
 
@@ -204,7 +204,7 @@ class ChartRenderer:
             data: 基础统计数据
 
         Returns:
-            图表JSON配置
+            Plotly图表(data 与 layout)
         """
         score_range = data.get('score_range', {})
         min_score = score_range.get('min', 0)
@@ -250,4 +250,24 @@ class ChartRenderer:
             'margin': {'l': 50, 'r': 50, 't': 50, 'b': 50}
         }
 
-        return json.dumps(chart_data)
+        return {'data': chart_data, 'layout': layout}
+
+    def generate_score_distribution_chart(self, data: Dict[str, Any]) -> str:
+        """生成分数分布柱状图(返回 data 部分的JSON,布局由前端决定)"""
+        return json.dumps(self.build_score_distribution_figure(data)['data'])
+
+    def generate_rank_distribution_chart(self, data: Dict[str, Any]) -> str:
+        """生成位次分布柱状图(返回 data 部分的JSON)"""
+        return json.dumps(self.build_rank_distribution_figure(data)['data'])
+
+    def generate_top_universities_chart(self, data: List[Dict[str, Any]]) -> str:
+        """生成热门院校排行柱状图(返回 data 部分的JSON)"""
+        return json.dumps(self.build_top_universities_figure(data)['data'])
+
+    def generate_top_majors_chart(self, data: List[Dict[str, Any]]) -> str:
+        """生成热门专业排行柱状图(返回 data 部分的JSON)"""
+        return json.dumps(self.build_top_majors_figure(data)['data'])
+
+    def generate_radar_chart(self, data: Dict[str, Any]) -> str:
+        """生成分数分布雷达图(返回 data 部分的JSON)"""
+        return json.dumps(self.build_radar_figure(data)['data'])
@@ -2,6 +2,7 @@
 测试配置和共享fixtures
 """
 import pytest
+import pandas as pd
 import os
 import sys
 from pathlib import Path
@@ -63,3 +64,23 @@ def sample_school_data():
         "is_211": True,
         "is_double_first_class": True
     }
+
+
+@pytest.fixture
+def candidate_pool():
+    """示例志愿候选池(按位次排序的2025年投档数据)"""
+    from core.data.candidate_pool import CandidatePool
+
+    admission = pd.DataFrame({
+        "院校名称": ["浙江大学", "浙江大学", "复旦大学", "宁波大学", "宁波大学"],
+        "招生专业": ["计算机科学与技术", "临床医学", "软件工程", "计算机类", "会计学"],
+        "投档最低分": [670, 665, 675, 600, 590],
+        "位次": [1200, 1500, 800, 20000, 25000],
+    })
+    school_info = pd.DataFrame({
+        "学校名称": ["浙江大学", "复旦大学", "宁波大学"],
+        "所在区域": ["浙江", "上海", "浙江"],
+        "985": ["Y", "Y", None],
+        "双一流": ["Y", "Y", "Y"],
+    })
+    return CandidatePool(admission, school_info)
@@ -0,0 +1,26 @@
+"""
+院校专业索引单元测试
+"""
+import numpy as np
+import pandas as pd
+from core.data.admission_index import AdmissionIndex
+
+
+class TestAdmissionIndex:
+    """测试 (院校, 专业) 哈希索引"""
+
+    def test_lookup(self):
+        """测试批量定位、同名专业取均值和未找到的目标"""
+        df = pd.DataFrame({
+            '院校名称': ['甲大学', '甲大学', '甲大学', '乙大学'],
+            '招生专业': ['数学', '数学', '物理', '数学'],
+            '投档最低分': [600, 610, 590, 550],
+            '位次': [10000, 9000, None, 30000]
+        })
+        index = AdmissionIndex(df)
+
+        positions = index.lookup(['乙大学', '甲大学', '甲大学', '乙大学', '丙大学'],
+                                 ['数学', '数学', '物理', '物理', '数学'])
+        assert list(positions[3:]) == [-1, -1]
+        assert index.scores[positions[:3]].tolist() == [550, 605, 590]
+        assert index.ranks[positions[1]] == 9500 and np.isnan(index.ranks[positions[2]])
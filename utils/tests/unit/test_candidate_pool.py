@@ -0,0 +1,44 @@
+"""
+志愿候选池单元测试
+"""
+import numpy as np
+
+
+class TestCandidatePool:
+    """测试候选池排序、位次窗口和专业索引"""
+
+    def test_sorted_by_rank(self, candidate_pool):
+        """测试按位次排序并支持二分切片"""
+        assert list(candidate_pool.ranks) == [800, 1200, 1500, 20000, 25000]
+        assert candidate_pool.rank_range(1000, 1500) == (1, 3)
+
+    def test_adaptive_rank_window(self, candidate_pool):
+        """测试按位次密度缩放推荐窗口"""
+        min_rank, max_rank = candidate_pool.adaptive_rank_window(1300, 3)
+        start, end = candidate_pool.rank_range(min_rank, max_rank)
+        assert end - start == 3
+        assert min_rank < 1100 and max_rank > 1400
+
+        min_rank, max_rank = candidate_pool.adaptive_rank_window(1250, 1)
+        assert min_rank > 1050 and max_rank < 1350
+
+    def test_major_mask(self, candidate_pool):
+        """测试专业 n-gram 索引匹配"""
+        assert list(candidate_pool.major_mask(["计算机"])) == [False, True, False, True, False]
+        assert list(candidate_pool.major_mask(["工程", "会计"])) == [True, False, False, False, True]
+        assert not candidate_pool.major_mask(["计算工程"]).any()
+
+    def test_filtered_rank_window(self, candidate_pool):
+        """测试按满足筛选条件的记录数确定窗口,严格筛选时窗口放宽到覆盖足够的记录"""
+        # 仅宁波大学的两条记录满足条件,位于学生位次之后很远
+        mask = candidate_pool.school_idx == candidate_pool.school_names.index("宁波大学")
+        unfiltered = candidate_pool.adaptive_rank_window(1300, 2)
+
+        min_rank, max_rank = candidate_pool.adaptive_rank_window(1300, 2, mask)
+        start, end = candidate_pool.rank_range(min_rank, max_rank)
+        assert mask[start:end].sum() == 2
+        assert max_rank >= 25000 > unfiltered[1]
+
+        # 全部记录都不满足时窗口覆盖整个候选池
+        min_rank, max_rank = candidate_pool.adaptive_rank_window(1300, 1, np.zeros(len(candidate_pool), dtype=bool))
+        assert candidate_pool.rank_range(min_rank, max_rank) == (0, len(candidate_pool))
@@ -0,0 +1,44 @@
+"""
+图表输出缓存单元测试
+"""
+import gzip
+import json
+from utils.chart_cache import ChartCache
+
+
+class TestChartCache:
+    """测试图表输出缓存"""
+
+    class FakeEngine:
+        """记录调用次数的分析引擎"""
+
+        def __init__(self):
+            self.calls = 0
+
+        def get_top_majors(self, limit, min_score, max_score):
+            self.calls += 1
+            return [{'name': f'专业{i}', 'avg_score': 600 - i} for i in range(limit)]
+
+    class FakeService:
+        """可切换数据版本的数据服务"""
+
+        version = 'v1'
+
+        def get_dataset_version(self):
+            return self.version
+
+    def test_cache_key(self):
+        """测试无关参数不影响缓存键,数据版本变化时重新生成"""
+        engine, service = self.FakeEngine(), self.FakeService()
+        cache = ChartCache(engine, service)
+
+        first = cache.get('top_majors', {'limit': '5', 'min_rank': '100'})
+        second = cache.get('top_majors', {'limit': '5', 'max_rank': 'abc'})
+        assert first is second and engine.calls == 1
+        assert len(json.loads(first.body)[0]['x']) == 5
+        assert gzip.decompress(first.gzip_body) == first.body
+
+        service.version = 'v2'
+        assert cache.get('top_majors', {'limit': '5'}).etag == first.etag
+        assert engine.calls == 2
+        assert cache.get('unknown') is None
@@ -0,0 +1,79 @@
+"""
+图表静态图片渲染单元测试
+"""
+import os
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from utils.chart_image import ChartImageRenderer
+
+
+class TestChartImageRenderer:
+    """测试图表静态图片渲染器"""
+
+    def test_image_key(self, tmp_path):
+        """测试图片缓存键随图表内容和渲染参数变化,尺寸限定在允许范围内"""
+        renderer = ChartImageRenderer(cache_dir=str(tmp_path))
+        figure = {'data': [{'type': 'bar', 'x': ['甲'], 'y': [1]}], 'layout': {}}
+
+        key = renderer.image_key(figure, 'png', 800, 500)
+        assert key == renderer.image_key({'layout': {}, 'data': figure['data']}, 'png', 800, 500)
+        assert key != renderer.image_key(figure, 'svg', 800, 500)
+        assert renderer.clamp_size(5000, 800) == renderer.MAX_SIZE
+        assert renderer.clamp_size(None, 800) == 800
+        with pytest.raises(ValueError):
+            renderer.render(figure, 'gif')
+
+    def test_prune_cache(self, tmp_path):
+        """测试磁盘缓存删除其他数据版本的图片,并按最近使用时间淘汰超出上限的图片"""
+        renderer = ChartImageRenderer(cache_dir=str(tmp_path), max_files=3, max_bytes=10 ** 6)
+        (tmp_path / 'v1_old.png').write_bytes(b'x')
+        for i, name in enumerate(['v2_a.png', 'v2_b.png', 'v2_c.svg']):
+            path = tmp_path / name
+            path.write_bytes(b'x')
+            os.utime(path, (i, i))
+        # 读取命中时刷新使用时间
+        assert renderer._read_cache(tmp_path / 'v2_a.png') == b'x'
+
+        current = renderer.cache_path('d', 'png', 'v2')
+        current.write_bytes(b'x')
+        renderer._prune_cache(current, 'v2')
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['v2_a.png', 'v2_c.svg', 'v2_d.png']
+
+        renderer.max_bytes = 2
+        renderer._prune_cache(current, 'v2')
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['v2_a.png', 'v2_d.png']
+
+    def test_broken_pool_retry(self, tmp_path, monkeypatch):
+        """测试工作进程异常退出时重建进程池并重试一次"""
+        class FakeFuture:
+            def __init__(self, error=None):
+                self.error = error
+
+            def result(self, timeout=None):
+                if self.error:
+                    raise self.error
+                return b'image'
+
+        class FakeExecutor:
+            def __init__(self, broken):
+                self.broken = broken
+                self.closed = False
+
+            def submit(self, *args):
+                return FakeFuture(BrokenProcessPool() if self.broken else None)
+
+            def shutdown(self, wait=True, cancel_futures=False):
+                self.closed = True
+
+        renderer = ChartImageRenderer(cache_dir=str(tmp_path))
+        broken = FakeExecutor(True)
+        executors = [broken, FakeExecutor(False)]
+
+        def get_executor():
+            if renderer._executor is None:
+                renderer._executor = executors.pop(0)
+            return renderer._executor
+
+        monkeypatch.setattr(renderer, '_get_executor', get_executor)
+        assert renderer._render({}, 'png', 800, 500) == b'image'
+        assert broken.closed and not executors
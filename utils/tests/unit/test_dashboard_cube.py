@@ -0,0 +1,51 @@
+"""
+看板聚合立方体单元测试
+"""
+import pytest
+import pandas as pd
+from core.data.dashboard_cube import DashboardCube
+from core.data.school_tags import SchoolTags
+
+
+class TestDashboardCube:
+    """测试看板多维聚合立方体"""
+
+    @pytest.fixture
+    def cube(self):
+        """创建两个年份的立方体"""
+        school_info = pd.DataFrame({
+            "学校名称": ["浙江大学", "复旦大学", "宁波大学"],
+            "所在区域": ["浙江", "上海", "浙江"],
+            "985": ["Y", "Y", None],
+        })
+        years_data = {
+            2024: pd.DataFrame({
+                "院校名称": ["浙江大学", "复旦大学", "宁波大学"],
+                "投档最低分": [660, 670, 590],
+                "位次": [1500, 900, 24000],
+            }),
+            2025: pd.DataFrame({
+                "院校名称": ["浙江大学", "浙江大学", "宁波大学", "某学院"],
+                "投档最低分": [665, 650, 600, 520],
+                "位次": [1200, 2500, 20000, 60000],
+            }),
+        }
+        return DashboardCube(years_data, SchoolTags(school_info))
+
+    def test_rollup(self, cube):
+        """测试按年份上卷与全量汇总"""
+        total = cube.query()[0]
+        assert total['count'] == 7 and total['min_score'] == 520 and total['max_rank'] == 60000
+
+        by_year = {g['key']: g for g in cube.query('year')}
+        assert by_year[2025]['count'] == 4
+        assert by_year[2024]['avg_score'] == round((660 + 670 + 590) / 3, 2)
+
+    def test_slice(self, cube):
+        """测试省份、标签、位次组合筛选"""
+        groups = cube.query('province', is_985=True, max_rank=2000)
+        assert [(g['key'], g['count']) for g in groups] == [('上海', 1), ('浙江', 2)]
+
+        groups = cube.query('score', years=[2025], min_score=600, score_bucket=50)
+        assert [(g['key'], g['count']) for g in groups] == [(600, 1), (650, 2)]
+        assert cube.query(provinces=['未知'])[0]['count'] == 1
@@ -0,0 +1,59 @@
+"""
+数据服务单元测试
+"""
+import pytest
+
+from core.data.cache_manager import CacheManager
+from services.data_service import DataService
+
+
+class TestDerivedData:
+    """测试按数据版本缓存的派生结构"""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        service = DataService(CacheManager(maxsize=10, ttl=1))
+        service.version = 'v1'
+        monkeypatch.setattr(service, 'get_dataset_version', lambda: service.version)
+        return service
+
+    def test_built_once_per_version(self, service):
+        """同一数据版本只构建一次,版本变化后重新构建"""
+        calls = []
+
+        def build():
+            calls.append(service.version)
+            return len(calls)
+
+        assert service._get_derived('cube', build) == 1
+        assert service._get_derived('cube', build) == 1
+        # 共享缓存被清空不影响派生结构
+        service.cache_manager.clear()
+        assert service._get_derived('cube', build) == 1
+        assert calls == ['v1']
+
+        service.version = 'v2'
+        assert service._get_derived('cube', build) == 2
+        assert service._get_derived('cube', build) == 2
+        assert calls == ['v1', 'v2']
+
+    def test_old_version_released(self, service):
+        """版本变化时旧版本的派生结构被释放"""
+        service._get_derived('a', lambda: 'a1')
+        service._get_derived('b', lambda: 'b1')
+        service.version = 'v2'
+        service._get_derived('a', lambda: 'a2')
+        assert service._derived == {'a': 'a2'}
+
+    def test_probability_model(self, service, monkeypatch):
+        """测试录取概率模型按数据版本加载一次,模型文件放在缓存目录"""
+        calls = []
+
+        def load(data_service, model_path):
+            calls.append((data_service.version, model_path))
+            return object()
+
+        monkeypatch.setattr('services.data_service.load_probability_model', load)
+        model = service.get_probability_model()
+        assert service.get_probability_model() is model
+        assert calls == [('v1', service.cache_manager.cache_dir / 'admission_model.json')]
@@ -0,0 +1,67 @@
+"""
+专业跨年份关联表单元测试
+"""
+import pytest
+import pandas as pd
+from core.data.major_linker import MajorLinker, parse_major_name
+
+
+class TestMajorLinker:
+    """测试专业跨年份关联表"""
+
+    @pytest.fixture
+    def years_data(self):
+        """示例多年份数据"""
+        return {
+            2024: pd.DataFrame({
+                "院校编号": ["0001", "0001", "0001", "0001"],
+                "院校名称": ["北京大学", "北京大学", "北京大学", "北京大学"],
+                "专业编号": ["01", "02", "03", "04"],
+                "招生专业": ["数学类", "工程管理", "口腔医学(五年制)", "电子信息工程"],
+                "位次": [100, 500, 300, 400],
+            }),
+            2025: pd.DataFrame({
+                "院校编号": ["0001", "0001", "0001", "0001"],
+                "院校名称": ["北京大学", "北京大学", "北京大学", "北京大学"],
+                "专业编号": ["05", "06", "03", "07"],
+                "招生专业": ["数学类", "工程管理", "口腔医学（八年制）", "电子信息科学与技术"],
+                "位次": [90, 520, 280, 410],
+            }),
+        }
+
+    def test_parse_major_name(self):
+        """测试括号内容解析"""
+        base, qualifiers = parse_major_name("数学类(数学与应用数学、统计学)[师范]")
+
+        assert base == "数学类"
+        assert qualifiers == {"数学与应用数学", "统计学", "师范"}
+
+    def test_link_across_years(self, years_data):
+        """测试按名称关联及按相似度衔接改名专业"""
+        linker = MajorLinker(years_data)
+
+        assert linker.get_major_id(2024, "0001", "01") == linker.get_major_id(2025, "0001", "05")
+        assert linker.get_major_id(2024, "0001", "03") == linker.get_major_id(2025, "0001", "03")
+        assert linker.get_major_id(2024, "0001", "04") != linker.get_major_id(2025, "0001", "07")
+
+    def test_find_major_ids(self, years_data):
+        """测试按名称查找不做子串匹配"""
+        linker = MajorLinker(years_data)
+
+        assert linker.find_major_ids("工程管理") == [linker.get_major_id(2025, "0001", "06")]
+        assert linker.find_major_ids("口腔医学") == [linker.get_major_id(2025, "0001", "03")]
+        assert linker.find_major_ids("管理") == []
+
+    def test_link_cache(self, years_data, tmp_path):
+        """测试磁盘缓存按格式版本命名并清理旧文件"""
+        stale = [tmp_path / "major_links_oldversion.csv", tmp_path / "major_links_v0_abc.csv"]
+        for path in stale:
+            path.write_text("year,school_code,major_code,major_id\n")
+        cache_file = tmp_path / MajorLinker.cache_file_name("abc")
+
+        linker = MajorLinker(years_data, str(cache_file))
+        assert cache_file.name == f"major_links_v{MajorLinker.LINK_FORMAT_VERSION}_abc.csv"
+        assert sorted(tmp_path.iterdir()) == [cache_file]
+
+        cached = MajorLinker(years_data, str(cache_file))
+        assert cached.get_major_id(2025, "0001", "05") == linker.get_major_id(2025, "0001", "05")
@@ -0,0 +1,39 @@
+"""
+分数顺序统计单元测试
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from core.data.order_statistics import ScoreOrderStatistics
+
+
+class TestScoreOrderStatistics:
+    """测试分数顺序统计"""
+
+    @pytest.fixture
+    def stats(self):
+        """创建顺序统计实例"""
+        admission = pd.DataFrame({
+            "院校名称": ["甲大学", "甲大学", "乙大学", "丙大学", "丙大学", "丁大学"],
+            "招生专业": ["法学", "医学", "法学", "工学", "理学", "文学"],
+            "投档最低分": [650, 650, 620, 600, 580, 550],
+            "位次": [3000, 3000, 6000, 9000, 12000, 18000],
+        })
+        return ScoreOrderStatistics(admission)
+
+    def test_slice_summary(self, stats):
+        """测试分数/位次区间切片的统计与 NumPy 一致"""
+        start, end = stats.slice_range(min_score=560, max_rank=10000)
+        summary = stats.summary(start, end, [25, 75])
+        expected = np.array([600, 620, 650, 650])
+
+        assert summary['count'] == 4
+        assert summary['universities_count'] == 3 and summary['majors_count'] == 3
+        assert summary['median'] == np.median(expected)
+        assert summary['mean'] == expected.mean()
+        assert summary['percentiles'] == {'p25': np.percentile(expected, 25), 'p75': np.percentile(expected, 75)}
+
+    def test_non_monotone_rank(self):
+        """测试位次不随分数单调时不可按位次切片"""
+        stats = ScoreOrderStatistics(pd.DataFrame({"投档最低分": [600, 590], "位次": [9000, 8000]}))
+        assert not stats.sliceable
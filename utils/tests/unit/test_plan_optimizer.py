@@ -0,0 +1,27 @@
+"""
+志愿方案优化单元测试
+"""
+import numpy as np
+from core.analytics.plan_optimizer import PlanOptimizer
+
+
+class TestPlanOptimizer:
+    """测试志愿方案优化"""
+
+    def test_quotas_and_caps(self):
+        """测试冲稳保名额、每校上限和最少保底数量"""
+        rng = np.random.default_rng(0)
+        n = 400
+        probabilities = rng.uniform(5, 99, n)
+        utilities = rng.uniform(0, 100, n)
+        school_ids = rng.integers(0, 40, n)
+        optimizer = PlanOptimizer({'total': 30, 'min_safe': 12, 'max_per_school': 2})
+
+        plan = optimizer.optimize(probabilities, utilities, school_ids,
+                                  np.zeros(n, dtype=int), np.arange(n))
+        selected = plan['selected']
+
+        assert len(selected) == 30
+        assert plan['summary']['category_counts'] == {'冲刺': 9, '稳健': 9, '保底': 12}
+        assert np.bincount(school_ids[selected]).max() <= 2
+        assert plan['categories'] == sorted(plan['categories'], key=PlanOptimizer.CATEGORIES.index)
@@ -0,0 +1,63 @@
+"""
+位次预测单元测试
+"""
+import pytest
+import numpy as np
+from core.analytics.prediction import RankPredictor
+
+
+class TestRankPredictor:
+    """测试批量位次预测器"""
+
+    @pytest.fixture
+    def predictor(self):
+        """创建预测器实例"""
+        keys = ["北京大学", "清华大学", "浙江大学", "新建学院"]
+        matrix = np.array([
+            [100, 120, 110],
+            [np.nan, 200, 180],
+            [300, 300, 300],
+            [np.nan, np.nan, 5000],
+        ])
+        return RankPredictor(keys, [2023, 2024, 2025], matrix)
+
+    def test_weighted_prediction(self, predictor):
+        """测试三年加权移动平均"""
+        result = predictor.get("北京大学")
+
+        assert result["predicted_rank"] == round((100 * 3 + 120 * 2 + 110 * 1) / 6)
+        assert result["confidence"] == "high"
+        assert result["trend"] == -1
+
+    def test_two_year_interval(self, predictor):
+        """测试两年数据的置信区间"""
+        result = predictor.get("清华大学")
+
+        predicted = (200 * 2 + 180 * 1) / 3
+        assert result["confidence"] == "medium"
+        assert result["confidence_interval"] == [round(predicted - 20), round(predicted + 20)]
+
+    def test_stable_trend(self, predictor):
+        """测试位次不变时的趋势"""
+        result = predictor.get("浙江大学")
+
+        assert result["trend"] == 0
+        assert result["confidence_interval"] == [300, 300]
+
+    def test_insufficient_data(self, predictor):
+        """测试数据不足时不返回预测"""
+        assert predictor.get("新建学院") is None
+        assert predictor.get("不存在的学校") is None
+
+    def test_rank_order(self, predictor):
+        """测试按最近一年位次排序"""
+        assert predictor.rank_order(2025) == ["北京大学", "清华大学", "浙江大学"]
+
+    def test_predicted_score(self, predictor):
+        """测试预测结果附带同位分"""
+        assert "predicted_score" not in predictor.get("浙江大学")
+
+        keys = ["浙江大学"]
+        scored = RankPredictor(keys, [2023, 2024, 2025], np.array([[300, 300, 300]]),
+                               rank_to_score=lambda ranks: 700 - ranks / 100)
+        assert scored.get("浙江大学")["predicted_score"] == 697
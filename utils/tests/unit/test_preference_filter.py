@@ -0,0 +1,16 @@
+"""
+偏好过滤单元测试
+"""
+import numpy as np
+from core.analytics.preference_filter import PreferenceFilter
+
+
+class TestPreferenceFilter:
+    """测试偏好编译为候选掩码"""
+
+    def test_preference_filter(self, candidate_pool):
+        """测试偏好编译为掩码"""
+        pref_filter = PreferenceFilter(candidate_pool, {"locations": ["浙江"], "school_types": ["985"]})
+
+        assert list(pref_filter.row_mask(0, len(candidate_pool))) == [False, True, True, False, False]
+        assert np.array_equal(PreferenceFilter(candidate_pool).row_mask(0, len(candidate_pool)), np.ones(len(candidate_pool), dtype=bool))
@@ -0,0 +1,85 @@
+"""
+录取概率曲线单元测试
+"""
+import pytest
+import numpy as np
+from core.analytics import probability_model
+from core.analytics.probability_model import ProbabilityModel, load_probability_model
+
+
+class TestProbabilityModel:
+    """测试分位次段录取概率曲线"""
+
+    @pytest.fixture
+    def model(self):
+        """在模拟的相邻年份录取位次上拟合曲线"""
+        rng = np.random.default_rng(0)
+        reference = rng.uniform(500, 80000, 3000)
+        following = reference * np.exp(rng.normal(0.05, 0.1, 3000))
+        return ProbabilityModel.fit(reference, following)
+
+    def test_calibrated(self, model):
+        """测试曲线单调且与模拟的位次变化分布一致"""
+        probabilities = model.predict_ranks(10000, np.array([8000, 9000, 10000, 11000, 12000]))
+
+        assert np.all(np.diff(probabilities) > 0)
+        # 录取位次平均后移约5%,学生位次与参考位次相同时录取概率约70%
+        assert 0.6 < probabilities[2] < 0.8
+        assert model.metadata['metrics']['calibration_error'] < 0.05
+
+    def test_volatility(self, model):
+        """测试专业自身波动越大,概率越接近50%"""
+        stable, volatile = model.predict(np.array([0.2, 0.2]), np.array([0.05, 0.5]), np.array([10000, 10000]))
+
+        assert stable > volatile > 0.5
+
+    def test_default(self):
+        """测试样本不足时使用默认曲线"""
+        model = ProbabilityModel.fit(np.array([1000.0]), np.array([1100.0]))
+
+        assert not model.metadata['fitted']
+        assert model.predict_ranks(5000, 5000)[()] == pytest.approx(0.5)
+
+    def test_save_load(self, model, tmp_path):
+        """测试模型文件保存后加载的曲线一致"""
+        path = tmp_path / 'model.json'
+        model.save(path)
+        loaded = ProbabilityModel.load(path)
+
+        ranks = np.array([800.0, 5000.0, 20000.0, 70000.0])
+        np.testing.assert_allclose(loaded.predict_ranks(ranks * 1.1, ranks), model.predict_ranks(ranks * 1.1, ranks))
+        assert loaded.metadata == model.metadata
+
+        # 位次分段不一致的旧文件不使用
+        data = model.to_dict()
+        data['rank_bands'] = [1000]
+        assert ProbabilityModel.from_dict(data) is None
+        assert ProbabilityModel.load(tmp_path / 'missing.json') is None
+
+    def test_load_checks_data_version(self, model, tmp_path, monkeypatch):
+        """测试模型文件与数据版本一致时直接加载,否则重新训练并保存"""
+        class FakeService:
+            version = 'v1'
+
+            def get_dataset_version(self):
+                return self.version
+
+        trained = []
+
+        def train(service):
+            trained.append(service.version)
+            return ProbabilityModel(model.locs, model.scales, (model.pooled_loc, model.pooled_scale),
+                                    dict(model.metadata, data_version=service.version))
+
+        monkeypatch.setattr(probability_model, 'train_probability_model', train)
+        path = tmp_path / 'model.json'
+        service = FakeService()
+
+        assert load_probability_model(service, path).metadata['data_version'] == 'v1'
+        assert load_probability_model(service, path).metadata['data_version'] == 'v1'
+        assert trained == ['v1']
+
+        service.version = 'v2'
+        assert load_probability_model(service, path).metadata['data_version'] == 'v2'
+        assert ProbabilityModel.load(path).metadata['data_version'] == 'v2'
+        assert trained == ['v1', 'v2']
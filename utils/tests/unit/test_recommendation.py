@@ -0,0 +1,128 @@
+"""
+推荐引擎单元测试
+"""
+import pytest
+import numpy as np
+from core.analytics.recommendation import (
+    PureRankRecommender, MLRecommendationEngine, WeightedRecommendationEngine
+)
+from core.analytics.probability_model import ProbabilityModel
+from core.data.volatility_table import VolatilityTable
+
+
+class TestPureRankRecommender:
+    """测试纯排名推荐器"""
+
+    def test_rank_recommender_windows(self, candidate_pool):
+        """测试纯排名推荐器二分查找保底和冲刺窗口"""
+        recommender = PureRankRecommender(candidate_pool)
+
+        balanced = recommender.recommend(1300, top_k=4)
+        assert [(r['rank'], r['category']) for r in balanced] == [(1200, '保底'), (1200, '冲刺'), (1200, '冲刺')]
+        assert balanced[0]['school_name'] == "浙江大学" and balanced[0]['advantage'] == 100
+
+        aggressive = recommender.recommend(1300, strategy="aggressive", top_k=3)
+        assert [r['rank'] for r in aggressive] == [1200, 25000, 20000]
+
+
+class TestMLRecommendationEngine:
+    """测试机器学习推荐的批量打分"""
+
+    class FakeService:
+        """提供候选池、概率曲线和专业波动的数据服务"""
+
+        def __init__(self, pool):
+            rng = np.random.default_rng(0)
+            reference = rng.uniform(500, 80000, 3000)
+            self.pool = pool
+            self.model = ProbabilityModel.fit(reference, reference * np.exp(rng.normal(0.05, 0.1, 3000)))
+            self.volatility = VolatilityTable.from_records([1, 1, 2, 2], [2024, 2025, 2024, 2025],
+                                                           [1000, 1300, 20000, 21000])
+            # 候选池各记录对应的波动指标表行号(-1 为无关联专业)
+            self.volatility_rows = self.volatility.lookup([1, 0, 0, 2, 0])
+
+        def get_dataset_version(self):
+            return 'v1'
+
+        def get_probability_model(self):
+            return self.model
+
+        def get_candidate_pool(self, year=2025):
+            return self.pool
+
+        def get_major_volatility(self):
+            return self.volatility
+
+        def get_candidate_volatility_rows(self, year=2025):
+            return self.volatility_rows
+
+    def test_features_match_formula(self, candidate_pool):
+        """测试批量特征与按公式手算的结果一致,录取概率取自概率曲线和专业波动"""
+        service = self.FakeService(candidate_pool)
+        engine = MLRecommendationEngine(service)
+
+        recommendations = engine.recommend_by_ml({'rank': 1300, 'score': 668}, {'majors': ['计算机']}, limit=10)
+        by_school = {rec['school_name']: rec for rec in recommendations}
+        assert sorted(by_school) == ["宁波大学", "浙江大学"]
+
+        # 浙江大学 计算机科学与技术: 位次1200, 分数670, 985(100分)
+        assert list(by_school["浙江大学"]['ml_features'].values()) == pytest.approx(
+            [(1200 - 1300) / 1300, (670 - 668) / 668, 1200 / 1300, 1.0, 1.0, 0.0])
+        # 宁波大学 计算机类: 位次20000, 分数600, 双一流(60分)
+        assert list(by_school["宁波大学"]['ml_features'].values()) == pytest.approx(
+            [(20000 - 1300) / 1300, (600 - 668) / 668, 20000 / 1300, 0.6, 1.0, 0.0])
+
+        # 浙江大学计算机无关联专业(使用分段波动),宁波大学计算机类关联专业2
+        volatility = np.array([np.nan, service.volatility.column('log_volatility', service.volatility_rows[[3]])[0]])
+        expected = np.clip(service.model.predict_ranks(1300, np.array([1200.0, 20000.0]), volatility) * 100, 1, 99)
+        assert [by_school[name]['admission_probability'] for name in ("浙江大学", "宁波大学")] == \
+            [round(float(p), 1) for p in expected]
+
+
+class TestWeightedRecommendationEngine:
+    """测试加权推荐引擎的推荐上下文"""
+
+    def test_contexts_per_session(self, candidate_pool):
+        """测试上下文按方案区分,重排只使用显式传入的偏好"""
+        service = TestMLRecommendationEngine.FakeService(candidate_pool)
+        engine = WeightedRecommendationEngine(service)
+        student = {'rank': 1300, 'score': 668}
+
+        first = engine.get_context(student, session_id='1')
+        assert engine.get_context(student, session_id='1') is first
+        assert engine.get_context(student, session_id='2') is not first
+
+        result = engine.rerank(student, {"locations": ["浙江"]}, add={"majors": ["医学"]}, session_id='1')
+        assert result['preferences'] == {"locations": ["浙江"], "majors": ["医学"], "school_types": []}
+        assert [v['major_name'] for v in result['volunteers']] == ["临床医学"]
+
+        other = engine.rerank(student, None, add={"majors": ["软件"]}, session_id='2')
+        assert other['preferences']['locations'] == []
+
+    def test_session_reuses_context(self, candidate_pool):
+        """测试方案生成后的重排复用同一个上下文,重新生成时按新偏好重建"""
+        engine = WeightedRecommendationEngine(TestMLRecommendationEngine.FakeService(candidate_pool))
+        student = {'rank': 1300, 'score': 668}
+        preferences = {"locations": ["浙江"], "majors": ["会计"]}
+
+        engine.generate_weighted_volunteers(student, preferences, session_id='1')
+        first = engine.get_context(student, session_id='1')
+        for add in ({"majors": ["计算机"]}, {"locations": ["上海"]}, {"school_types": ["985"]}):
+            engine.rerank(student, preferences, add=add, session_id='1')
+        assert len(engine.contexts) == 1
+        assert engine.get_context(student, session_id='1') is first
+        # 窗口按首次生成时的偏好确定(覆盖符合条件的宁波大学会计学)
+        assert 25000 in first.ranks
+
+        engine.generate_weighted_volunteers(student, None, session_id='1')
+        assert len(engine.contexts) == 1
+        assert engine.get_context(student, session_id='1') is not first
+
+    def test_restrictive_preferences(self, candidate_pool):
+        """测试筛选条件严格时窗口按符合条件的记录放宽,不返回空推荐"""
+        engine = WeightedRecommendationEngine(TestMLRecommendationEngine.FakeService(candidate_pool))
+
+        recommendations = engine.recommend_by_weighted_score(
+            {'rank': 1300, 'score': 668}, {"locations": ["浙江"], "majors": ["会计"]}, limit=1
+        )
+        assert [(r['school_name'], r['major_name']) for r in recommendations] == [("宁波大学", "会计学")]
@@ -0,0 +1,70 @@
+"""
+推荐上下文单元测试
+"""
+import pytest
+from core.analytics.recommendation_context import RecommendationContext, apply_preference_changes
+
+
+class TestRecommendationContext:
+    """测试推荐上下文的增量重排"""
+
+    def test_context_rescoring(self, candidate_pool):
+        """测试推荐上下文复用关键词掩码并按偏好重新打分"""
+        weights = {'rank_match': 0.4, 'score_match': 0.25, 'school_level': 0.2,
+                   'major_match': 0.1, 'location_match': 0.05}
+        level_scores = {'is_985': 20, 'is_211': 15, 'is_double_first_class': 10, 'normal': 0}
+        context = RecommendationContext(candidate_pool, 1300, 668, 1000, 1600, level_scores)
+
+        preferences = apply_preference_changes({}, add={"locations": ["浙江"]})
+        scored = context.score(preferences, weights)
+        assert list(scored['candidate_idx']) == [0, 1]
+        assert ('location', '浙江') in context.mask_cache
+
+        preferences = apply_preference_changes(preferences, add={"majors": ["医学"]}, remove={"locations": ["浙江"]})
+        assert preferences['locations'] == [] and preferences['majors'] == ["医学"]
+        scored = context.score(preferences, weights)
+        assert list(scored['candidate_idx']) == [1]
+        assert list(scored['major_scores']) == [100.0]
+
+    def test_matches_row_formula(self, candidate_pool):
+        """测试向量化打分与逐行加权公式一致"""
+        weights = {'rank_match': 0.4, 'score_match': 0.25, 'school_level': 0.2,
+                   'major_match': 0.1, 'location_match': 0.05}
+        level_scores = {'is_985': 20, 'is_211': 15, 'is_double_first_class': 10, 'normal': 0}
+        levels = {"浙江大学": 20, "复旦大学": 20, "宁波大学": 10}
+        regions = {"浙江大学": "浙江", "复旦大学": "上海", "宁波大学": "浙江"}
+
+        def row_score(rank, score, school, major, preferences):
+            rank_score = max(0, 100 - abs(5000 - rank) / 5000 * 100)
+            score_score = max(0, 100 - abs(640 - score) * 2)
+            majors = (preferences or {}).get('majors') or []
+            major_score = 100 if any(m in major for m in majors) else 30
+            locations = (preferences or {}).get('locations') or []
+            if locations:
+                location_score = 100 if any(loc in regions[school] for loc in locations) else 20
+            else:
+                location_score = 50
+            return round(rank_score * 0.4 + score_score * 0.25 + levels[school] * 0.2 +
+                         major_score * 0.1 + location_score * 0.05, 2)
+
+        context = RecommendationContext(candidate_pool, 5000, 640, 0, 30000, level_scores)
+        for preferences in (None, {"majors": ["计算机"]}, {"locations": ["浙江"], "majors": ["会计"]}):
+            scored = context.score(preferences, weights)
+            expected = [
+                row_score(context.ranks[i], context.scores[i],
+                          candidate_pool.school_names[context.school_idx[i]], context.major_names[i], preferences)
+                for i in scored['candidate_idx']
+            ]
+            assert scored['total_scores'].tolist() == pytest.approx(expected)
+
+    def test_bounded_mask_cache(self, candidate_pool):
+        """测试关键词掩码缓存有上限,打分不在共享上下文上保存偏好"""
+        level_scores = {'is_985': 20, 'is_211': 15, 'is_double_first_class': 10, 'normal': 0}
+        weights = {'rank_match': 0.4, 'score_match': 0.25, 'school_level': 0.2,
+                   'major_match': 0.1, 'location_match': 0.05}
+        context = RecommendationContext(candidate_pool, 1300, 668, 0, 30000, level_scores)
+
+        for i in range(context.MASK_CACHE_SIZE + 10):
+            context.score({"majors": [f"专业{i}"]}, weights)
+        assert len(context.mask_cache) == context.MASK_CACHE_SIZE
+        assert not hasattr(context, 'preferences')
@@ -0,0 +1,42 @@
+"""
+院校编号注册表单元测试
+"""
+import pandas as pd
+
+from core.data.school_registry import SchoolRegistry, legacy_school_code
+
+
+class TestSchoolRegistry:
+    """测试院校编号注册表"""
+
+    def test_legacy_collision(self):
+        """历史哈希代码冲突时保留最新年份中先出现的院校,冲突院校改用院校编号"""
+        # 北京师范大学 与 杭州师范大学 的历史哈希代码相同
+        assert legacy_school_code('北京师范大学') == legacy_school_code('杭州师范大学')
+        years_data = {
+            2024: pd.DataFrame({'院校编号': [2, 1], '院校名称': ['杭州师范大学', '北京师范大学']}),
+            2025: pd.DataFrame({'院校编号': [1, 2], '院校名称': ['北京师范大学', '杭州师范大学']}),
+        }
+        registry = SchoolRegistry(years_data)
+        legacy = legacy_school_code('北京师范大学')
+
+        assert registry.resolve(legacy) == '北京师范大学'
+        assert registry.legacy_collisions == {legacy: ['杭州师范大学']}
+        assert registry.get_legacy_code('北京师范大学') == legacy
+        assert registry.get_legacy_code('杭州师范大学') == '2'
+        assert registry.resolve(registry.get_legacy_code('杭州师范大学')) == '杭州师范大学'
+
+    def test_real_code_first(self):
+        """院校编号优先于历史哈希代码"""
+        shadowing = legacy_school_code('青海大学')
+        years_data = {
+            2025: pd.DataFrame({
+                '院校编号': [int(shadowing), 9],
+                '院校名称': ['长春汽车职业技术大学', '青海大学']
+            }),
+        }
+        registry = SchoolRegistry(years_data)
+
+        assert registry.resolve(shadowing) == '长春汽车职业技术大学'
+        assert registry.resolve(' 9 ') == '青海大学'
+        assert registry.get_legacy_code('青海大学') == '9'
@@ -0,0 +1,36 @@
+"""
+院校标签位图单元测试
+"""
+import pytest
+import pandas as pd
+from core.data.school_tags import SchoolTags, match_tags, TAG_KNOWN
+
+
+class TestSchoolTags:
+    """测试院校标签位图"""
+
+    @pytest.fixture
+    def school_tags(self):
+        """创建院校标签位图"""
+        school_info = pd.DataFrame({
+            "学校名称": ["浙江大学", "宁波大学", "浙江万里学院"],
+            "所在区域": ["浙江", "浙江", "浙江"],
+            "985": ["Y", None, None],
+            "双一流": ["Y", "Y", None],
+            "民办高校": [None, None, "Y"],
+        })
+        return SchoolTags(school_info)
+
+    def test_unified_211(self, school_tags):
+        """测试985院校统一视为211"""
+        assert school_tags.get_tags("浙江大学")["is_211"]
+        assert not school_tags.get_tags("宁波大学")["is_211"]
+        assert school_tags.get_mask("未知大学") == 0
+
+    def test_row_mask_filter(self, school_tags):
+        """测试按行广播后的按位与筛选"""
+        masks = school_tags.masks_for(["宁波大学", "浙江大学", "未知大学", "浙江万里学院"])
+
+        assert list((masks & TAG_KNOWN) > 0) == [True, True, False, True]
+        assert list(match_tags(masks, is_double_first_class=True, is_985=False)) == [True, False, False, False]
+        assert list(match_tags(masks, is_private=False)) == [True, True, True, False]
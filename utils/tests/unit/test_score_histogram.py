@@ -0,0 +1,33 @@
+"""
+分数/位次直方图单元测试
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from core.data.score_histogram import ScoreHistogram
+
+
+class TestScoreHistogram:
+    """测试分数/位次前缀和直方图"""
+
+    @pytest.fixture
+    def histogram(self):
+        """创建直方图实例(位次为分数的单调函数)"""
+        admission = pd.DataFrame({
+            "投档最低分": [650, 650, 620, 600, 580, 550],
+            "位次": [3000, 3000, 6000, 9000, 12000, 18000],
+        })
+        return ScoreHistogram(admission)
+
+    def test_range_counts(self, histogram):
+        """测试任意区间由前缀和之差统计"""
+        assert list(histogram.score_counts([550, 600, 651], [600, 650, 700])) == [3, 4, 0]
+        assert list(histogram.rank_counts([0, 6000], [5999, np.inf])) == [2, 4]
+
+    def test_rank_filter_as_score_bounds(self, histogram):
+        """测试位次区间换算为分数区间"""
+        assert histogram.rank_monotone
+        assert histogram.score_bounds_for_ranks(5000, 12000) == (580, 620)
+
+        shuffled = ScoreHistogram(pd.DataFrame({"投档最低分": [600, 600], "位次": [9000, 9100]}))
+        assert shuffled.score_bounds_for_ranks(5000, None) is None
@@ -0,0 +1,43 @@
+"""
+分数-位次换算表单元测试
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from core.data.score_rank_table import ScoreRankTable
+
+
+class TestScoreRankTable:
+    """测试分数-位次换算表"""
+
+    @pytest.fixture
+    def table(self):
+        admission = pd.DataFrame({
+            '投档最低分': [600, 650, 550, 650, None],
+            '位次': [10000, 4000, 25000, 4000, 30000]
+        })
+        segment = pd.DataFrame({'分数': [700, 650, 600], '累计人数': [100, 3900, 9800]})
+        return ScoreRankTable({2024: admission, 2025: admission}, {2025: segment})
+
+    def test_round_trip(self, table):
+        """测试节点处精确换算、节点间单调插值和双向互逆"""
+        assert table.score_to_rank(600, 2024) == pytest.approx(10000)
+        ranks = table.score_to_rank(np.array([550, 575, 600, 625, 650]), 2024)
+        assert np.all(np.diff(ranks) < 0)
+        assert table.rank_to_score(ranks, 2024) == pytest.approx([550, 575, 600, 625, 650])
+
+    def test_year_and_source(self, table):
+        """测试一分一段表优先、默认最新年份和补全缺失项"""
+        assert table.curves[2025].source == 'segment' and table.curves[2024].source == 'admission'
+        assert table.score_to_rank(650) == pytest.approx(3900)
+        assert table.rank_to_score(1e9, 2024) == 550
+        assert table.complete(rank=4000, year=2024) == {'score': 650, 'rank': 4000}
+        with pytest.raises(ValueError):
+            table.score_to_rank(600, 2020)
+
+    def test_equivalent_scores(self, table):
+        """测试同位分: 按位次换算到参考年份,缺位次时先按本年曲线换算"""
+        equivalent = table.equivalent_scores([600, 650, 625, 500], [10000, None, None, None], year=2024)
+        assert equivalent[:2] == pytest.approx([table.rank_to_score(10000), table.rank_to_score(4000)])
+        assert 600 < equivalent[2] < 650 and equivalent[3] == pytest.approx(table.rank_to_score(25000))
+        assert table.equivalent_scores([610], year=2025)[0] == 610
@@ -0,0 +1,31 @@
+"""
+志愿方案模拟单元测试
+"""
+import numpy as np
+from core.analytics.simulation import PlanSimulator
+
+
+class TestPlanSimulator:
+    """测试志愿方案蒙特卡洛模拟"""
+
+    def test_sequential_admission(self):
+        """测试按志愿顺序投档: 位置概率之和加滑档概率为100%"""
+        simulator = PlanSimulator(prediction_engine=None, n_simulations=20000)
+        # 冲刺(录取位次远高于考生) -> 相当 -> 保底
+        result = simulator.simulate(10000, np.array([5000, 10000, 30000]),
+                                    np.array([0.1, 0.1, 0.1]), seed=0)
+
+        positions = result['position_probabilities']
+        assert positions[0] < 1
+        assert 40 < positions[1] < 60
+        assert positions[2] > 40
+        assert result['fall_through_probability'] < 1
+        assert abs(sum(positions) + result['fall_through_probability'] - 100) < 0.1
+
+    def test_fall_through(self):
+        """测试全部冲刺志愿时大概率滑档"""
+        simulator = PlanSimulator(prediction_engine=None, n_simulations=5000)
+        result = simulator.simulate(10000, np.array([3000, 4000, 5000]),
+                                    np.array([0.1, 0.1, 0.1]), seed=0)
+
+        assert result['fall_through_probability'] > 99
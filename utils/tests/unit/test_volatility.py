@@ -0,0 +1,31 @@
+"""
+位次波动指标表单元测试
+"""
+import pytest
+import numpy as np
+from core.data.volatility_table import VolatilityTable
+
+
+class TestVolatilityTable:
+    """测试位次波动指标表"""
+
+    def test_metrics(self):
+        """测试标准差、最大跳变、方向一致性,以及缺失年份的跳过"""
+        table = VolatilityTable.from_records(
+            ['甲', '甲', '甲', '乙', '乙', '乙', '丙'],
+            [2023, 2024, 2025, 2023, 2024, 2025, 2025],
+            [1000, 1100, 1200, 1000, None, 1500, 800]
+        )
+
+        first = table.get('甲')
+        assert first['rank_std'] == 100.0 and first['max_jump'] == 100.0
+        assert first['direction_consistency'] == 1.0
+        assert first['cv'] == pytest.approx(100 / 1100, abs=1e-4)
+
+        # 缺失的2024年跳过,2023->2025视为一次变化
+        second = table.get('乙')
+        assert second['max_jump'] == 500.0
+        assert second['log_volatility'] == pytest.approx(np.log(1.5), abs=1e-4)
+
+        assert table.get('丙')['rank_std'] is None
+        assert np.isnan(table.column('cv', table.lookup(['丙', '丁']))).all()